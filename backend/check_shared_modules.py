@@ -0,0 +1,47 @@
+"""Fails when the modules both services carry a copy of have drifted apart.
+
+phone_agent and scout_agent are deployed separately, each from its own
+directory, so modules they share are copied into both. Run this after editing
+either copy (and before deploying):
+
+    python3 backend/check_shared_modules.py
+"""
+import difflib
+import os
+import sys
+
+SERVICES = ("phone_agent", "scout_agent")
+SHARED_MODULES = (
+    "embedding_profile.py",
+    "firestore_db.py",
+    "geohash.py",
+    "passages.py",
+    "session_store.py",
+)
+
+
+def read_module(service: str, module: str) -> list[str]:
+    """The module's lines, with references to the other copy made service-neutral."""
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), service, module)) as f:
+        lines = f.readlines()
+    other = next(s for s in SERVICES if s != service)
+    return [line.replace(f"backend/{other}/", "backend/<service>/") for line in lines]
+
+
+def main() -> int:
+    drifted = 0
+    for module in SHARED_MODULES:
+        a, b = (read_module(service, module) for service in SERVICES)
+        if a == b:
+            continue
+        drifted += 1
+        sys.stdout.writelines(difflib.unified_diff(a, b, f"{SERVICES[0]}/{module}", f"{SERVICES[1]}/{module}"))
+    if drifted:
+        print(f"{drifted} shared module(s) differ between {' and '.join(SERVICES)}; copy the change to both.")
+        return 1
+    print(f"{len(SHARED_MODULES)} shared modules in sync.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
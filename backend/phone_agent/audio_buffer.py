@@ -0,0 +1,98 @@
+import asyncio
+import os
+from typing import Callable, Optional
+
+# Twilio sends one 20ms frame of 8kHz mu-law (160 bytes) per media event.
+TWILIO_FRAME_MS = 20
+TWILIO_FRAME_BYTES = 160
+MULAW_SILENCE = b"\xff"
+
+
+class InboundAudioBuffer:
+    """Coalesces Twilio media frames into larger chunks before they go to Gemini.
+
+    Frames are ordered by their Twilio chunk number. A frame that arrives early is
+    held until the gap before it is filled, or until `reorder_frames` newer frames
+    are waiting, at which point the gap is filled with silence. A gap longer than
+    `reorder_frames` (a stream restart or a bogus chunk number) is not padded; the
+    sequence just resyncs at the held frame. Frames that arrive after their slot
+    was already released are dropped.
+
+    Audio is flushed through `on_flush` once `coalesce_ms` of it is buffered, or
+    `max_latency_ms` after the oldest buffered frame arrived, whichever comes first.
+    """
+
+    def __init__(self, on_flush: Callable[[bytes], None], coalesce_ms: Optional[int] = None, max_latency_ms: Optional[int] = None, reorder_frames: Optional[int] = None):
+        self.on_flush = on_flush
+        coalesce_ms = coalesce_ms if coalesce_ms is not None else int(os.getenv("INBOUND_AUDIO_COALESCE_MS", "100"))
+        max_latency_ms = max_latency_ms if max_latency_ms is not None else int(os.getenv("INBOUND_AUDIO_MAX_LATENCY_MS", "120"))
+        self.reorder_frames = reorder_frames if reorder_frames is not None else int(os.getenv("INBOUND_AUDIO_REORDER_FRAMES", "3"))
+        self.coalesce_bytes = max(1, coalesce_ms // TWILIO_FRAME_MS) * TWILIO_FRAME_BYTES
+        self.max_latency = max_latency_ms / 1000
+
+        self._ready = bytearray()
+        self._pending: dict[int, bytes] = {}
+        self._next_chunk: Optional[int] = None
+        self._deadline: Optional[asyncio.TimerHandle] = None
+        self.late_frames = 0
+        self.filled_frames = 0
+        self.resyncs = 0
+
+    def push(self, payload: bytes, chunk: Optional[int] = None):
+        """Adds one frame. `chunk` is Twilio's per-track sequence number, if known."""
+        if chunk is None:
+            self._append(payload)
+        elif self._next_chunk is None or chunk == self._next_chunk:
+            self._next_chunk = chunk + 1
+            self._append(payload)
+            self._release_pending()
+        elif chunk < self._next_chunk:
+            self.late_frames += 1
+        else:
+            self._pending[chunk] = payload
+            if len(self._pending) > self.reorder_frames:
+                self._skip_gap()
+
+        if len(self._ready) >= self.coalesce_bytes:
+            self.flush()
+
+    def flush(self):
+        """Sends whatever audio is ready, without waiting for reordered frames."""
+        self._cancel_deadline()
+        if self._ready:
+            data = bytes(self._ready)
+            self._ready.clear()
+            self.on_flush(data)
+
+    def close(self):
+        """Releases all held frames, filling any gaps with silence, and flushes."""
+        while self._pending:
+            self._skip_gap()
+        self.flush()
+
+    def _append(self, payload: bytes):
+        if not self._ready:
+            self._deadline = asyncio.get_running_loop().call_later(self.max_latency, self.flush)
+        self._ready += payload
+
+    def _release_pending(self):
+        while self._next_chunk in self._pending:
+            self._append(self._pending.pop(self._next_chunk))
+            self._next_chunk += 1
+
+    def _skip_gap(self):
+        # Give up on the missing frames before the oldest held frame and pad them with silence.
+        oldest = min(self._pending)
+        missing = oldest - self._next_chunk
+        if missing > self.reorder_frames:
+            self.resyncs += 1
+        else:
+            self.filled_frames += missing
+            self._append(MULAW_SILENCE * (missing * TWILIO_FRAME_BYTES))
+        self._next_chunk = oldest
+        self._release_pending()
+
+    def _cancel_deadline(self):
+        if self._deadline is not None:
+            self._deadline.cancel()
+            self._deadline = None
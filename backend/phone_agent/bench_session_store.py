@@ -0,0 +1,86 @@
+"""Soak test: session memory over thousands of simulated calls.
+
+Each simulated call creates an ADK session with the call context in its state
+and appends transcription events the way a live call does. Most calls end with
+an explicit delete; a share of them "crash" and never clean up, which the TTL
+has to catch (the caps only evict released sessions). The plain
+InMemorySessionService (what both services used before) keeps every session. Memory is measured with tracemalloc and
+simulated time advances a few seconds per call. Runs offline.
+
+Run from backend/phone_agent with `python3 bench_session_store.py [calls] [events_per_call] [leak_percent]`.
+"""
+import asyncio
+import sys
+import tracemalloc
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from session_store import BoundedSessionService
+
+APP_NAME = "outreach-agent"
+SECONDS_PER_CALL = 5.0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+async def simulate(service, clock: FakeClock, calls: int, events_per_call: int, leak_percent: int) -> list[tuple[int, float, int]]:
+    samples = []
+    for call in range(calls):
+        clock.now += SECONDS_PER_CALL
+        call_id = f"call-{call}"
+        session = await service.create_session(
+            app_name=APP_NAME,
+            user_id=call_id,
+            state={"outcome": "Get a quote for replacing a water heater", "user_context": "Homeowner in San Francisco, available weekdays after 5pm. " * 4},
+        )
+        for turn in range(events_per_call):
+            role = "user" if turn % 2 else "model"
+            text = f"Turn {turn}: sure, we can come out Tuesday and a 50 gallon tank runs about twelve hundred installed."
+            await service.append_event(session, Event(
+                author="outreach_agent" if role == "model" else "user",
+                invocation_id=call_id,
+                content=types.Content(role=role, parts=[types.Part.from_text(text=text)]),
+            ))
+        if call % 100 >= leak_percent:
+            await service.delete_session(app_name=APP_NAME, user_id=call_id, session_id=session.id)
+        if (call + 1) % max(1, calls // 10) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            sessions = sum(len(users) for app in service.sessions.values() for users in app.values())
+            samples.append((call + 1, current / 1024 / 1024, sessions))
+    return samples
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    events_per_call = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    leak_percent = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+
+    services = (
+        ("InMemorySessionService, never deleted", lambda clock: InMemorySessionService(), 0),
+        (f"BoundedSessionService, {leak_percent}% of calls never cleaned up",
+         lambda clock: BoundedSessionService(max_sessions=200, max_bytes=8 * 1024 * 1024, ttl=1800, clock=clock), leak_percent),
+    )
+    for label, factory, leaks in services:
+        clock = FakeClock()
+        tracemalloc.start()
+        service = factory(clock)
+        # The baseline never deletes anything, matching the old code.
+        samples = asyncio.run(simulate(service, clock, calls, events_per_call, leaks if leaks else 100))
+        tracemalloc.stop()
+        print(label)
+        for done, megabytes, sessions in samples:
+            print(f"  after {done:>6} calls: {megabytes:7.1f} MB traced, {sessions:>5} sessions held")
+        if isinstance(service, BoundedSessionService):
+            print(f"  {service.stats()}")
+
+
+if __name__ == "__main__":
+    main()
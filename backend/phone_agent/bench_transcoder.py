@@ -0,0 +1,85 @@
+"""Micro-benchmark: numpy transcoder vs the audioop path, per 20ms frame.
+
+Run from backend/phone_agent with `python3 bench_transcoder.py`.
+"""
+import time
+
+import numpy as np
+
+from transcoder import NumpyTranscoder, TRANSCODERS, pcm16_to_ulaw, ulaw_to_pcm16
+
+FRAMES = 5000
+# One Twilio frame is 20ms of 8kHz mu-law; Gemini chunks are typically a few hundred ms of 24kHz PCM.
+TWILIO_FRAME_BYTES = 160
+GEMINI_CHUNK_BYTES = 24000 * 2 // 5
+
+
+def make_speechlike(num_samples: int, rate: int) -> np.ndarray:
+    t = np.arange(num_samples) / rate
+    signal = 6000 * np.sin(2 * np.pi * 220 * t) + 3000 * np.sin(2 * np.pi * 1250 * t)
+    signal += np.random.default_rng(0).normal(0, 500, num_samples)
+    return np.clip(signal, -32768, 32767).astype(np.int16)
+
+
+def bench(name: str, fn, chunks) -> float:
+    start = time.perf_counter()
+    for chunk in chunks:
+        fn(chunk)
+    per_frame_us = (time.perf_counter() - start) / len(chunks) * 1e6
+    print(f"  {name:<10} {per_frame_us:8.1f} us/chunk")
+    return per_frame_us
+
+
+def check_codec():
+    try:
+        import audioop
+    except ImportError:
+        print("audioop not available, skipping bit-exactness check")
+        return
+    all_ulaw = bytes(range(256))
+    assert ulaw_to_pcm16(all_ulaw).tobytes() == audioop.ulaw2lin(all_ulaw, 2)
+    all_pcm = np.arange(-32768, 32768, dtype=np.int16)
+    assert pcm16_to_ulaw(all_pcm) == audioop.lin2ulaw(all_pcm.tobytes(), 2)
+    print("mu-law tables are bit-exact with audioop")
+
+
+def check_chunking():
+    # Resampling in 20ms pieces must match resampling the whole stream at once.
+    pcm = make_speechlike(24000, 24000).tobytes()
+    whole = NumpyTranscoder().to_twilio(pcm)
+    streamed = NumpyTranscoder()
+    pieces = b"".join(streamed.to_twilio(pcm[i:i + 961]) for i in range(0, len(pcm), 961))
+    assert whole == pieces, "chunked output differs from one-shot output"
+    print("stateful resampling is chunk-size independent")
+
+
+def main():
+    check_codec()
+    check_chunking()
+
+    inbound = [pcm16_to_ulaw(make_speechlike(TWILIO_FRAME_BYTES, 8000)) for _ in range(FRAMES)]
+    # Five frames batched together, as they are once inbound audio is coalesced.
+    inbound_100ms = [b"".join(inbound[i:i + 5]) for i in range(0, FRAMES, 5)]
+    outbound = [make_speechlike(GEMINI_CHUNK_BYTES // 2, 24000).tobytes() for _ in range(FRAMES // 10)]
+
+    results = {}
+    for name, cls in TRANSCODERS.items():
+        try:
+            transcoder = cls()
+        except ImportError:
+            print(f"{name}: not available")
+            continue
+        print(f"{name}:")
+        results[name] = (
+            bench("in 20ms", transcoder.to_gemini, inbound),
+            bench("in 100ms", transcoder.to_gemini, inbound_100ms),
+            bench("out 200ms", transcoder.to_twilio, outbound),
+        )
+
+    if "audioop" in results and "numpy" in results:
+        for direction, i in (("in 20ms", 0), ("in 100ms", 1), ("out 200ms", 2)):
+            print(f"{direction} speedup vs audioop: {results['audioop'][i] / results['numpy'][i]:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
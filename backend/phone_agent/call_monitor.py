@@ -0,0 +1,276 @@
+import asyncio
+import base64
+import json
+import os
+from typing import Callable, Optional
+
+from fastapi import WebSocket
+from google.cloud import firestore
+
+from call_scheduler import DONE
+
+# Twilio audio is 8kHz mu-law, one byte per sample.
+MULAW_BYTES_PER_SECOND = 8000
+
+# Called with the call document's data, or None if there is no such call, from any thread.
+DocumentCallback = Callable[[Optional[dict]], None]
+
+
+class MonitorSubscriber:
+    """One watcher of a call, with its own bounded outbox.
+
+    Publishing never waits: when the watcher falls behind, audio is dropped
+    once the outbox is half full and transcript updates only when it is full,
+    so a slow reader loses the least useful messages first and never holds up
+    the call.
+    """
+
+    def __init__(self, audio: bool, max_pending: int):
+        self.audio = audio
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self.dropped = 0
+
+    def offer(self, message: Optional[str], lossy: bool = False):
+        if lossy and self.queue.qsize() * 2 >= self.queue.maxsize:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    def end(self):
+        # The end marker must get through, even if it costs a queued message.
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(None)
+
+
+class FollowedCall:
+    """What a watched call's document has shown so far."""
+
+    def __init__(self):
+        self.watch = None
+        self.status: Optional[str] = None  # the last call_status message, for watchers that join later
+        self.last_turn: Optional[int] = None  # None until the first snapshot
+        self.partial: Optional[tuple[str, str]] = None  # (role, text) of the open turn
+
+
+class CallMonitor:
+    """Fans live call updates out to whoever is watching the call.
+
+    Any instance can serve a watcher, not just the one streaming the call:
+    while a call is watched, the monitor follows its Firestore document, which
+    the streaming instance keeps up to date. Status changes and the end of the
+    call come from the document. So do transcript updates (`transcript` and
+    `transcript_partial`, a few seconds behind), unless the call streams on
+    this instance, in which case the call handler publishes each fragment as
+    it is transcribed. Audio is only available on the streaming instance.
+
+    Each message is serialized once and offered to every subscriber's outbox;
+    `serve` drains an outbox into a websocket. Audio from each side is batched
+    into `audio_chunk_ms` chunks of mu-law, and none of it is buffered while
+    no one is listening.
+    """
+
+    def __init__(self, max_pending: Optional[int] = None, audio_chunk_ms: Optional[int] = None, watch: Optional[Callable[[str, DocumentCallback], object]] = None):
+        self.max_pending = max_pending if max_pending is not None else int(os.getenv("CALL_MONITOR_MAX_PENDING", "200"))
+        chunk_ms = audio_chunk_ms if audio_chunk_ms is not None else int(os.getenv("CALL_MONITOR_AUDIO_CHUNK_MS", "200"))
+        self.audio_chunk_bytes = MULAW_BYTES_PER_SECOND * chunk_ms // 1000
+        # Starts a listener on a call's document; returns something with unsubscribe(). Blocking.
+        self.watch = watch or self._watch_document
+        self._client: Optional[firestore.Client] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: dict[str, set[MonitorSubscriber]] = {}
+        self._followed: dict[str, FollowedCall] = {}
+        self._local: set[str] = set()
+        self._audio_watchers: dict[str, int] = {}
+        self._audio_buffers: dict[tuple[str, str], bytearray] = {}
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, call_id: str, audio: bool = False) -> MonitorSubscriber:
+        subscriber = MonitorSubscriber(audio, self.max_pending)
+        self._subscribers.setdefault(call_id, set()).add(subscriber)
+        if audio:
+            self._audio_watchers[call_id] = self._audio_watchers.get(call_id, 0) + 1
+        followed = self._followed.get(call_id)
+        if followed is None:
+            self._follow(call_id)
+        elif followed.status is not None:
+            subscriber.offer(followed.status)
+        return subscriber
+
+    def stream_started(self, call_id: str):
+        """Marks the call as streaming on this instance, so its transcript is published as it happens."""
+        self._local.add(call_id)
+
+    def stream_ended(self, call_id: str):
+        self._local.discard(call_id)
+
+    def unsubscribe(self, call_id: str, subscriber: MonitorSubscriber):
+        subscribers = self._subscribers.get(call_id)
+        if not subscribers or subscriber not in subscribers:
+            return
+        subscribers.discard(subscriber)
+        self.dropped += subscriber.dropped
+        if subscriber.audio:
+            self._audio_watchers[call_id] -= 1
+            if not self._audio_watchers[call_id]:
+                del self._audio_watchers[call_id]
+                self._drop_audio_buffers(call_id)
+        if not subscribers:
+            del self._subscribers[call_id]
+            self._unfollow(call_id)
+
+    def publish(self, call_id: str, message: dict):
+        """Sends a message to everyone watching the call. Never waits."""
+        subscribers = self._subscribers.get(call_id)
+        if not subscribers:
+            return
+        raw = json.dumps({**message, "call_id": call_id})
+        for subscriber in subscribers:
+            subscriber.offer(raw)
+        self.published += 1
+
+    def publish_audio(self, call_id: str, source: str, mulaw_audio: bytes):
+        """Buffers a stretch of call audio ("business" or "agent") for watchers that want it."""
+        if call_id not in self._audio_watchers:
+            return
+        buffer = self._audio_buffers.setdefault((call_id, source), bytearray())
+        buffer += mulaw_audio
+        if len(buffer) < self.audio_chunk_bytes:
+            return
+        raw = json.dumps({"type": "call_audio", "call_id": call_id, "source": source, "encoding": "audio/x-mulaw;rate=8000", "data": base64.b64encode(buffer).decode("ascii")})
+        buffer.clear()
+        for subscriber in self._subscribers.get(call_id, ()):
+            if subscriber.audio:
+                subscriber.offer(raw, lossy=True)
+        self.published += 1
+
+    def end(self, call_id: str):
+        """Tells the call's watchers it is over and closes their streams."""
+        self.publish(call_id, {"type": "call_ended"})
+        self._close(call_id)
+
+    async def serve(self, websocket: WebSocket, call_id: str, subscriber: MonitorSubscriber):
+        """Delivers the subscriber's messages until the call ends or the websocket goes away."""
+        try:
+            while True:
+                raw = await subscriber.queue.get()
+                if raw is None:
+                    return
+                await websocket.send_text(raw)
+        finally:
+            self.unsubscribe(call_id, subscriber)
+
+    def stats(self) -> dict:
+        return {
+            "calls_watched": len(self._subscribers),
+            "local_streams": len(self._local),
+            "subscribers": sum(len(subscribers) for subscribers in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped + sum(s.dropped for subscribers in self._subscribers.values() for s in subscribers),
+        }
+
+    def _close(self, call_id: str):
+        """Closes the call's streams, without telling watchers the call is over."""
+        for subscriber in self._subscribers.pop(call_id, ()):
+            subscriber.end()
+            self.dropped += subscriber.dropped
+        self._audio_watchers.pop(call_id, None)
+        self._drop_audio_buffers(call_id)
+        self._unfollow(call_id)
+
+    def _drop_audio_buffers(self, call_id: str):
+        for key in [key for key in self._audio_buffers if key[0] == call_id]:
+            del self._audio_buffers[key]
+
+    # --- Following the call document ---
+    def _follow(self, call_id: str):
+        self._loop = asyncio.get_running_loop()
+        followed = self._followed[call_id] = FollowedCall()
+        asyncio.create_task(self._start_watch(call_id, followed))
+
+    def _unfollow(self, call_id: str):
+        followed = self._followed.pop(call_id, None)
+        # A watch still starting is stopped by _start_watch once it is up.
+        if followed is not None and followed.watch is not None:
+            self._loop.run_in_executor(None, followed.watch.unsubscribe)
+
+    async def _start_watch(self, call_id: str, followed: FollowedCall):
+        def on_change(data: Optional[dict]):
+            self._loop.call_soon_threadsafe(self._apply, call_id, followed, data)
+
+        try:
+            # Starting a listener touches threads and the network, so keep it off the loop.
+            watch = await asyncio.to_thread(self.watch, call_id, on_change)
+        except Exception as e:
+            print(f"Error following call {call_id}: {e}")
+            # Watchers reconnect rather than being told the call is over.
+            if self._followed.get(call_id) is followed:
+                self._close(call_id)
+            return
+        if self._followed.get(call_id) is not followed:
+            await asyncio.to_thread(watch.unsubscribe)
+            return
+        followed.watch = watch
+
+    def _watch_document(self, call_id: str, on_change: DocumentCallback):
+        if self._client is None:
+            self._client = firestore.Client()
+
+        def on_snapshot(docs, changes, read_time):
+            # The first snapshot of a document that doesn't exist has no documents.
+            on_change(docs[0].to_dict() if docs and docs[0].exists else None)
+
+        return self._client.collection("provider_conversations").document(call_id).on_snapshot(on_snapshot)
+
+    def _apply(self, call_id: str, followed: FollowedCall, data: Optional[dict]):
+        if self._followed.get(call_id) is not followed:
+            return
+        if data is None:
+            self._publish_status(call_id, followed, "unknown", None)
+            self.end(call_id)
+            return
+        self._publish_status(call_id, followed, data.get("call_status"), data.get("call_result"))
+        self._apply_transcript(call_id, followed, data)
+        if data.get("call_status") == DONE:
+            self.end(call_id)
+
+    def _publish_status(self, call_id: str, followed: FollowedCall, status: Optional[str], result: Optional[str]):
+        raw = json.dumps({"type": "call_status", "call_id": call_id, "call_status": status, "call_result": result})
+        if raw == followed.status:
+            return
+        followed.status = raw
+        for subscriber in self._subscribers.get(call_id, ()):
+            subscriber.offer(raw)
+        self.published += 1
+
+    def _apply_transcript(self, call_id: str, followed: FollowedCall, data: dict):
+        """Publishes what the transcript gained since the last snapshot, as the handler's fragments would have."""
+        turns = sorted((turn for turn in data.get("transcript") or [] if turn.get("turn", 0) > (followed.last_turn if followed.last_turn is not None else -1)), key=lambda turn: turn.get("turn", 0))
+        partial = data.get("transcript_partial")
+        partial = (partial.get("role"), partial.get("text") or "") if partial else None
+        # Watchers get what happens from when they join, like on the streaming instance; and
+        # there, the handler publishes fragments itself. Either way, only keep count.
+        publish = followed.last_turn is not None and call_id not in self._local
+        for turn in turns:
+            if publish:
+                self._publish_fragment(call_id, followed.partial, (turn.get("role"), turn.get("text") or ""))
+            followed.partial = None
+            followed.last_turn = turn.get("turn", 0)
+        if followed.last_turn is None:
+            followed.last_turn = -1
+        if partial is not None and publish:
+            self._publish_fragment(call_id, followed.partial, partial)
+        followed.partial = partial
+
+    def _publish_fragment(self, call_id: str, sent: Optional[tuple[str, str]], current: tuple[str, str]):
+        role, text = current
+        if sent is not None and sent[0] == role and text.startswith(sent[1]):
+            text = text[len(sent[1]):]
+        text = text.strip()
+        if text:
+            self.publish(call_id, {"type": "call_transcript", "role": role, "text": text})
@@ -0,0 +1,286 @@
+import asyncio
+import itertools
+import os
+import time
+from bisect import insort
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+QUEUED = "queued"
+DIALING = "dialing"
+IN_PROGRESS = "in_progress"
+DONE = "done"
+
+
+@dataclass
+class CallRequest:
+    call_id: str
+    user_id: str
+    destination: str
+    priority: int = 0
+    # Whatever `dial` needs beyond the IDs, e.g. the agent's call context.
+    context: dict = field(default_factory=dict)
+    state: str = QUEUED
+    # How a done call ended: completed, failed, no_answer, timed_out or cancelled.
+    result: Optional[str] = None
+    error: Optional[str] = None
+    call_sid: Optional[str] = None
+    queued_at: float = field(default_factory=time.monotonic)
+    dialing_at: Optional[float] = None
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {
+            "call_id": self.call_id,
+            "state": self.state,
+            "result": self.result,
+            "error": self.error,
+            "priority": self.priority,
+            "queued_seconds": (self.dialing_at or self.finished_at or now) - self.queued_at,
+            "call_seconds": (self.finished_at or now) - self.started_at if self.started_at else None,
+        }
+
+
+class CallScheduler:
+    """Admission control for outbound calls.
+
+    Requests wait in a priority queue (higher `priority` first, then first come
+    first served) and are dialed only while the global, per-user and
+    per-destination limits allow. A call holds its slot from dialing until it is
+    marked done, so the limits bound live Twilio calls and Gemini Live sessions,
+    not just API requests. Calls that never connect or run too long are
+    released by timers so a lost websocket can't leak a slot.
+
+    With several phone agent instances, Twilio may connect a call's media
+    stream to an instance other than the one that dialed it. If
+    `remote_status(request)` is given, it is asked for the call's shared
+    (state, result) before a timer ends a call: a call in progress elsewhere
+    keeps its slot and is re-checked every `remote_check_interval` seconds
+    until it finishes there or runs past the duration limit.
+
+    `dial(request)` places the call and returns its Twilio SID. `on_change(request)`
+    is awaited in the background after every state change.
+    """
+
+    def __init__(
+        self,
+        dial: Callable[[CallRequest], Awaitable[str]],
+        on_change: Optional[Callable[[CallRequest], Awaitable[None]]] = None,
+        max_concurrent: Optional[int] = None,
+        max_per_user: Optional[int] = None,
+        max_per_destination: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        max_call_seconds: Optional[float] = None,
+        max_history: int = 1000,
+        remote_status: Optional[Callable[[CallRequest], Awaitable[tuple[Optional[str], Optional[str]]]]] = None,
+        remote_check_interval: Optional[float] = None,
+    ):
+        self.dial = dial
+        self.on_change = on_change
+        self.remote_status = remote_status
+        self.max_concurrent = max_concurrent if max_concurrent is not None else int(os.getenv("CALL_MAX_CONCURRENT", "10"))
+        self.max_per_user = max_per_user if max_per_user is not None else int(os.getenv("CALL_MAX_PER_USER", "5"))
+        self.max_per_destination = max_per_destination if max_per_destination is not None else int(os.getenv("CALL_MAX_PER_DESTINATION", "1"))
+        self.connect_timeout = connect_timeout if connect_timeout is not None else float(os.getenv("CALL_CONNECT_TIMEOUT", "90"))
+        self.max_call_seconds = max_call_seconds if max_call_seconds is not None else float(os.getenv("CALL_MAX_DURATION", "900"))
+        self.remote_check_interval = remote_check_interval if remote_check_interval is not None else float(os.getenv("CALL_REMOTE_CHECK_SECONDS", "30"))
+
+        self.calls: dict[str, CallRequest] = {}
+        self._queue: list[tuple[int, int, str]] = []  # (-priority, seq, call_id), sorted
+        self._seq = itertools.count()
+        self._active_by_user: dict[str, int] = {}
+        self._active_by_destination: dict[str, int] = {}
+        self._active = 0
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+        # Finished calls stay queryable until this many newer ones have finished.
+        self._finished: deque[str] = deque()
+        self.max_history = max_history
+
+        self.completed_total = 0
+        self.failed_total = 0
+        self._recent_waits: list[float] = []
+
+    # --- Lifecycle ---
+    def submit(self, request: CallRequest) -> CallRequest:
+        """Queues a call and dials it right away if the limits allow."""
+        self.calls[request.call_id] = request
+        insort(self._queue, (-request.priority, next(self._seq), request.call_id))
+        self._notify(request)
+        self._dispatch()
+        return request
+
+    def mark_in_progress(self, call_id: str) -> bool:
+        """The call's media stream connected. False if this instance didn't dial the call."""
+        request = self.calls.get(call_id)
+        if request is None:
+            return False
+        if request.state != DIALING:
+            return True
+        request.state = IN_PROGRESS
+        request.started_at = time.monotonic()
+        self._set_timer(call_id, self.max_call_seconds, "timed_out")
+        self._notify(request)
+        return True
+
+    def mark_done(self, call_id: str, result: str = "completed", error: Optional[str] = None) -> bool:
+        """The call ended, or will never happen. Frees its slot. False if this instance didn't dial the call."""
+        request = self.calls.get(call_id)
+        if request is None:
+            return False
+        if request.state == DONE:
+            return True
+        if request.state == QUEUED:
+            self._queue = [entry for entry in self._queue if entry[2] != call_id]
+        else:
+            self._release(request)
+        request.state = DONE
+        request.result = result
+        request.error = error
+        request.finished_at = time.monotonic()
+        if result == "completed":
+            self.completed_total += 1
+        elif result != "cancelled":
+            self.failed_total += 1
+        self._cancel_timer(call_id)
+        self._notify(request)
+        self._finished.append(call_id)
+        while len(self._finished) > self.max_history:
+            self.calls.pop(self._finished.popleft(), None)
+        self._dispatch()
+        return True
+
+    def cancel(self, call_id: str) -> bool:
+        """Cancels a call that hasn't been dialed yet."""
+        request = self.calls.get(call_id)
+        if request is None or request.state != QUEUED:
+            return False
+        self.mark_done(call_id, "cancelled")
+        return True
+
+    # --- Status ---
+    def position(self, call_id: str) -> Optional[int]:
+        for position, (_, _, queued_id) in enumerate(self._queue):
+            if queued_id == call_id:
+                return position
+        return None
+
+    def snapshot(self) -> dict:
+        waits = sorted(self._recent_waits)
+        return {
+            "queued": len(self._queue),
+            "active": self._active,
+            "dialing": sum(1 for r in self.calls.values() if r.state == DIALING),
+            "in_progress": sum(1 for r in self.calls.values() if r.state == IN_PROGRESS),
+            "completed_total": self.completed_total,
+            "failed_total": self.failed_total,
+            "limits": {
+                "max_concurrent": self.max_concurrent,
+                "max_per_user": self.max_per_user,
+                "max_per_destination": self.max_per_destination,
+            },
+            "queue_wait_p50": waits[len(waits) // 2] if waits else 0.0,
+            "queue_wait_p95": waits[int(len(waits) * 0.95)] if waits else 0.0,
+        }
+
+    # --- Internals ---
+    def _dispatch(self):
+        """Starts every queued call the limits allow, in priority order."""
+        if self._active >= self.max_concurrent:
+            return
+        remaining = []
+        for entry in self._queue:
+            request = self.calls[entry[2]]
+            if (
+                self._active < self.max_concurrent
+                and self._active_by_user.get(request.user_id, 0) < self.max_per_user
+                and self._active_by_destination.get(request.destination, 0) < self.max_per_destination
+            ):
+                self._start(request)
+            else:
+                remaining.append(entry)
+        self._queue = remaining
+
+    def _start(self, request: CallRequest):
+        request.state = DIALING
+        request.dialing_at = time.monotonic()
+        self._recent_waits = (self._recent_waits + [request.dialing_at - request.queued_at])[-500:]
+        self._active += 1
+        self._active_by_user[request.user_id] = self._active_by_user.get(request.user_id, 0) + 1
+        self._active_by_destination[request.destination] = self._active_by_destination.get(request.destination, 0) + 1
+        self._set_timer(request.call_id, self.connect_timeout, "no_answer")
+        self._notify(request)
+        self._spawn(self._dial(request))
+
+    async def _dial(self, request: CallRequest):
+        try:
+            request.call_sid = await self.dial(request)
+            print(f"Dialed call {request.call_id} ({request.call_sid})")
+        except Exception as e:
+            print(f"Error dialing call {request.call_id}: {e}")
+            self.mark_done(request.call_id, "failed", str(e))
+
+    def _release(self, request: CallRequest):
+        self._active -= 1
+        for counts, key in ((self._active_by_user, request.user_id), (self._active_by_destination, request.destination)):
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+
+    def _set_timer(self, call_id: str, delay: float, result: str):
+        self._cancel_timer(call_id)
+        self._timers[call_id] = asyncio.get_running_loop().call_later(delay, self._expire, call_id, result)
+
+    def _expire(self, call_id: str, result: str):
+        self._timers.pop(call_id, None)
+        if self.remote_status is None:
+            self.mark_done(call_id, result)
+        else:
+            self._spawn(self._check_expired(call_id, result))
+
+    async def _check_expired(self, call_id: str, result: str):
+        """Ends a call whose timer ran out, unless it is still running on another instance."""
+        request = self.calls.get(call_id)
+        if request is None or request.state == DONE:
+            return
+        state = request.state
+        try:
+            remote_state, remote_result = await self.remote_status(request)
+        except Exception as e:
+            print(f"Error checking the status of call {call_id}: {e}")
+            remote_state, remote_result = None, None
+        if request.state != state:
+            # It moved on while we looked, e.g. its stream connected here.
+            return
+        if remote_state == DONE:
+            self.mark_done(call_id, remote_result or "completed")
+        elif remote_state == IN_PROGRESS:
+            if request.state == DIALING:
+                # Connected to another instance: keep the slot until it ends there.
+                request.state = IN_PROGRESS
+                request.started_at = time.monotonic()
+                self._notify(request)
+            remaining = request.started_at + self.max_call_seconds - time.monotonic()
+            if remaining <= 0:
+                self.mark_done(call_id, "timed_out")
+            else:
+                self._set_timer(call_id, min(remaining, self.remote_check_interval), "timed_out")
+        else:
+            self.mark_done(call_id, result)
+
+    def _cancel_timer(self, call_id: str):
+        timer = self._timers.pop(call_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _notify(self, request: CallRequest):
+        if self.on_change is not None:
+            self._spawn(self.on_change(request))
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
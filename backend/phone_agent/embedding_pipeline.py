@@ -0,0 +1,151 @@
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+
+import google.genai
+from google.genai import errors
+from google.genai.types import EmbedContentConfig
+from google.cloud.firestore_v1.vector import Vector
+
+from embedding_profile import EMBEDDING_MODEL, get_embedding_profile
+
+
+class GeminiEmbeddingBackend:
+    """Embeds transcripts with several contents per embed_content request."""
+
+    def __init__(self, model: str = EMBEDDING_MODEL, output_dimensionality: Optional[int] = None):
+        self.model = model
+        # Defaults to the EMBEDDING_PROFILE shared with the scout agent's query embeddings.
+        self.output_dimensionality = output_dimensionality or get_embedding_profile().dimensionality
+        self._client = None
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        if self._client is None:
+            self._client = google.genai.Client()
+        try:
+            return await self._embed(texts)
+        except errors.ClientError as e:
+            # Some endpoints only accept one content per request; fall back to one request per text.
+            if len(texts) == 1 or e.code == 429:
+                raise
+            print(f"Batched embed_content rejected ({e.code}), embedding {len(texts)} texts individually.")
+            results = await asyncio.gather(*(self._embed([text]) for text in texts))
+            return [result[0] for result in results]
+
+    async def _embed(self, texts: list[str]) -> list[list[float]]:
+        response = await self._client.aio.models.embed_content(
+            model=self.model,
+            contents=texts,
+            config=EmbedContentConfig(
+                task_type="RETRIEVAL_DOCUMENT",
+                output_dimensionality=self.output_dimensionality,
+            ),
+        )
+        return [embedding.values for embedding in response.embeddings]
+
+
+class EmbeddingPipeline:
+    """In-process queue that embeds finished call transcripts in the background.
+
+    Transcripts are gathered into batches of up to `batch_size`, waiting at most
+    `max_wait` seconds for a batch to fill. Each batch is one backend request,
+    retried with backoff, and the resulting vectors are written back to
+    `provider_conversations` in a single Firestore batch.
+    """
+
+    def __init__(self, backend, db, batch_size: Optional[int] = None, max_wait: float = 2.0, max_retries: int = 3):
+        self.backend = backend
+        self.db = db
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "16"))
+        self.max_wait = max_wait
+        self.max_retries = max_retries
+        self.queue: asyncio.Queue[tuple[str, str]] = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+        self.started_at = time.monotonic()
+        self.embedded_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+        self.last_batch_seconds = 0.0
+
+    def submit(self, call_id: str, text: str):
+        """Queues a transcript for embedding. Never blocks."""
+        self.queue.put_nowait((call_id, text))
+
+    def start(self):
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Embeds what is already queued, then stops the worker."""
+        if self._worker is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Embedding pipeline stopped with {self.queue.qsize()} transcripts still queued.")
+        self._worker.cancel()
+        self._worker = None
+
+    def metrics(self) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        return {
+            "queue_depth": self.queue.qsize(),
+            "embedded_total": self.embedded_total,
+            "failed_total": self.failed_total,
+            "batches_total": self.batches_total,
+            "avg_batch_size": self.embedded_total / self.batches_total if self.batches_total else 0.0,
+            "last_batch_seconds": self.last_batch_seconds,
+            "throughput_per_minute": self.embedded_total / elapsed * 60 if elapsed else 0.0,
+        }
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = asyncio.get_running_loop().time() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await self._process(batch)
+            except Exception as e:
+                self.failed_total += len(batch)
+                print(f"Error embedding {len(batch)} transcripts: {e}")
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _process(self, batch: list[tuple[str, str]]):
+        start = time.monotonic()
+        embeddings = await self._embed_with_retry([text for _, text in batch])
+
+        write_batch = self.db.batch()
+        for (call_id, _), embedding in zip(batch, embeddings):
+            doc_ref = self.db.collection("provider_conversations").document(call_id)
+            write_batch.update(doc_ref, {"transcript_embedding": Vector(embedding), "embedding_dimensionality": len(embedding)})
+        await write_batch.commit()
+
+        self.batches_total += 1
+        self.embedded_total += len(batch)
+        self.last_batch_seconds = time.monotonic() - start
+        print(f"Saved {len(batch)} transcript embeddings in {self.last_batch_seconds:.2f}s.")
+
+    async def _embed_with_retry(self, texts: list[str]) -> list[list[float]]:
+        attempt = 0
+        while True:
+            try:
+                return await self.backend.embed(texts)
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = min(2 ** attempt, 30) * random.uniform(0.5, 1.0)
+                print(f"Embedding batch failed ({e}), retrying in {delay:.1f}s.")
+                await asyncio.sleep(delay)
@@ -0,0 +1,31 @@
+import os
+from typing import NamedTuple
+
+# Keep in sync with backend/scout_agent/embedding_profile.py: transcripts and
+# queries must be embedded with the same profile to be comparable.
+
+EMBEDDING_MODEL = "gemini-embedding-001"
+
+
+class EmbeddingProfile(NamedTuple):
+    name: str
+    dimensionality: int
+    # Storage format of the scout agent's local vector index.
+    quantization: str
+
+
+PROFILES = {
+    "full": EmbeddingProfile("full", 2048, "float32"),
+    "balanced": EmbeddingProfile("balanced", 768, "float32"),
+    "compact": EmbeddingProfile("compact", 768, "int8"),
+    "small": EmbeddingProfile("small", 256, "int8"),
+    "tiny": EmbeddingProfile("tiny", 256, "binary"),
+}
+
+
+def get_embedding_profile(name: str = None) -> EmbeddingProfile:
+    """Returns the named profile, or the one set by EMBEDDING_PROFILE (default "full")."""
+    name = name or os.getenv("EMBEDDING_PROFILE", "full")
+    if name not in PROFILES:
+        raise ValueError(f"Unknown embedding profile: {name} (expected one of {', '.join(PROFILES)})")
+    return PROFILES[name]
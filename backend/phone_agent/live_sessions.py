@@ -0,0 +1,178 @@
+import asyncio
+import os
+import time
+from typing import Optional
+
+from google.adk.agents import LiveRequestQueue
+from google.adk.agents.run_config import RunConfig
+from google.adk.runners import Runner
+
+
+class LiveSession:
+    """A Gemini Live session for one call.
+
+    `run_live` only connects once its events are iterated, so a background task
+    starts iterating right away and buffers events until the call handler reads
+    them with `events()`. The connection is set up while the phone is still
+    ringing instead of after the business picks up.
+    """
+
+    def __init__(self, call_id: str, runner: Runner, session, run_config: RunConfig):
+        self.call_id = call_id
+        self.session_id = session.id
+        self.live_request_queue = LiveRequestQueue()
+        self.created_at = time.monotonic()
+        self.warm = False
+        self.picked_up_at: Optional[float] = None
+        self.first_audio_at: Optional[float] = None
+        self._events: asyncio.Queue = asyncio.Queue()
+        live_events = runner.run_live(session=session, live_request_queue=self.live_request_queue, run_config=run_config)
+        self._session_service = runner.session_service
+        self._app_name = runner.app_name
+        self._cleanup: Optional[asyncio.Task] = None
+        self._task = asyncio.create_task(self._pump(live_events))
+        self._task.add_done_callback(self._delete_session)
+
+    async def events(self):
+        """Yields the session's events, including any that arrived before the call connected."""
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            if isinstance(event, Exception):
+                raise event
+            yield event
+
+    def mark_picked_up(self):
+        self.picked_up_at = time.monotonic()
+
+    def mark_first_audio(self) -> Optional[float]:
+        """Records the agent's first audio and returns the seconds since pickup, once."""
+        if self.first_audio_at is not None or self.picked_up_at is None:
+            return None
+        self.first_audio_at = time.monotonic()
+        return self.first_audio_at - self.picked_up_at
+
+    def close(self):
+        self.live_request_queue.close()
+        self._task.cancel()
+
+    def _delete_session(self, task: asyncio.Task):
+        # Nothing resumes a call's session once its live run is over.
+        self._cleanup = asyncio.create_task(self._session_service.delete_session(
+            app_name=self._app_name,
+            user_id=self.call_id,
+            session_id=self.session_id,
+        ))
+
+    async def _pump(self, live_events):
+        try:
+            async for event in live_events:
+                self._events.put_nowait(event)
+        except Exception as e:
+            self._events.put_nowait(e)
+        finally:
+            self._events.put_nowait(None)
+
+
+class LiveSessionPool:
+    """Live sessions prepared for calls that are dialing.
+
+    `prepare` is called as the phone starts ringing. It creates the ADK session
+    with the call's context in its state, which the agent instruction reads, and
+    connects to Gemini Live. `acquire` hands that session to the call's
+    websocket handler, or starts one cold if none was prepared. At most
+    `max_sessions` are kept ready at once; 0 turns prewarming off. Unclaimed
+    sessions are closed after `ttl` seconds.
+    """
+
+    def __init__(self, runner: Runner, run_config: RunConfig, max_sessions: Optional[int] = None, ttl: Optional[float] = None):
+        self.runner = runner
+        self.run_config = run_config
+        self.max_sessions = max_sessions if max_sessions is not None else int(os.getenv("LIVE_SESSION_POOL_SIZE", "10"))
+        self.ttl = ttl if ttl is not None else float(os.getenv("LIVE_SESSION_PREPARED_TTL", "120"))
+        self._prepared: dict[str, LiveSession] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+
+        self.warm_starts = 0
+        self.cold_starts = 0
+        self.expired = 0
+        self.pool_full = 0
+        self._first_audio: dict[bool, list[float]] = {True: [], False: []}
+
+    async def prepare(self, call_id: str, state: dict) -> bool:
+        """Connects a live session for the call ahead of pickup. Returns False if the pool is full."""
+        if call_id in self._prepared:
+            return True
+        if len(self._prepared) >= self.max_sessions:
+            self.pool_full += 1
+            return False
+        session = await self._start(call_id, state)
+        session.warm = True
+        self._prepared[call_id] = session
+        self._timers[call_id] = asyncio.get_running_loop().call_later(self.ttl, self._expire, call_id)
+        return True
+
+    async def acquire(self, call_id: str, state: dict) -> LiveSession:
+        """The call's prepared session, or a new one if it has none."""
+        session = self._take(call_id)
+        if session is not None:
+            self.warm_starts += 1
+            return session
+        self.cold_starts += 1
+        return await self._start(call_id, state)
+
+    def discard(self, call_id: str):
+        """Closes the call's prepared session, e.g. because the call was never answered."""
+        session = self._take(call_id)
+        if session is not None:
+            session.close()
+
+    def record_first_audio(self, session: LiveSession):
+        """Records time from pickup to the agent's first audio, the dead air the business hears."""
+        seconds = session.mark_first_audio()
+        if seconds is None:
+            return
+        print(f"First agent audio for call {session.call_id} {seconds * 1000:.0f}ms after pickup ({'warm' if session.warm else 'cold'} session)")
+        self._first_audio[session.warm] = (self._first_audio[session.warm] + [seconds])[-500:]
+
+    def stats(self) -> dict:
+        def percentiles(values: list[float]) -> dict:
+            values = sorted(values)
+            return {
+                "count": len(values),
+                "p50_ms": round(values[len(values) // 2] * 1000) if values else None,
+                "p95_ms": round(values[int(len(values) * 0.95)] * 1000) if values else None,
+            }
+
+        return {
+            "prepared": len(self._prepared),
+            "max_sessions": self.max_sessions,
+            "warm_starts": self.warm_starts,
+            "cold_starts": self.cold_starts,
+            "expired": self.expired,
+            "pool_full": self.pool_full,
+            "first_audio_warm": percentiles(self._first_audio[True]),
+            "first_audio_cold": percentiles(self._first_audio[False]),
+        }
+
+    async def _start(self, call_id: str, state: dict) -> LiveSession:
+        session = await self.runner.session_service.create_session(
+            app_name=self.runner.app_name,
+            user_id=call_id,
+            state=state,
+        )
+        return LiveSession(call_id, self.runner, session, self.run_config)
+
+    def _take(self, call_id: str) -> Optional[LiveSession]:
+        timer = self._timers.pop(call_id, None)
+        if timer is not None:
+            timer.cancel()
+        return self._prepared.pop(call_id, None)
+
+    def _expire(self, call_id: str):
+        self._timers.pop(call_id, None)
+        session = self._prepared.pop(call_id, None)
+        if session is not None:
+            self.expired += 1
+            session.close()
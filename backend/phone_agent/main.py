@@ -1,29 +1,36 @@
 import os
 import asyncio
 import base64
+import hmac
 import json
-import audioop
 from typing import Optional
 import uuid
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket
-from google.adk.agents import Agent, LiveRequestQueue
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from google.adk.agents import Agent
 from google.adk.agents.run_config import RunConfig
 from google.adk.runners import Runner
-from google.adk.sessions.in_memory_session_service import InMemorySessionService
 from google.cloud import firestore
-import google.genai
-from google.genai.types import EmbedContentConfig
 from google.genai import types
-from twilio.rest import Client
 from twilio.twiml.voice_response import VoiceResponse, Connect
-from google.cloud.firestore_v1.vector import Vector
 
-load_dotenv()
+from audio_buffer import InboundAudioBuffer
+from call_monitor import CallMonitor
+from call_scheduler import DONE, IN_PROGRESS, QUEUED, CallRequest, CallScheduler
+from embedding_pipeline import EmbeddingPipeline, GeminiEmbeddingBackend
+from firestore_db import db
+from geohash import geo_fields
+from live_sessions import LiveSession, LiveSessionPool
+from media_messages import parse_media
+from passages import build_passages
+from session_store import BoundedSessionService
+from playback import OutboundPlayback
+from transcoder import Transcoder, create_transcoder
+from transcript_writer import TranscriptWriter
+from twilio_client import close_twilio_client, get_twilio_client
 
-# --- Firestore ---
-db = firestore.Client()
+load_dotenv()
 
 def hang_up(outcome_summary: str, success: bool) -> str:
     """Tool to hang up the call.
@@ -47,7 +54,11 @@ def create_outreach_agent(model: str) -> Agent:
             politely end the conversation and call the hang_up tool. 
             The only tool you can use is hang_up, WHICH YOU SHOULD CALL EXACTLY ONCE AT THE END.
               If you don't know a detail like the customer's name or availability, DO NOT guess. Only give information you are provided with or 100 percent sure about.
-              Just end the conversation and make a note in the outcome summary if you are unsure.""",
+              Just end the conversation and make a note in the outcome summary if you are unsure.
+
+            This is the information about the customer: {user_context?}
+            Adopt their persona. Your goal on this call is to: {outcome?}
+            Be sure to ask any auxiliary questions that the user might want to know.""",
         description="Places outreach calls and saves the results in database.",
         tools=[hang_up],
     )
@@ -59,53 +70,67 @@ root_agent = create_outreach_agent(model="gemini-live-2.5-flash-preview-native-a
 # --- FastAPI App ---
 app = FastAPI()
 
+embedding_pipeline = EmbeddingPipeline(GeminiEmbeddingBackend(), db)
+
+@app.on_event("startup")
+async def startup_event():
+    """Starts background workers on app startup."""
+    embedding_pipeline.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Drains background work and closes pooled connections on app shutdown."""
+    await embedding_pipeline.stop()
+    await close_twilio_client()
+
+@app.get("/dialer/metrics")
+async def get_metrics():
+    """Reports background pipeline, call scheduler and session metrics."""
+    return {"embedding_pipeline": embedding_pipeline.metrics(), "call_scheduler": call_scheduler.snapshot(), "live_sessions": live_session_pool.stats(), "sessions": session_service.stats(), "call_monitor": call_monitor.stats()}
+
 # --- ADK Streaming ---
 APP_NAME = "outreach-agent"
-session_service = InMemorySessionService()
-
-async def start_agent_session(user_id, is_audio=False):
-    """Starts an agent session"""
-    runner = Runner(
-        app_name=APP_NAME,
-        agent=root_agent,
-        session_service=session_service,
-    )
-    session = await runner.session_service.create_session(
-        app_name=APP_NAME,
-        user_id=user_id,
-    )
-    
-    modality = "AUDIO" if is_audio else "TEXT"
-    run_config = RunConfig(response_modalities=[modality],    
-                            output_audio_transcription=types.AudioTranscriptionConfig(),
-    input_audio_transcription=types.AudioTranscriptionConfig())
-
-    live_request_queue = LiveRequestQueue()
-    live_events = runner.run_live(
-        session=session,
-        live_request_queue=live_request_queue,
-        run_config=run_config,
-    )
-    return live_events, live_request_queue
-
-async def agent_to_client_messaging(websocket: WebSocket, live_events, stream_sid_queue: asyncio.Queue, resample_state, call_id: str, call_sid: str):
+# Call sessions are deleted when the call ends; the caps only matter if that is missed
+session_service = BoundedSessionService()
+# One runner serves every call; sessions carry the per-call state.
+runner = Runner(
+    app_name=APP_NAME,
+    agent=root_agent,
+    session_service=session_service,
+)
+run_config = RunConfig(response_modalities=["AUDIO"],    
+                        output_audio_transcription=types.AudioTranscriptionConfig(),
+input_audio_transcription=types.AudioTranscriptionConfig())
+
+# Live sessions are connected while the phone rings, so the agent can speak as soon as the business picks up
+live_session_pool = LiveSessionPool(runner, run_config)
+
+# Live transcript, status and (optionally) audio of calls in progress, for /dialer/monitor watchers
+call_monitor = CallMonitor()
+
+def call_context(outcome: Optional[str], user_context: Optional[str]) -> dict:
+    """Session state the agent instruction is filled in from."""
+    return {"outcome": outcome or "", "user_context": user_context or ""}
+
+async def agent_to_client_messaging(playback: OutboundPlayback, live_session: LiveSession, stream_sid_queue: asyncio.Queue, transcoder: Transcoder, transcript: TranscriptWriter, call_id: str, call_sid: str):
     """Agent to client communication"""
     stream_sid = await stream_sid_queue.get()
-    transcript_parts = []
+    playback.start(stream_sid)
 
     try:
-        async for event in live_events:
-            if event.input_transcription:
-                transcript_parts.append({"role": "user", "timestamp": event.timestamp, "text": event.input_transcription})
-            if event.output_transcription:
-                transcript_parts.append({"role": "agent", "timestamp": event.timestamp, "text": event.output_transcription})
+        async for event in live_session.events():
+            if event.input_transcription and event.input_transcription.text:
+                transcript.add("user", event.input_transcription.text)
+                call_monitor.publish(call_id, {"type": "call_transcript", "role": "user", "text": event.input_transcription.text})
+            if event.output_transcription and event.output_transcription.text:
+                transcript.add("agent", event.output_transcription.text)
+                call_monitor.publish(call_id, {"type": "call_transcript", "role": "agent", "text": event.output_transcription.text})
 
             if event.turn_complete or event.interrupted:
-                message = {
-                    "event": "turn_complete" if event.turn_complete else "interrupted",
-                }
-                await websocket.send_text(json.dumps(message))
-                print(f"Event: {message['event']}")
+                # The business talked over the agent: drop queued agent speech right away.
+                if event.interrupted:
+                    await playback.interrupt()
+                print(f"Event: {'turn_complete' if event.turn_complete else 'interrupted'}")
                 continue
 
             part: types.Part = (
@@ -117,13 +142,12 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events, stream_si
 
             if part.function_call and part.function_call.name == "hang_up":
                 print("Agent called hang_up tool, ending call.")
-                message = {
-                    "event": "hang_up",
-                }
-                # sleep for 3 seconds
-                await asyncio.sleep(3)
-                twilio_client = Client(os.environ["TWILIO_ACCOUNT_SID"], os.environ["TWILIO_AUTH_TOKEN"])
-                twilio_client.calls(call_sid).update(status="completed")
+                # Let the goodbye finish playing before hanging up
+                await playback.wait_until_played(timeout=10)
+                try:
+                    await get_twilio_client().update_call(call_sid, status="completed")
+                except Exception as e:
+                    print(f"Error hanging up call {call_sid}: {e}")
 
                 if part.function_call.args:
                     try:
@@ -132,7 +156,7 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events, stream_si
                         success = args.get("success", False)
                         # update Firestore with outcome summary
                         doc_ref = db.collection("provider_conversations").document(call_id)
-                        doc_ref.update({
+                        await doc_ref.update({
                             "outcome_summary": outcome_summary,
                             "success": success
                         })
@@ -147,23 +171,12 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events, stream_si
                 if audio_data:
                     # The audio from Gemini is 16-bit linear PCM at 24kHz.
                     # Twilio needs 8-bit mu-law at 8kHz.
-                    # We need to resample from 24kHz to 8kHz, then convert to mu-law.
                     try:
-                        # Resample from 24kHz to 8kHz
-                        resampled_data, resample_state.to_twilio = audioop.ratecv(audio_data, 2, 1, 24000, 8000, resample_state.to_twilio)
-                        
-                        # Convert 16-bit linear PCM to 8-bit mu-law
-                        mulaw_audio = audioop.lin2ulaw(resampled_data, 2)
-                        
-                        media_message = {
-                            "event": "media",
-                            "streamSid": stream_sid, 
-                            "media": {
-                                "payload": base64.b64encode(mulaw_audio).decode("ascii")
-                            }
-                        }
-                        await websocket.send_text(json.dumps(media_message))
-                    except audioop.error as e:
+                        mulaw_audio = transcoder.to_twilio(audio_data)
+                        playback.enqueue(mulaw_audio)
+                        live_session_pool.record_first_audio(live_session)
+                        call_monitor.publish_audio(call_id, "agent", mulaw_audio)
+                    except ValueError as e:
                         print(f"Audio conversion error: {e}. Audio data might not be 16-bit linear PCM.")
 
                     continue
@@ -171,27 +184,31 @@ async def agent_to_client_messaging(websocket: WebSocket, live_events, stream_si
     except Exception as e:
         print(f"Error in agent_to_client_messaging: {e}")
     finally:
-        print("TRANSCRIPT", transcript_parts)
-        # merge contiguous transcript parts with the same role
-        merged_transcript_parts = []
-        transcript_parts_sorted = sorted(transcript_parts, key=lambda x: x["timestamp"])
-        for part in transcript_parts_sorted:
-            if (
-                merged_transcript_parts
-                and merged_transcript_parts[-1]["role"] == part["role"]
-            ):
-                merged_transcript_parts[-1]["text"].text += " " + part["text"].text
-            else:
-                merged_transcript_parts.append(part)
-
-        return merged_transcript_parts
-
-
-async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: LiveRequestQueue, stream_sid_queue: asyncio.Queue, resample_state, call_id: str, user_context: str):
+        playback.close()
+
+
+async def client_to_agent_messaging(websocket: WebSocket, live_session: LiveSession, stream_sid_queue: asyncio.Queue, transcoder: Transcoder, playback: OutboundPlayback, call_id: str):
     """Client to agent communication"""
     stream_sid = None
+    live_request_queue = live_session.live_request_queue
+
+    # Twilio sends 8-bit mu-law audio at 8kHz. Gemini requires 16-bit linear PCM at 16kHz.
+    # Frames are coalesced first so Gemini gets fewer, larger realtime blobs.
+    def send_audio(mulaw_audio: bytes):
+        resampled_data = transcoder.to_gemini(mulaw_audio)
+        live_request_queue.send_realtime(types.Blob(data=resampled_data, mime_type="audio/l16;rate=16000"))
+
+    inbound_buffer = InboundAudioBuffer(send_audio)
     while True:
         message_json = await websocket.receive_text()
+
+        # Media frames are the bulk of the traffic, so skip full JSON parsing for them
+        frame = parse_media(message_json)
+        if frame:
+            inbound_buffer.push(frame.payload, frame.chunk)
+            call_monitor.publish_audio(call_id, "business", frame.payload)
+            continue
+
         message = json.loads(message_json)
 
         if message["event"] == "start":
@@ -199,42 +216,24 @@ async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: Li
             await stream_sid_queue.put(stream_sid)
             print(f"Twilio stream started: {stream_sid} for call_id: {call_id}")
 
-            if call_id:
-                # Retrieve call details from Firestore
-                doc_ref = db.collection("provider_conversations").document(call_id)
-                doc = doc_ref.get()
-                if doc.exists:
-                    call_data = doc.to_dict()
-                    outcome = call_data.get("outcome")
-                    phone_number = call_data.get("phone_number")
-                    
-                    # Greet and initiate the conversation
-                    initial_text = f"""You are a customer.
-                    This is the information about the customer: {user_context}. 
-                    Adopt their persona. 
-                    You are speaking to a business on the phone and acting as the customer to achieve a goal.
-                      Your goal is to: {outcome}. Start the conversation now with a greeting, and remember that if you don't know something, DO NOT GUESS. Make a note in the outcome summary and end the call. Be sure to ask any auxiliary questions that the user might want to know."""
-                    print(f"Sending initial prompt to agent: {initial_text}")
-                    content = types.Content(role="user", parts=[types.Part.from_text(text=initial_text)])
-                    live_request_queue.send_content(content=content)
-                else:
-                    print(f"Could not find call data in Firestore for call_id: {call_id}")
+            # The call context is already in the session's instruction, so a short cue is enough to start talking
+            live_session.mark_picked_up()
+            live_request_queue.send_content(content=types.Content(role="user", parts=[types.Part.from_text(text="The business has picked up the phone. Start the conversation now with a greeting.")]))
 
 
         if message["event"] == "media":
-            payload = message["media"]["payload"]
-            decoded_data = base64.b64decode(payload)
-            
-            # Twilio sends 8-bit mu-law audio. We need to convert it to 16-bit linear PCM for Gemini.
-            pcm_data = audioop.ulaw2lin(decoded_data, 2)
-            
-            # Gemini requires 16kHz audio. Twilio sends 8kHz. We need to resample.
-            resampled_data, resample_state.from_twilio = audioop.ratecv(pcm_data, 2, 1, 8000, 16000, resample_state.from_twilio)
-            
-            live_request_queue.send_realtime(types.Blob(data=resampled_data, mime_type="audio/l16;rate=16000"))
+            media = message["media"]
+            chunk = media.get("chunk")
+            payload = base64.b64decode(media["payload"])
+            inbound_buffer.push(payload, int(chunk) if chunk is not None else None)
+            call_monitor.publish_audio(call_id, "business", payload)
+
+        if message["event"] == "mark":
+            playback.on_mark(message["mark"]["name"])
 
         if message["event"] == "stop":
             print(f"Twilio stream stopped: {stream_sid}")
+            inbound_buffer.close()
             live_request_queue.send_content(content=types.Content(role="user", parts=[types.Part.from_text(text="Business hung up, please call the hang_up tool.")]))
             return
 
@@ -245,130 +244,243 @@ async def websocket_endpoint(websocket: WebSocket, call_id: str):
     print(f"Twilio client connected for call: {call_id}")
 
     doc_ref = db.collection("provider_conversations").document(call_id)
-    doc = doc_ref.get()
+    doc = await doc_ref.get()
     if doc.exists:
         call_data = doc.to_dict()
         call_sid = call_data.get("twilio_sid")
         biz_description = call_data.get("biz_description")
-        user_context = call_data.get("user_context", "")
     else:
         print(f"Could not find call data in Firestore for call_id: {call_id}, returning")
+        call_scheduler.mark_done(call_id, "failed", "call data not found")
         return
 
+    # Twilio may connect the stream to an instance other than the one that dialed; the document tells that one.
+    if not call_scheduler.mark_in_progress(call_id):
+        await record_remote_status(doc_ref, {"call_status": IN_PROGRESS})
+    call_monitor.stream_started(call_id)
     print(f"Starting agent session for call_sid: {call_sid}")
 
-    live_events, live_request_queue = await start_agent_session(call_id, is_audio=True)
+    live_session = await live_session_pool.acquire(call_id, call_context(call_data.get("outcome"), call_data.get("user_context")))
     
     stream_sid_queue = asyncio.Queue()
 
-    # Use a state management object for resampling
-    class ResampleState:
-        def __init__(self):
-            self.from_twilio = None
-            self.to_twilio = None
-
-    resample_state = ResampleState()    
+    # Each call gets its own transcoder so resampler state is not shared between streams
+    transcoder = create_transcoder()
+    playback = OutboundPlayback(websocket)
+    # Saved in batches during the call, so it survives a crash and can be read while the call runs
+    transcript = TranscriptWriter(doc_ref)
 
     agent_to_client_task = asyncio.create_task(
-        agent_to_client_messaging(websocket, live_events, stream_sid_queue, resample_state, call_id, call_sid)
+        agent_to_client_messaging(playback, live_session, stream_sid_queue, transcoder, transcript, call_id, call_sid)
     )
     client_to_agent_task = asyncio.create_task(
-        client_to_agent_messaging(websocket, live_request_queue, stream_sid_queue, resample_state, call_id, user_context)
+        client_to_agent_messaging(websocket, live_session, stream_sid_queue, transcoder, playback, call_id)
     )
 
     tasks = [agent_to_client_task, client_to_agent_task]
     await asyncio.wait(tasks, return_when=asyncio.ALL_COMPLETED)
 
     # --- Save Transcript ---
-    # The agent_to_client_task will return the transcript parts when it's done.
-    # We need to cancel the task to get the return value if it hasn't finished.
+    # Most of it is already saved; write the last turns, then read the whole thing back for passages and embedding.
     try:
-        transcript_parts = await agent_to_client_task
-        processed_transcript = [{"role": part["role"], "text": part["text"].text} for part in transcript_parts]
+        await transcript.close()
+        doc = await doc_ref.get()
+        saved_turns = sorted(doc.to_dict().get("transcript", []), key=lambda turn: turn.get("turn", 0))
+        processed_transcript = [{"role": turn["role"], "text": turn["text"]} for turn in saved_turns]
         print(f"Processed Transcript: {processed_transcript}")
 
-        # Create embedding
+        await doc_ref.update({
+            # Scored once here so retrieval can pick snippets without re-reading whole transcripts
+            "transcript_passages": build_passages(processed_transcript),
+            "first_audio_ms": round((live_session.first_audio_at - live_session.picked_up_at) * 1000) if live_session.first_audio_at else None,
+            "warm_session": live_session.warm,
+        })
+        print(f"Saved transcript for call {call_id} to Firestore ({transcript.turns} turns in {transcript.writes} writes).")
+
+        # Embed in the background so the handler can finish right away
         transcript_text = " ".join([f"{t['role']}: {t['text']} \n" for t in processed_transcript])
-        embedding = None
         if transcript_text:
-            try:
-                client = google.genai.Client()
-                response = client.models.embed_content(
-                    model="gemini-embedding-001",
-                    contents=[
-                        biz_description + "\n" + transcript_text
-                    ],
-                    config=EmbedContentConfig(
-                        task_type="RETRIEVAL_DOCUMENT",  # Optional
-                        output_dimensionality=2048,  # Optional
-                        # title="Driver's License",  # Optional
-                    ),
-                )   
-                embedding = response.embeddings[0].values
-            except Exception as e:
-                print(f"Error creating embedding: {e}")
-
-        try:
-            doc_ref = db.collection("provider_conversations").document(call_id)
-            update_data = {"transcript": processed_transcript}
-            if embedding:
-                update_data["transcript_embedding"] = Vector(embedding)
-            doc_ref.update(update_data)
-            print(f"Saved transcript and embedding for call {call_id} to Firestore.")
-        except Exception as e:
-            print(f"Error saving transcript for call {call_id}: {e}")
-    except asyncio.CancelledError:
-        print("Agent to client task was cancelled, transcript not saved.")
+            embedding_pipeline.submit(call_id, (biz_description or "") + "\n" + transcript_text)
+    except Exception as e:
+        print(f"Error saving transcript for call {call_id}: {e}")
 
 
-    live_request_queue.close()
+    live_session.close()
+    call_monitor.stream_ended(call_id)
+    if not call_scheduler.mark_done(call_id):
+        await record_remote_status(doc_ref, {"call_status": DONE, "call_result": "completed"})
     print(f"Twilio client disconnected: {call_id}")
     return
 
 
 # --- Twilio Integration ---
-@app.post("/dialer/initiate_call")
-async def initiate_call(initiator_user_id: str, phone_number: str, outcome: str, biz_name: str, biz_description: Optional[str] = None, lat: Optional[float] = None, lng: Optional[float] = None, session_id: Optional[str] = None, user_context: str = ""):
-    """Initiates a call to the given phone number."""
+async def dial_call(request: CallRequest) -> str:
+    """Places a scheduled call with Twilio and returns its SID."""
     server_url = os.environ.get("PHONE_AGENT_SERVER_HOST")
-    if not server_url:
-        raise ValueError("PHONE_AGENT_SERVER_HOST environment variable not set.")
 
-    client = Client(os.environ["TWILIO_ACCOUNT_SID"], os.environ["TWILIO_AUTH_TOKEN"])
-    
-    call_id = str(uuid.uuid4())
+    # Connect the agent while the phone rings; the call goes ahead with a cold start if this fails
+    try:
+        await live_session_pool.prepare(request.call_id, request.context)
+    except Exception as e:
+        print(f"Error preparing live session for call {request.call_id}: {e}")
 
     response = VoiceResponse()
     connect = Connect()
-    connect.stream(url=f"wss://{server_url}/dialer/ws/{call_id}") 
+    connect.stream(url=f"wss://{server_url}/dialer/ws/{request.call_id}") 
     response.append(connect)
     response.pause(length=30) # Keep the call alive for a bit
 
-    call = client.calls.create(
-        # to=phone_number,
-        to=initiator_user_id,
+    call = await get_twilio_client().create_call(
+        # to=request.destination,
+        to=request.user_id,
         from_=os.getenv("TWILIO_PHONE_NUMBER"),
         twiml=str(response)
     )
+    await db.collection("provider_conversations").document(request.call_id).update({"twilio_sid": call["sid"]})
+    return call["sid"]
+
+async def record_remote_status(doc_ref, update: dict):
+    """Records the state of a call this instance streams but didn't dial."""
+    try:
+        await doc_ref.update(update)
+    except Exception as e:
+        print(f"Error recording status for call {doc_ref.id}: {e}")
+
+async def get_remote_status(request: CallRequest) -> tuple[Optional[str], Optional[str]]:
+    """The call's state and result as recorded in its document, by whichever instance streams it."""
+    doc = await db.collection("provider_conversations").document(request.call_id).get()
+    data = doc.to_dict() if doc.exists else {}
+    return data.get("call_status"), data.get("call_result")
+
+@firestore.async_transactional
+async def write_final_status(transaction, doc_ref, update: dict) -> bool:
+    """Writes a done call's status, unless the document shows the call went on elsewhere."""
+    snapshot = await doc_ref.get(transaction=transaction)
+    current = snapshot.to_dict() if snapshot.exists else {}
+    if current.get("call_status") == DONE:
+        return False
+    # The stream connected on another instance just as the connect timer ran out here.
+    if update["call_result"] == "no_answer" and current.get("call_status") == IN_PROGRESS:
+        return False
+    transaction.update(doc_ref, update)
+    return True
+
+async def record_call_status(request: CallRequest):
+    """Mirrors scheduler state into the call document."""
+    update = {"call_status": request.state, "call_result": request.result}
+    # Calls that never reached the business still need an outcome, or the scout agent waits for one forever.
+    if request.result in ("failed", "no_answer", "cancelled"):
+        update["outcome_summary"] = f"The call was not completed ({request.result.replace('_', ' ')}{': ' + request.error if request.error else ''})."
+        update["success"] = False
+    if request.state == DONE:
+        live_session_pool.discard(request.call_id)
+    doc_ref = db.collection("provider_conversations").document(request.call_id)
+    try:
+        if request.state == DONE:
+            # A timer on this instance must not overwrite what the instance streaming the call recorded.
+            if not await write_final_status(db.transaction(), doc_ref, update):
+                print(f"Call {request.call_id} was handled on another instance; not recording {request.result}.")
+                return
+        else:
+            await doc_ref.update(update)
+    except Exception as e:
+        print(f"Error recording status for call {request.call_id}: {e}")
+    # A call past its time limit is hung up; the websocket handler then saves the transcript as usual.
+    if request.result == "timed_out" and request.call_sid:
+        try:
+            await get_twilio_client().update_call(request.call_sid, status="completed")
+        except Exception as e:
+            print(f"Error hanging up call {request.call_sid}: {e}")
+
+call_scheduler = CallScheduler(dial_call, on_change=record_call_status, remote_status=get_remote_status)
+
+@app.post("/dialer/initiate_call")
+async def initiate_call(initiator_user_id: str, phone_number: str, outcome: str, biz_name: str, biz_description: Optional[str] = None, lat: Optional[float] = None, lng: Optional[float] = None, session_id: Optional[str] = None, user_context: str = "", priority: int = 0):
+    """Queues a call to the given phone number. Higher priority calls are dialed first."""
+    server_url = os.environ.get("PHONE_AGENT_SERVER_HOST")
+    if not server_url:
+        raise ValueError("PHONE_AGENT_SERVER_HOST environment variable not set.")
+
+    call_id = str(uuid.uuid4())
 
     # Store initial call info in Firestore
     doc_ref = db.collection("provider_conversations").document(call_id)
-    doc_ref.set({
+    await doc_ref.set({
         "initiator_user_id": initiator_user_id,
         "session_id": session_id,
         "outcome": outcome,
-        "twilio_sid": call.sid,
+        "twilio_sid": None,
         "phone_number": phone_number,
         "biz_name": biz_name,
         "biz_description": biz_description,
-        "lat": lat,
-        "lng": lng,
+        **geo_fields(lat, lng),
         "timestamp": firestore.SERVER_TIMESTAMP,
         "transcript": [],
         "user_context": user_context,
+        "call_status": QUEUED,
     })
 
-    return {"status": "call_initiated", "sid": call.sid, "call_id": call_id}
+    # Different spellings of one number count against the same per-destination limit
+    destination = "".join(c for c in phone_number if c.isdigit())[-10:] or phone_number
+    request = call_scheduler.submit(CallRequest(call_id=call_id, user_id=initiator_user_id, destination=destination, priority=priority, context=call_context(outcome, user_context)))
+
+    return {"status": request.state, "call_id": call_id, "position": call_scheduler.position(call_id)}
+
+@app.get("/dialer/calls/{call_id}")
+async def get_call_status(call_id: str):
+    """Reports where a call is in the queued/dialing/in_progress/done lifecycle."""
+    request = call_scheduler.calls.get(call_id)
+    if request is None:
+        raise HTTPException(status_code=404, detail="Unknown call")
+    return {**request.status(), "position": call_scheduler.position(call_id)}
+
+@app.delete("/dialer/calls/{call_id}")
+async def cancel_call(call_id: str):
+    """Cancels a call that is still queued."""
+    if not call_scheduler.cancel(call_id):
+        raise HTTPException(status_code=409, detail="Call is not queued")
+    return {"status": "cancelled", "call_id": call_id}
+
+@app.websocket("/dialer/monitor/{call_id}")
+async def monitor_call(websocket: WebSocket, call_id: str, audio: bool = False):
+    """Streams a call's status, transcript fragments and, with ?audio=true, its audio while it runs.
+
+    Messages are JSON with a `type` of call_status, call_transcript, call_audio
+    or call_ended; the stream closes after call_ended. A watcher that can't keep
+    up loses messages (audio first) instead of slowing the call down. Any
+    instance can serve it, but audio only flows from the one streaming the call.
+
+    Only the scout agent may watch calls: it sends CALL_MONITOR_SECRET in the
+    X-Call-Monitor-Secret header, and the handshake is refused otherwise.
+    """
+    secret = os.getenv("CALL_MONITOR_SECRET")
+    if not secret or not hmac.compare_digest(websocket.headers.get("x-call-monitor-secret", "").encode(), secret.encode()):
+        if not secret:
+            print("CALL_MONITOR_SECRET is not set; refusing call monitor connections.")
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+
+    subscriber = call_monitor.subscribe(call_id, audio)
+
+    async def watch_disconnect():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = [asyncio.create_task(call_monitor.serve(websocket, call_id, subscriber)), asyncio.create_task(watch_disconnect())]
+    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    call_monitor.unsubscribe(call_id, subscriber)
+    try:
+        await websocket.close()
+    except (RuntimeError, WebSocketDisconnect):
+        pass
+
+@app.get("/dialer/scheduler")
+async def get_scheduler_status():
+    """Reports queue depth, active calls, limits and queue wait times."""
+    return call_scheduler.snapshot()
 
 # --- Main Application Setup ---
 if __name__ == "__main__":
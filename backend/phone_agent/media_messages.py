@@ -0,0 +1,59 @@
+import binascii
+import json
+from typing import NamedTuple, Optional
+
+# Fast paths for the Twilio media stream envelope, which is sent and received
+# 50 times a second per call. Anything that is not a media frame goes through json.
+
+
+class MediaFrame(NamedTuple):
+    payload: bytes
+    chunk: Optional[int]
+
+
+_MEDIA_EVENT_PREFIX = '{"event":"media"'
+_PAYLOAD_KEY = '"payload":"'
+_CHUNK_KEY = '"chunk":"'
+
+
+def parse_media(raw: str) -> Optional[MediaFrame]:
+    """Pulls the payload (and chunk number) out of a Twilio media message without parsing the rest.
+
+    Returns None if the message is not a media frame in Twilio's compact form;
+    the caller should fall back to json.loads.
+    """
+    if not raw.startswith(_MEDIA_EVENT_PREFIX):
+        return None
+    start = raw.find(_PAYLOAD_KEY)
+    if start < 0:
+        return None
+    start += len(_PAYLOAD_KEY)
+    end = raw.find('"', start)
+    if end < 0:
+        return None
+
+    chunk = None
+    chunk_start = raw.find(_CHUNK_KEY)
+    if chunk_start >= 0:
+        chunk_start += len(_CHUNK_KEY)
+        chunk = int(raw[chunk_start:raw.find('"', chunk_start)])
+    return MediaFrame(binascii.a2b_base64(raw[start:end]), chunk)
+
+
+class TwilioMessages:
+    """Pre-rendered outbound messages for one Twilio stream."""
+
+    def __init__(self, stream_sid: str):
+        sid = json.dumps(stream_sid)
+        self._media_prefix = '{"event":"media","streamSid":' + sid + ',"media":{"payload":"'
+        self._mark_prefix = '{"event":"mark","streamSid":' + sid + ',"mark":{"name":'
+        self._clear = '{"event":"clear","streamSid":' + sid + '}'
+
+    def media(self, mulaw_audio: bytes) -> str:
+        return self._media_prefix + binascii.b2a_base64(mulaw_audio, newline=False).decode("ascii") + '"}}'
+
+    def mark(self, name: str) -> str:
+        return self._mark_prefix + json.dumps(name) + '}}'
+
+    def clear(self) -> str:
+        return self._clear
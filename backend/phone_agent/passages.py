@@ -0,0 +1,66 @@
+import re
+
+# Keep in sync with backend/scout_agent/passages.py: the phone agent scores
+# passages when it saves a transcript and the scout agent picks among them.
+
+# Words, money amounts ("$150", "$1,200.50"), times ("10:30") and zip codes all stay whole tokens.
+TOKEN_PATTERN = re.compile(r"\$?\d+(?:[.,:]\d+)*|\w+")
+FACT_PATTERN = re.compile(
+    r"\$\d|\d+:\d\d|\b\d+\s*(?:am|pm|dollars|hours?|days?|weeks?|minutes?)\b"
+    r"|\b(?:mon|tues|wednes|thurs|fri|satur|sun)day\b|\btoday\b|\btomorrow\b",
+    re.IGNORECASE,
+)
+# Turns this short ("Hello?", "Okay.") rarely carry anything worth quoting.
+MIN_USEFUL_TERMS = 4
+
+
+def tokenize(text: str) -> list[str]:
+    return [token.replace(",", "") for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def build_passages(transcript: list[dict]) -> list[dict]:
+    """Splits a transcript into scored passages for snippet extraction.
+
+    Each passage is one exchange: the business's turn plus the agent turn right
+    before it, so an answer keeps its question. The query-independent parts of
+    the score are computed here, once, when the transcript is saved:
+      - `terms`: distinct tokens, for matching query terms
+      - `tokens`: estimated token cost of `text`
+      - `salience`: how likely the passage is to hold a fact worth quoting
+        (prices, times, days), favouring substantive business turns
+    """
+    passages = []
+    pending_question = None
+    for index, turn in enumerate(transcript):
+        line = f"{turn['role']}: {turn['text']}"
+        if turn["role"] == "agent":
+            if pending_question is not None:
+                passages.append(_passage(pending_question[0], [pending_question[1]], is_answer=False))
+            pending_question = (index, line)
+            continue
+        lines = [line]
+        start = index
+        if pending_question is not None:
+            start, question = pending_question
+            lines.insert(0, question)
+            pending_question = None
+        passages.append(_passage(start, lines, is_answer=True))
+    if pending_question is not None:
+        passages.append(_passage(pending_question[0], [pending_question[1]], is_answer=False))
+    return passages
+
+
+def _passage(turn: int, lines: list[str], is_answer: bool) -> dict:
+    text = "\n".join(lines)
+    terms = sorted(set(tokenize(text)))
+    answer_terms = len(set(tokenize(lines[-1]))) if is_answer else 0
+    salience = 0.0
+    if is_answer and answer_terms >= MIN_USEFUL_TERMS:
+        salience += 1.0
+    salience += min(len(FACT_PATTERN.findall(lines[-1])), 3) * 0.5
+    return {"turn": turn, "text": text, "tokens": estimate_tokens(text), "terms": terms, "salience": salience}
@@ -0,0 +1,116 @@
+import asyncio
+import os
+from collections import deque
+from typing import Optional
+
+from fastapi import WebSocket
+
+from audio_buffer import TWILIO_FRAME_BYTES, TWILIO_FRAME_MS
+from media_messages import TwilioMessages
+
+
+class OutboundPlayback:
+    """Paces agent audio to Twilio in 20ms frames and supports barge-in.
+
+    Frames are sent no more than `lead_ms` ahead of real time, so Twilio only ever
+    holds a frame or two of agent speech. A Twilio `mark` is sent every
+    `mark_every` frames and at the end of each burst; Twilio echoes it back once
+    the audio before it has played, which is how playback position is tracked.
+    `interrupt` drops everything queued locally and sends a Twilio `clear`.
+    """
+
+    def __init__(self, websocket: WebSocket, lead_ms: Optional[int] = None, mark_every: int = 10):
+        self.websocket = websocket
+        self.lead = (lead_ms if lead_ms is not None else int(os.getenv("OUTBOUND_AUDIO_LEAD_MS", "60"))) / 1000
+        self.mark_every = mark_every
+        self.messages: Optional[TwilioMessages] = None
+
+        self.frames: deque[bytes] = deque()
+        self.sent_frames = 0
+        self.played_frames = 0
+        self._pending_marks: dict[str, int] = {}
+        self._mark_counter = 0
+        self._unmarked_frames = 0
+        self._playout_time = 0.0
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, stream_sid: str):
+        """Starts sending to the given Twilio stream."""
+        self.messages = TwilioMessages(stream_sid)
+        self._task = asyncio.create_task(self._run())
+
+    def enqueue(self, mulaw_audio: bytes):
+        """Queues mu-law audio for playback."""
+        for i in range(0, len(mulaw_audio), TWILIO_FRAME_BYTES):
+            self.frames.append(mulaw_audio[i:i + TWILIO_FRAME_BYTES])
+        if self.frames:
+            self._idle.clear()
+            self._wakeup.set()
+
+    async def interrupt(self):
+        """Stops agent speech immediately: drops queued frames and clears Twilio's buffer."""
+        self.frames.clear()
+        self._pending_marks.clear()
+        self._unmarked_frames = 0
+        self._playout_time = 0.0
+        self.played_frames = self.sent_frames
+        self._idle.set()
+        if self.messages:
+            await self.websocket.send_text(self.messages.clear())
+
+    def on_mark(self, name: str):
+        """Handles a `mark` event echoed back by Twilio."""
+        # Marks cleared by `interrupt` are not in the table anymore and are ignored.
+        position = self._pending_marks.pop(name, None)
+        if position is not None:
+            self.played_frames = max(self.played_frames, position)
+        if not self.frames and not self._pending_marks and not self._unmarked_frames:
+            self._idle.set()
+
+    async def wait_until_played(self, timeout: float):
+        """Waits until all queued audio has been played by Twilio, or the timeout passes."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+        except asyncio.TimeoutError:
+            print(f"Playback did not finish within {timeout}s, {len(self.frames)} frames still queued.")
+
+    def close(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self.frames:
+                self._wakeup.clear()
+                if self._unmarked_frames:
+                    # End of a burst: mark it so we know when it has finished playing.
+                    await self._send_mark()
+                    continue
+                await self._wakeup.wait()
+                continue
+
+            # Stay at most `lead` seconds ahead of what Twilio has played out.
+            now = loop.time()
+            ahead = self._playout_time - now
+            if ahead > self.lead:
+                await asyncio.sleep(ahead - self.lead)
+                continue
+
+            frame = self.frames.popleft()
+            await self.websocket.send_text(self.messages.media(frame))
+            self._playout_time = max(self._playout_time, now) + TWILIO_FRAME_MS / 1000
+            self.sent_frames += 1
+            self._unmarked_frames += 1
+            if self._unmarked_frames >= self.mark_every:
+                await self._send_mark()
+
+    async def _send_mark(self):
+        self._mark_counter += 1
+        name = str(self._mark_counter)
+        self._pending_marks[name] = self.sent_frames
+        self._unmarked_frames = 0
+        await self.websocket.send_text(self.messages.mark(name))
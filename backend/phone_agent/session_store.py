@@ -0,0 +1,164 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import InMemorySessionService, Session
+from google.adk.sessions.base_session_service import GetSessionConfig
+
+# Keep in sync with backend/scout_agent/session_store.py: both services bound their
+# ADK sessions the same way.
+
+SessionKey = tuple[str, str, str]  # (app_name, user_id, session_id)
+
+
+class BoundedSessionService(InMemorySessionService):
+    """InMemorySessionService that forgets sessions instead of keeping them until restart.
+
+    Sessions unused for `ttl` seconds are dropped. Once there are more than
+    `max_sessions`, or their estimated size passes `max_bytes`, released
+    sessions are evicted, least recently used first. Size is estimated from
+    the serialized session and events; the live objects take several times
+    that. Sessions still in use are never evicted for size, however long they
+    sit idle (e.g. a websocket waiting on a call), so a burst of them runs over
+    the caps instead of breaking them; `stats` reports when that happens.
+
+    Callers end a session with `delete_session` once it can't be used again, or
+    with `release` if it may be resumed (e.g. a websocket that may reconnect).
+    Released sessions expire after `released_ttl`.
+    """
+
+    def __init__(
+        self,
+        max_sessions: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = None,
+        released_ttl: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        super().__init__()
+        self.max_sessions = max_sessions or int(os.getenv("SESSION_MAX_COUNT", "1000"))
+        self.max_bytes = max_bytes or int(float(os.getenv("SESSION_MAX_MB", "256")) * 1024 * 1024)
+        self.ttl = ttl or float(os.getenv("SESSION_TTL_SECONDS", "7200"))
+        self.released_ttl = released_ttl or float(os.getenv("SESSION_RELEASED_TTL_SECONDS", "900"))
+        self._clock = clock
+
+        # Both ordered by last use, oldest first.
+        self._active: OrderedDict[SessionKey, float] = OrderedDict()
+        self._released: OrderedDict[SessionKey, float] = OrderedDict()
+        self._bytes: dict[SessionKey, int] = {}
+        self.bytes_retained = 0
+
+        self.deleted = 0
+        self.expired = 0
+        self.evicted = 0
+        self.over_caps = 0
+
+    # --- Session service ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        self._sweep()
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        key = (app_name, user_id, session.id)
+        self._active[key] = self._clock()
+        self._resize(key, len(session.model_dump_json(exclude_none=True)))
+        self._evict()
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        self._sweep()
+        session = await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+        if session is not None:
+            self._touch((app_name, user_id, session.id))
+        return session
+
+    async def append_event(self, session: Session, event: Event) -> Event:
+        event = await super().append_event(session=session, event=event)
+        key = (session.app_name, session.user_id, session.id)
+        if not event.partial and key in self._bytes:
+            serialized = event.model_dump_json(exclude_none=True)
+            self._resize(key, self._bytes[key] + len(serialized))
+            self._touch(key)
+            self._event_appended(key, event, serialized)
+            self._evict()
+        return event
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._prune_user(app_name, user_id)
+        if self._forget((app_name, user_id, session_id)):
+            self.deleted += 1
+
+    # --- Lifecycle ---
+    def release(self, app_name: str, user_id: str, session_id: str):
+        """Marks a session as no longer in use, but worth keeping for a while in case it is resumed."""
+        key = (app_name, user_id, session_id)
+        if self._active.pop(key, None) is not None:
+            self._released[key] = self._clock()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._active) + len(self._released),
+            "released": len(self._released),
+            "bytes_retained": self.bytes_retained,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "deleted": self.deleted,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            # Session writes made while over the caps, with no released session left to evict.
+            "over_caps": self.over_caps,
+        }
+
+    # --- Internals ---
+    def _event_appended(self, key: SessionKey, event: Event, serialized: str):
+        """Called with each stored event, already serialized. For subclasses that persist them."""
+
+    def _touch(self, key: SessionKey):
+        # A released session that is used again (e.g. a reconnect) is active again.
+        self._released.pop(key, None)
+        if key in self._bytes:
+            self._active[key] = self._clock()
+            self._active.move_to_end(key)
+
+    def _resize(self, key: SessionKey, size: int):
+        self.bytes_retained += size - self._bytes.get(key, 0)
+        self._bytes[key] = size
+
+    def _forget(self, key: SessionKey) -> bool:
+        if key not in self._bytes:
+            return False
+        self._active.pop(key, None)
+        self._released.pop(key, None)
+        self.bytes_retained -= self._bytes.pop(key)
+        return True
+
+    def _prune_user(self, app_name: str, user_id: str):
+        # Calls use their call ID as user ID, so empty per-user maps would pile up too.
+        if not self.sessions.get(app_name, {}).get(user_id, True):
+            del self.sessions[app_name][user_id]
+
+    def _drop(self, key: SessionKey):
+        app_name, user_id, session_id = key
+        self._delete_session_impl(app_name=app_name, user_id=user_id, session_id=session_id)
+        self._prune_user(app_name, user_id)
+        self._forget(key)
+
+    def _sweep(self):
+        """Drops expired sessions. Both orders are by last use, so only the oldest need checking."""
+        now = self._clock()
+        for sessions, ttl in ((self._active, self.ttl), (self._released, self.released_ttl)):
+            while sessions:
+                key, last_used = next(iter(sessions.items()))
+                if now - last_used < ttl:
+                    break
+                self._drop(key)
+                self.expired += 1
+
+    def _evict(self):
+        while len(self._bytes) > self.max_sessions or self.bytes_retained > self.max_bytes:
+            if not self._released:
+                self.over_caps += 1
+                return
+            self._drop(next(iter(self._released)))
+            self.evicted += 1
@@ -0,0 +1,202 @@
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+import numpy as np
+
+# Twilio media streams carry 8-bit mu-law at 8kHz.
+# Gemini Live takes 16-bit linear PCM at 16kHz and returns 16-bit linear PCM at 24kHz.
+TWILIO_RATE = 8000
+GEMINI_INPUT_RATE = 16000
+GEMINI_OUTPUT_RATE = 24000
+
+
+# --- mu-law tables (bit-exact with audioop) ---
+def _build_ulaw_decode_table() -> np.ndarray:
+    u = ~np.arange(256, dtype=np.int32) & 0xFF
+    t = ((u & 0x0F) << 3) + 0x84
+    t <<= (u & 0x70) >> 4
+    return np.where(u & 0x80, 0x84 - t, t - 0x84).astype(np.int16)
+
+
+def _build_ulaw_encode_table() -> np.ndarray:
+    # Indexed by the int16 sample reinterpreted as uint16.
+    samples = np.arange(65536, dtype=np.uint16).view(np.int16).astype(np.int32)
+    pcm = samples >> 2
+    mask = np.where(pcm < 0, 0x7F, 0xFF)
+    pcm = np.minimum(np.abs(pcm), 8159) + (0x84 >> 2)
+    seg_end = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+    seg = np.searchsorted(seg_end, pcm, side="left")
+    uval = (seg << 4) | ((pcm >> (seg + 1)) & 0x0F)
+    uval = np.where(seg >= 8, 0x7F, uval)
+    return (uval ^ mask).astype(np.uint8)
+
+
+ULAW_DECODE_TABLE = _build_ulaw_decode_table()
+ULAW_ENCODE_TABLE = _build_ulaw_encode_table()
+
+
+def ulaw_to_pcm16(data: bytes) -> np.ndarray:
+    """Decodes mu-law bytes into int16 samples."""
+    return ULAW_DECODE_TABLE[np.frombuffer(data, dtype=np.uint8)]
+
+
+def pcm16_to_ulaw(samples: np.ndarray) -> bytes:
+    """Encodes int16 samples into mu-law bytes."""
+    return ULAW_ENCODE_TABLE[samples.astype(np.int16, copy=False).view(np.uint16)].tobytes()
+
+
+# --- Polyphase resampler ---
+def _design_lowpass(up: int, down: int, zero_crossings: int) -> np.ndarray:
+    """Windowed-sinc anti-aliasing filter at the upsampled rate, length a multiple of `up`."""
+    factor = max(up, down)
+    length = 2 * zero_crossings * factor
+    length += (-length) % up
+    cutoff = 0.5 / factor * 0.95
+    n = np.arange(length) - (length - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(length, 8.0)
+    # Zero-stuffing divides the signal energy by `up`, so each phase gets unity DC gain.
+    return h / h.sum() * up
+
+
+class PolyphaseResampler:
+    """Stateful rational resampler (up/down) for mono 16-bit PCM.
+
+    Keeps the tail of the previous chunk and the fractional output position,
+    so a stream fed in arbitrarily sized chunks is resampled exactly as if it
+    had arrived in one piece.
+    """
+
+    def __init__(self, up: int, down: int, zero_crossings: int = 6):
+        self.up = up
+        self.down = down
+        h = _design_lowpass(up, down, zero_crossings)
+        self.taps = len(h) // up
+        # phases[p] holds the taps for phase p, reversed so a window dot phase is the convolution.
+        self.phases = np.ascontiguousarray(h.reshape(self.taps, up).T[:, ::-1])
+        self.reset()
+
+    def reset(self):
+        self.history = np.zeros(self.taps - 1)
+        self.position = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        n = len(samples)
+        if n == 0:
+            return np.zeros(0, dtype=np.int16)
+
+        span = n * self.up - self.position
+        count = -(-span // self.down) if span > 0 else 0
+        buf = np.concatenate((self.history, samples))
+
+        if self.down == 1:
+            # Pure interpolation: every input sample yields one output per phase.
+            out = np.empty((n, self.up))
+            for p in range(self.up):
+                out[:, p] = np.correlate(buf, self.phases[p], "valid")
+            out = out.ravel()
+        elif self.up == 1:
+            # Pure decimation: only compute the windows that are kept.
+            windows = np.lib.stride_tricks.sliding_window_view(buf, self.taps)
+            # BLAS is much faster on a contiguous copy than on the strided view.
+            out = np.ascontiguousarray(windows[self.position::self.down][:count]) @ self.phases[0]
+        else:
+            positions = self.position + self.down * np.arange(count)
+            indices = positions // self.up
+            out = np.empty(count)
+            phase = positions % self.up
+            for p in range(self.up):
+                selected = phase == p
+                out[selected] = np.correlate(buf, self.phases[p], "valid")[indices[selected]]
+
+        self.position += self.down * count - n * self.up
+        self.history = buf[len(buf) - (self.taps - 1):]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+# --- Transcoders ---
+class Transcoder(ABC):
+    """Per-call audio conversion between Twilio and Gemini Live.
+
+    Implementations keep their own resampler state, so create one per call.
+    Conversion failures are raised as ValueError.
+    """
+
+    @abstractmethod
+    def to_gemini(self, mulaw_audio: bytes) -> bytes:
+        """Converts 8kHz mu-law from Twilio into 16kHz 16-bit PCM for Gemini."""
+
+    @abstractmethod
+    def to_twilio(self, pcm_audio: bytes) -> bytes:
+        """Converts 24kHz 16-bit PCM from Gemini into 8kHz mu-law for Twilio."""
+
+
+class NumpyTranscoder(Transcoder):
+    """Table-driven mu-law codec with polyphase resampling.
+
+    Low-pass filters before decimating, so the agent's 24kHz speech doesn't
+    alias into the 8kHz call the way audioop's unfiltered ratecv lets it.
+    Slower than audioop at call frame sizes (see bench_transcoder.py).
+    """
+
+    def __init__(self):
+        self.from_twilio = PolyphaseResampler(GEMINI_INPUT_RATE // TWILIO_RATE, 1)
+        self.to_twilio_resampler = PolyphaseResampler(1, GEMINI_OUTPUT_RATE // TWILIO_RATE)
+        # Gemini chunks are not guaranteed to end on a sample boundary.
+        self._carry = b""
+
+    def to_gemini(self, mulaw_audio: bytes) -> bytes:
+        return self.from_twilio.process(ulaw_to_pcm16(mulaw_audio)).tobytes()
+
+    def to_twilio(self, pcm_audio: bytes) -> bytes:
+        if self._carry:
+            pcm_audio = self._carry + pcm_audio
+        usable = len(pcm_audio) & ~1
+        self._carry = pcm_audio[usable:]
+        samples = np.frombuffer(pcm_audio, dtype="<i2", count=usable // 2)
+        return pcm16_to_ulaw(self.to_twilio_resampler.process(samples))
+
+
+class AudioopTranscoder(Transcoder):
+    """The original audioop path, and the default: cheapest on CPU at call frame sizes."""
+
+    def __init__(self):
+        import audioop
+        self._audioop = audioop
+        self.from_twilio = None
+        self.to_twilio_state = None
+
+    def to_gemini(self, mulaw_audio: bytes) -> bytes:
+        try:
+            pcm_data = self._audioop.ulaw2lin(mulaw_audio, 2)
+            resampled, self.from_twilio = self._audioop.ratecv(pcm_data, 2, 1, TWILIO_RATE, GEMINI_INPUT_RATE, self.from_twilio)
+            return resampled
+        except self._audioop.error as e:
+            raise ValueError(str(e)) from e
+
+    def to_twilio(self, pcm_audio: bytes) -> bytes:
+        try:
+            resampled, self.to_twilio_state = self._audioop.ratecv(pcm_audio, 2, 1, GEMINI_OUTPUT_RATE, TWILIO_RATE, self.to_twilio_state)
+            return self._audioop.lin2ulaw(resampled, 2)
+        except self._audioop.error as e:
+            raise ValueError(str(e)) from e
+
+
+TRANSCODERS = {
+    "numpy": NumpyTranscoder,
+    "audioop": AudioopTranscoder,
+}
+
+
+def create_transcoder(name: Optional[str] = None) -> Transcoder:
+    """Creates a transcoder for one call.
+
+    Args:
+        name: The transcoder implementation. Defaults to the AUDIO_TRANSCODER environment variable, then "audioop".
+    Returns:
+        A new Transcoder with fresh resampler state.
+    """
+    name = name or os.getenv("AUDIO_TRANSCODER", "audioop")
+    if name not in TRANSCODERS:
+        raise ValueError(f"Unknown transcoder: {name}. Choose from {', '.join(TRANSCODERS)}.")
+    return TRANSCODERS[name]()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import time
+from typing import Callable, Optional
+
+from google.cloud import firestore
+
+
+class TranscriptWriter:
+    """Builds a call's transcript as transcription events arrive and saves it as it goes.
+
+    Consecutive fragments from the same speaker are merged into one turn;
+    `add` only appends to the open turn, and a turn's text is joined once, when
+    the other side starts speaking. Finished turns are appended to the call
+    document's `transcript` in batches, once `flush_turns` have piled up or
+    `flush_interval` seconds have passed, together with the still-open turn in
+    `transcript_partial`. Only unsaved turns are held in memory, and a crash
+    mid-call loses at most the last batch.
+
+    Each turn carries its index (`turn`), which keeps otherwise identical
+    turns ("Yes.") distinct under ArrayUnion.
+    """
+
+    def __init__(self, doc_ref, flush_turns: Optional[int] = None, flush_interval: Optional[float] = None, clock: Callable[[], float] = time.monotonic):
+        self.doc_ref = doc_ref
+        self.flush_turns = flush_turns or int(os.getenv("TRANSCRIPT_FLUSH_TURNS", "4"))
+        self.flush_interval = flush_interval or float(os.getenv("TRANSCRIPT_FLUSH_SECONDS", "5"))
+        self._clock = clock
+
+        self._role: Optional[str] = None
+        self._fragments: list[str] = []
+        self._pending: list[dict] = []
+        self._partial_changed = False
+        self._last_flush = clock()
+        self._flushing: Optional[asyncio.Task] = None
+
+        self.turns = 0
+        self.writes = 0
+        self.write_errors = 0
+
+    def add(self, role: str, text: Optional[str]):
+        """Adds a transcription fragment. Never waits on Firestore."""
+        if not text:
+            return
+        if role != self._role:
+            self._close_turn()
+            self._role = role
+        self._fragments.append(text)
+        self._partial_changed = True
+        if len(self._pending) >= self.flush_turns or self._clock() - self._last_flush >= self.flush_interval:
+            self._start_flush()
+
+    async def close(self):
+        """Saves everything, including the last turn, and clears `transcript_partial`."""
+        self._close_turn()
+        if self._flushing is not None:
+            await self._flushing
+        for _ in range(3):
+            await self._flush()
+            if not self._pending and not self._partial_changed:
+                return
+
+    def _close_turn(self):
+        if self._fragments:
+            self._pending.append({"role": self._role, "text": " ".join(self._fragments), "turn": self.turns})
+            self.turns += 1
+            self._fragments = []
+            self._partial_changed = True
+
+    def _start_flush(self):
+        # One write at a time; whatever arrives meanwhile goes out with the next one.
+        if self._flushing is None or self._flushing.done():
+            self._flushing = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        self._last_flush = self._clock()
+        if not self._pending and not self._partial_changed:
+            return
+        turns, self._pending = self._pending, []
+        self._partial_changed = False
+        update = {"transcript_partial": {"role": self._role, "text": " ".join(self._fragments)} if self._fragments else firestore.DELETE_FIELD}
+        if turns:
+            update["transcript"] = firestore.ArrayUnion(turns)
+        try:
+            await self.doc_ref.update(update)
+            self.writes += 1
+        except Exception as e:
+            # Keep the turns for the next write.
+            self.write_errors += 1
+            self._pending = turns + self._pending
+            self._partial_changed = True
+            print(f"Error saving transcript batch: {e}")
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import random
+from typing import Optional
+
+import httpx
+
+# Twilio REST calls share one keep-alive connection pool per process and never block the event loop.
+# Point TWILIO_API_BASE_URL at a local fake server to exercise this without a Twilio account.
+DEFAULT_BASE_URL = "https://api.twilio.com"
+API_VERSION = "2010-04-01"
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TwilioRequestError(Exception):
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class AsyncTwilioClient:
+    """Minimal async client for the Twilio Calls API.
+
+    Requests are capped at `max_concurrency` in flight and retried with exponential
+    backoff. Call creation is only retried when Twilio cannot have acted on the
+    request (connection failures and 429s), so a retry never dials twice.
+    """
+
+    def __init__(self, account_sid: str, auth_token: str, base_url: str = DEFAULT_BASE_URL, max_concurrency: int = 10, max_retries: int = 3, timeout: float = 10.0):
+        self.account_sid = account_sid
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            auth=(account_sid, auth_token),
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency, keepalive_expiry=60),
+        )
+
+    async def create_call(self, to: str, from_: str, twiml: str) -> dict:
+        """Places a call. Returns Twilio's call resource, including its `sid`."""
+        return await self._request("/Calls.json", {"To": to, "From": from_, "Twiml": twiml}, idempotent=False)
+
+    async def update_call(self, call_sid: str, **params) -> dict:
+        """Updates a call, e.g. `update_call(sid, status="completed")` to hang up."""
+        data = {key[0].upper() + key[1:]: value for key, value in params.items()}
+        return await self._request(f"/Calls/{call_sid}.json", data, idempotent=True)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def _request(self, path: str, data: dict, idempotent: bool) -> dict:
+        url = f"/{API_VERSION}/Accounts/{self.account_sid}{path}"
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self._client.post(url, data=data)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                error = TwilioRequestError(f"Could not reach Twilio: {e}")
+            except httpx.TransportError as e:
+                # The request may have reached Twilio, so only retry if repeating it is harmless.
+                error = TwilioRequestError(f"Twilio request failed: {e}")
+                if not idempotent:
+                    raise error from e
+            else:
+                if response.is_success:
+                    return response.json()
+                error = TwilioRequestError(f"Twilio returned {response.status_code}: {response.text}", response.status_code)
+                retryable = response.status_code == 429 or (idempotent and response.status_code in RETRYABLE_STATUS)
+                if not retryable:
+                    raise error
+
+            attempt += 1
+            if attempt > self.max_retries:
+                raise error
+            await asyncio.sleep(min(0.25 * 2 ** attempt, 4.0) * random.uniform(0.5, 1.0))
+
+
+_client: Optional[AsyncTwilioClient] = None
+
+
+def get_twilio_client() -> AsyncTwilioClient:
+    """Returns the process-wide Twilio client, creating it on first use."""
+    global _client
+    if _client is None:
+        _client = AsyncTwilioClient(
+            os.environ["TWILIO_ACCOUNT_SID"],
+            os.environ["TWILIO_AUTH_TOKEN"],
+            base_url=os.getenv("TWILIO_API_BASE_URL", DEFAULT_BASE_URL),
+            max_concurrency=int(os.getenv("TWILIO_MAX_CONCURRENCY", "10")),
+        )
+    return _client
+
+
+async def close_twilio_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
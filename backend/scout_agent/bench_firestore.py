@@ -0,0 +1,78 @@
+"""Benchmark: blocking vs async Firestore reads under concurrent websocket load.
+
+Each simulated websocket ticks every 20ms like an audio stream and records how late
+each tick fires. Meanwhile request handlers read session documents, either with the
+sync client called inline (the old code) or with the shared AsyncClient.
+
+Needs Firestore credentials, or the emulator via FIRESTORE_EMULATOR_HOST.
+Run from backend/scout_agent with `python3 bench_firestore.py [websockets] [requests]`.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from google.cloud import firestore
+
+from firestore_db import db
+
+COLLECTION = "bench_sessions"
+DOCS = 50
+FRAME_INTERVAL = 0.02
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] * 1000
+
+
+async def audio_stream(lateness: list, stop: asyncio.Event):
+    loop = asyncio.get_running_loop()
+    next_tick = loop.time() + FRAME_INTERVAL
+    while not stop.is_set():
+        await asyncio.sleep(max(0, next_tick - loop.time()))
+        lateness.append(loop.time() - next_tick)
+        next_tick += FRAME_INTERVAL
+
+
+async def run(name: str, read, websockets: int, requests: int):
+    lateness, latencies = [], []
+    stop = asyncio.Event()
+    streams = [asyncio.create_task(audio_stream(lateness, stop)) for _ in range(websockets)]
+
+    async def handler(i: int):
+        start = time.perf_counter()
+        await read(f"doc-{i % DOCS}")
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(handler(i) for i in range(requests)))
+    stop.set()
+    await asyncio.gather(*streams)
+
+    print(f"{name}:")
+    print(f"  read latency  p50 {percentile(latencies, 0.5):7.1f} ms  p99 {percentile(latencies, 0.99):7.1f} ms")
+    print(f"  audio tick lateness  mean {statistics.mean(lateness) * 1000:6.1f} ms  p99 {percentile(lateness, 0.99):6.1f} ms  max {max(lateness) * 1000:6.1f} ms")
+
+
+async def main():
+    websockets = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    for i in range(DOCS):
+        await db.collection(COLLECTION).document(f"doc-{i}").set({"user_id": f"user-{i}", "title": "Bench"})
+
+    sync_db = firestore.Client()
+
+    async def sync_read(doc_id: str):
+        # What the handlers used to do: a blocking round trip inside a coroutine
+        sync_db.collection(COLLECTION).document(doc_id).get()
+
+    async def async_read(doc_id: str):
+        await db.collection(COLLECTION).document(doc_id).get()
+
+    await run("sync client", sync_read, websockets, requests)
+    await run("async client", async_read, websockets, requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
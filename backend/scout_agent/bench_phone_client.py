@@ -0,0 +1,142 @@
+"""Benchmark: initiating calls with a new sync client per call vs the shared async client.
+
+Starts a local fake phone agent over TLS (self-signed) that answers
+/dialer/initiate_call after a short processing delay and adds a simulated network
+round trip to every new connection, standing in for the TCP+TLS setup to a
+remote PHONE_AGENT_SERVER_HOST. Each mode places calls from many concurrent
+"sessions" while a ticker task measures how long the event loop stalls, which is
+what other users' audio would feel. Runs offline.
+
+The fake server speaks HTTP/1.1 only, so this measures connection reuse and loop
+blocking, not HTTP/2 multiplexing.
+
+Run from backend/scout_agent with `python3 bench_phone_client.py [calls] [concurrency]`.
+"""
+import asyncio
+import datetime
+import json
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+CONNECT_LATENCY = 0.05
+PROCESSING_LATENCY = 0.01
+
+
+class FakePhoneAgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        FakePhoneAgentHandler.connections += 1
+        time.sleep(CONNECT_LATENCY)
+        super().setup()
+
+    def do_POST(self):
+        time.sleep(PROCESSING_LATENCY)
+        payload = json.dumps({"status": "queued", "call_id": "bench", "position": 0}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def self_signed_context(directory: str) -> ssl.SSLContext:
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now).not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256()))
+    cert_path, key_path = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+    with open(cert_path, "wb") as f:
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    with open(key_path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()))
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert_path, key_path)
+    return context
+
+
+PARAMS = {"initiator_user_id": "+15550000000", "phone_number": "(415) 555-0100", "outcome": "quote", "biz_name": "Bench Plumbing"}
+
+
+async def initiate_per_call_client(base_url: str) -> None:
+    # What initiate_outcall used to do: a new synchronous client, inside an async tool.
+    with httpx.Client(verify=False) as client:
+        client.post(f"{base_url}/dialer/initiate_call", params=PARAMS).raise_for_status()
+
+
+async def run(initiate, calls: int, concurrency: int) -> tuple[list[float], float]:
+    latencies = []
+    stalls = [0.0]
+    stop = asyncio.Event()
+
+    async def ticker():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - started - 0.005)
+
+    async def session(n: int):
+        for _ in range(n):
+            started = time.perf_counter()
+            await initiate()
+            latencies.append(time.perf_counter() - started)
+
+    tick = asyncio.create_task(ticker())
+    await asyncio.gather(*(session(calls // concurrency) for _ in range(concurrency)))
+    stop.set()
+    await tick
+    return latencies, max(stalls)
+
+
+async def main_async(base_url: str, calls: int, concurrency: int):
+    from phone_client import PhoneAgentClient
+
+    shared = PhoneAgentClient(base_url, verify=False)
+    modes = (
+        ("new sync client per call", lambda: initiate_per_call_client(base_url)),
+        ("shared async client", lambda: shared.initiate_call(PARAMS)),
+    )
+    for label, initiate in modes:
+        FakePhoneAgentHandler.connections = 0
+        started = time.perf_counter()
+        latencies, max_stall = await run(initiate, calls, concurrency)
+        elapsed = time.perf_counter() - started
+        latencies.sort()
+        print(f"{label}: {calls} calls in {elapsed:.2f}s over {FakePhoneAgentHandler.connections} connections")
+        print(f"  initiate p50 {statistics.median(latencies) * 1000:.0f}ms, p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms, "
+              f"max event loop stall {max_stall * 1000:.0f}ms")
+    await shared.close()
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as directory:
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FakePhoneAgentHandler)
+        server.socket = self_signed_context(directory).wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        asyncio.run(main_async(f"https://127.0.0.1:{server.server_port}", calls, concurrency))
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Benchmark: Places lookups with and without the shared TTL cache.
+
+Starts a local fake Places Text Search server that serves three pages per
+query, then runs many simulated sessions that call get_phone_numbers_tool
+concurrently with overlapping (query, geo) pairs, the way several users hunting
+for plumbers in the same city would. Reports how many requests reached the fake
+server, when the first candidates reached each session's channel, full call
+latency and the cache metrics. Runs offline; no Maps key needed.
+
+Run from backend/scout_agent with `python3 bench_places_cache.py [sessions] [distinct_queries]`.
+"""
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+UPSTREAM_LATENCY = 0.3
+PAGES = 3
+PAGE_SIZE = 20
+
+
+class FakePlacesHandler(BaseHTTPRequestHandler):
+    requests_served = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        FakePlacesHandler.requests_served += 1
+        time.sleep(UPSTREAM_LATENCY)
+        page = int(body.get("pageToken", "0"))
+        places = [
+            {
+                "displayName": {"text": f"{body['textQuery']} #{i}"},
+                "nationalPhoneNumber": f"(415) 555-{i:04d}",
+                "location": {"latitude": 37.77 + i / 1000, "longitude": -122.42},
+            }
+            for i in range(page * PAGE_SIZE, (page + 1) * PAGE_SIZE)
+        ]
+        response = {"places": places}
+        if page + 1 < PAGES:
+            response["nextPageToken"] = str(page + 1)
+        payload = json.dumps(response).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+async def run_sessions(tool, sessions: int, distinct: int) -> tuple[list[float], list[float]]:
+    from session_channel import session_channels
+
+    async def session(i: int) -> tuple[float, float]:
+        session_id = f"bench-{i}"
+        channel = session_channels.open(session_id)
+        started = time.perf_counter()
+        # Vary case and spacing so the normalized key is what gets shared.
+        query = f"Plumbers  {i % distinct}" if i % 2 else f"plumbers {i % distinct}"
+        first = asyncio.create_task(channel.queue.get())
+        await tool(query, "San Francisco, CA", SimpleNamespace(state={}, session=SimpleNamespace(id=session_id)))
+        total = time.perf_counter() - started
+        await first
+        session_channels.close(session_id, channel)
+        return first_seen[session_id] - started, total
+
+    first_seen = {}
+    original_publish = session_channels.publish
+
+    def publish(session_id, message):
+        first_seen.setdefault(session_id, time.perf_counter())
+        return original_publish(session_id, message)
+
+    session_channels.publish = publish
+    results = await asyncio.gather(*(session(i) for i in range(sessions)))
+    session_channels.publish = original_publish
+    return [first for first, _ in results], [total for _, total in results]
+
+
+async def run_waves(tool, sessions: int, distinct: int):
+    from places_client import close_places_client
+
+    # Two waves: concurrent first lookups, then repeats a moment later.
+    try:
+        return await run_sessions(tool, sessions, distinct), await run_sessions(tool, sessions, distinct)
+    finally:
+        await close_places_client()
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    distinct = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakePlacesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ["GOOGLE_PLACES_API_BASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ.setdefault("GOOGLE_MAPS_API_KEY", "fake")
+
+    from tools import get_phone_numbers_tool as module
+
+    for label, ttl in (("in-flight dedup only (ttl=0)", 0.0), ("ttl cache", 900.0)):
+        module.places_cache.__init__(ttl=ttl, max_entries=512)
+        FakePlacesHandler.requests_served = 0
+        with contextlib.redirect_stdout(io.StringIO()):
+            (first, total), (repeat_first, repeat_total) = asyncio.run(run_waves(module.get_phone_numbers_tool, sessions, distinct))
+        print(f"{label}: {FakePlacesHandler.requests_served} upstream requests for {2 * sessions} lookups")
+        for wave, (firsts, totals) in (("first wave", (first, total)), ("repeat wave", (repeat_first, repeat_total))):
+            print(f"  {wave}: first candidates p50 {statistics.median(firsts) * 1000:.0f}ms, "
+                  f"all pages p50 {statistics.median(totals) * 1000:.0f}ms")
+        print(f"  {module.places_cache.stats()}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
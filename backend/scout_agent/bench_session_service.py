@@ -0,0 +1,100 @@
+"""Benchmark: session service throughput, in memory vs persisted to SQLite.
+
+Simulates many concurrent scout sessions, each running turns the way the live
+agent does: read the session, append a few events (one carrying a state
+update). Compares the plain in-memory service, PersistentSessionService with
+write-behind batching, and the same service flushed after every event
+(write-through). Then measures a cold read-through: a second "instance"
+resuming the sessions from the shared database. Runs offline in a temporary
+directory.
+
+Run from backend/scout_agent with `python3 bench_session_service.py [sessions] [turns]`.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from google.adk.events import Event, EventActions
+from google.adk.sessions import InMemorySessionService
+from google.genai import types
+
+from persistent_sessions import PersistentSessionService, SqliteSessionStore
+
+APP_NAME = "ServiceScout"
+EVENTS_PER_TURN = 3
+
+
+async def run_turns(service, sessions: int, turns: int, write_through: bool = False) -> float:
+    async def session(i: int):
+        user_id, session_id = f"+1555000{i:04d}", f"session-{i}"
+        await service.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id, state={})
+        for turn in range(turns):
+            current = await service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+            for n in range(EVENTS_PER_TURN):
+                delta = {"request_summary": f"Water heater quotes, turn {turn}"} if n == 0 else {}
+                await service.append_event(current, Event(
+                    author="servicescout_root_agent",
+                    invocation_id=f"{session_id}-{turn}",
+                    content=types.Content(role="model", parts=[types.Part.from_text(text=f"Turn {turn}, part {n}: calling three plumbers near you now.")]),
+                    actions=EventActions(state_delta=delta),
+                ))
+                if write_through:
+                    await service.flush()
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    await service.flush()
+    return time.perf_counter() - started
+
+
+async def cold_reads(service, sessions: int) -> list[float]:
+    latencies = []
+    for i in range(sessions):
+        started = time.perf_counter()
+        await service.get_session(app_name=APP_NAME, user_id=f"+1555000{i:04d}", session_id=f"session-{i}")
+        latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main_async(directory: str, sessions: int, turns: int):
+    operations = sessions * turns * (1 + EVENTS_PER_TURN)
+    modes = (
+        ("in memory", lambda path: InMemorySessionService(), False),
+        ("sqlite, write-behind", lambda path: PersistentSessionService(SqliteSessionStore(path)), False),
+        ("sqlite, write-through", lambda path: PersistentSessionService(SqliteSessionStore(path)), True),
+    )
+    for label, factory, write_through in modes:
+        path = os.path.join(directory, f"{label.replace(' ', '').replace(',', '-')}.db")
+        service = factory(path)
+        elapsed = await run_turns(service, sessions, turns, write_through)
+        extra = ""
+        if isinstance(service, PersistentSessionService):
+            stats = service.stats()
+            extra = f", {stats['flushes']} flushes, cache hit rate {stats['cache_hit_rate']:.2f}"
+        print(f"{label}: {operations / elapsed:,.0f} ops/s ({elapsed:.2f}s{extra})")
+
+        if label == "sqlite, write-behind":
+            # Another instance sharing the database resumes every session.
+            other = PersistentSessionService(SqliteSessionStore(path))
+            latencies = await cold_reads(other, sessions)
+            warm = await cold_reads(other, sessions)
+            print(f"  resume on another instance: cold p50 {statistics.median(latencies) * 1000:.2f}ms, "
+                  f"then cached p50 {statistics.median(warm) * 1000:.3f}ms")
+            await other.close()
+        if isinstance(service, PersistentSessionService):
+            await service.close()
+
+
+def main():
+    sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    turns = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(main_async(directory, sessions, turns))
+
+
+if __name__ == "__main__":
+    main()
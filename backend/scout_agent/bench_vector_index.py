@@ -0,0 +1,73 @@
+"""Benchmark: local IVF vector index vs brute-force cosine search.
+
+Builds an index over synthetic clustered embeddings (conversations about the same
+kind of job land near each other, like real transcripts do), then measures
+recall@k and per-query latency at several nprobe settings against exact search.
+Runs offline; no Firestore or Gemini access needed.
+
+Run from backend/scout_agent with `python3 bench_vector_index.py [vectors] [dim] [queries]`.
+"""
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from vector_index import VectorIndex
+
+TOPICS = 200
+LIMIT = 5
+
+
+def synthetic_vectors(n: int, dim: int, rng) -> np.ndarray:
+    topics = rng.standard_normal((TOPICS, dim)).astype(np.float32)
+    labels = rng.integers(TOPICS, size=n)
+    return topics[labels] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+
+
+def measure(search, queries, truth):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len({doc_id for doc_id, _ in found} & expected) / len(expected))
+    latencies.sort()
+    return (
+        statistics.mean(recalls),
+        statistics.median(latencies) * 1000,
+        latencies[int(len(latencies) * 0.99)] * 1000,
+    )
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    dim = int(sys.argv[2]) if len(sys.argv) > 2 else 768
+    num_queries = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    rng = np.random.default_rng(0)
+
+    vectors = synthetic_vectors(n, dim, rng)
+    queries = synthetic_vectors(num_queries, dim, rng)
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = VectorIndex(dim, directory)
+        started = time.perf_counter()
+        for i, vector in enumerate(vectors):
+            index.upsert(f"doc{i}", vector)
+        print(f"Inserted {n} x {dim} vectors in {time.perf_counter() - started:.1f}s")
+        started = time.perf_counter()
+        index.train()
+        print(f"Trained {len(index.centroids)} clusters in {time.perf_counter() - started:.1f}s\n")
+
+        truth = [{doc_id for doc_id, _ in index.brute_force(q, LIMIT)} for q in queries]
+        print(f"{'search':<16}{'recall@' + str(LIMIT):>10}{'p50 ms':>10}{'p99 ms':>10}")
+        recall, p50, p99 = measure(lambda q: index.brute_force(q, LIMIT), queries, truth)
+        print(f"{'brute force':<16}{recall:>10.3f}{p50:>10.2f}{p99:>10.2f}")
+        for nprobe in (1, 4, 8, 16, 32):
+            recall, p50, p99 = measure(lambda q: index.search(q, LIMIT, nprobe=nprobe), queries, truth)
+            print(f"{'ivf nprobe=' + str(nprobe):<16}{recall:>10.3f}{p50:>10.2f}{p99:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
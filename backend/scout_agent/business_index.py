@@ -0,0 +1,119 @@
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, NamedTuple, Optional
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from firestore_db import db
+
+DEFAULT_COUNTRY_CODE = os.getenv("DEFAULT_PHONE_COUNTRY_CODE", "1")
+# Businesses called this recently by another session are not called again.
+REDIAL_COOLDOWN = timedelta(hours=float(os.getenv("REDIAL_COOLDOWN_HOURS", "24")))
+# Businesses called this recently are flagged to the agent with the last outcome.
+RECENT_CONTACT_WINDOW = timedelta(days=float(os.getenv("RECENT_CONTACT_DAYS", "30")))
+# Calls that never reached the business tell other sessions nothing, so they don't count as contact.
+NO_RESULT_CALLS = {"failed", "no_answer", "cancelled"}
+# Firestore caps "in" filters at 30 values.
+MAX_PHONES_PER_QUERY = 30
+CONTACT_FIELDS = ["phone_number", "biz_name", "timestamp", "session_id", "outcome_summary", "success", "call_status", "call_result"]
+
+
+def normalize_phone(raw: Optional[str], default_country_code: str = DEFAULT_COUNTRY_CODE) -> Optional[str]:
+    """Normalizes a phone number to E.164 ("+14155551234"), or None if it can't be.
+
+    Handles the formats Places and the agent produce: national ("(415) 555-1234"),
+    international ("+1 415-555-1234") and bare digits. Numbers without a country
+    code are assumed to be in `default_country_code`.
+    """
+    if not raw:
+        return None
+    raw = raw.strip()
+    digits = re.sub(r"\D", "", raw)
+    if raw.startswith("+"):
+        pass
+    elif raw.startswith("00"):
+        digits = digits[2:]
+    elif default_country_code == "1" and len(digits) == 11 and digits.startswith("1"):
+        pass
+    else:
+        digits = default_country_code + digits.lstrip("0")
+    if not 8 <= len(digits) <= 15:
+        return None
+    return "+" + digits
+
+
+class BusinessContact(NamedTuple):
+    call_id: str
+    biz_name: Optional[str]
+    called_at: datetime
+    session_id: Optional[str]
+    outcome_summary: Optional[str]
+    success: Optional[bool]
+    call_result: Optional[str]
+
+    def is_recent(self, within: timedelta) -> bool:
+        return datetime.now(timezone.utc) - self.called_at <= within
+
+    def blocks(self, session_id: Optional[str]) -> bool:
+        """Whether this call rules out dialing the business again now.
+
+        Only calls that are still in flight or reached the business count (the
+        index skips the rest), and follow-up calls from the session that placed
+        the call are allowed.
+        """
+        return self.is_recent(REDIAL_COOLDOWN) and not (session_id and self.session_id == session_id)
+
+    def describe(self) -> dict:
+        """What the agent is told about this earlier call."""
+        return {
+            "days_ago": round((datetime.now(timezone.utc) - self.called_at).total_seconds() / 86400, 1),
+            "outcome_summary": self.outcome_summary,
+            "success": self.success,
+        }
+
+
+class BusinessIndex:
+    """Latest call per business, looked up in `provider_conversations` by E.164 phone number.
+
+    The scout agent sends numbers to the phone agent in E.164, so a call shows up
+    as soon as the phone agent creates its document, before it even connects.
+    Lookups go straight to Firestore (one query per 30 numbers) rather than
+    mirroring the collection into every instance. Calls that never reached the
+    business (failed, no answer, cancelled) are skipped.
+    """
+
+    async def last_contacts(self, phone_numbers: Iterable[str]) -> dict[str, BusinessContact]:
+        """The latest call to each of the businesses, keyed by E.164 number."""
+        phones = sorted({phone for phone in map(normalize_phone, phone_numbers) if phone})
+        latest: dict[str, BusinessContact] = {}
+        for start in range(0, len(phones), MAX_PHONES_PER_QUERY):
+            query = (db.collection("provider_conversations")
+                     .where(filter=FieldFilter("phone_number", "in", phones[start:start + MAX_PHONES_PER_QUERY]))
+                     .select(CONTACT_FIELDS))
+            async for doc in query.stream():
+                data = doc.to_dict()
+                if data.get("call_result") in NO_RESULT_CALLS:
+                    continue
+                contact = BusinessContact(
+                    call_id=doc.id,
+                    biz_name=data.get("biz_name"),
+                    called_at=data.get("timestamp") or datetime.now(timezone.utc),
+                    session_id=data.get("session_id"),
+                    outcome_summary=data.get("outcome_summary"),
+                    success=data.get("success"),
+                    call_result=data.get("call_result"),
+                )
+                phone = data["phone_number"]
+                if phone not in latest or contact.called_at > latest[phone].called_at:
+                    latest[phone] = contact
+        return latest
+
+    async def blocking_contact(self, phone_number: str, session_id: Optional[str]) -> Optional[BusinessContact]:
+        """The call that rules out dialing this business now, if any."""
+        phone = normalize_phone(phone_number)
+        contact = (await self.last_contacts([phone])).get(phone) if phone else None
+        return contact if contact is not None and contact.blocks(session_id) else None
+
+
+business_index = BusinessIndex()
@@ -0,0 +1,120 @@
+import asyncio
+import os
+from typing import Callable, Optional
+
+from websockets.asyncio.client import connect
+from websockets.exceptions import InvalidStatus, WebSocketException
+
+from phone_client import phone_agent_base_url
+from session_channel import SessionChannels, session_channels
+
+# phone_agent writes `type` first in every monitor message, so messages can be
+# routed by prefix and forwarded to browsers without parsing them.
+AUDIO_MESSAGE_PREFIX = '{"type": "call_audio"'
+ENDED_MESSAGE_PREFIX = '{"type": "call_ended"'
+
+
+class CallMonitorRelay:
+    """Relays live call updates from phone_agent's /dialer/monitor stream to browser sessions.
+
+    However many sessions watch a call, the process holds one upstream
+    websocket for it, opened on the first `watch` and closed when the call
+    ends or its last session stops watching. Each message goes into the
+    watching sessions' channels as is; a channel that is full drops it (audio
+    first), so a slow browser never holds up the relay or the call.
+
+    Every phone_agent instance can serve the stream, so reconnecting after a
+    dropped connection works wherever the load balancer sends it. Connections
+    carry `secret` (CALL_MONITOR_SECRET), without which phone_agent refuses them.
+    """
+
+    def __init__(self, channels: SessionChannels, base_url: Callable[[], str] = phone_agent_base_url, audio: Optional[bool] = None, secret: Optional[str] = None, reconnect_attempts: int = 5, reconnect_delay: float = 1.0):
+        self.channels = channels
+        self.base_url = base_url
+        self.audio = audio if audio is not None else os.getenv("CALL_MONITOR_AUDIO", "false").lower() == "true"
+        self.secret = secret if secret is not None else os.getenv("CALL_MONITOR_SECRET", "")
+        self.reconnect_attempts = reconnect_attempts
+        self.reconnect_delay = reconnect_delay
+        self._watchers: dict[str, set[str]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self.upstream_connections = 0
+        self.relayed = 0
+
+    def watch(self, call_id: str, session_id: str):
+        """Streams the call's updates to the session's browser until the call ends."""
+        self._watchers.setdefault(call_id, set()).add(session_id)
+        if call_id not in self._tasks:
+            self._tasks[call_id] = asyncio.create_task(self._relay(call_id))
+
+    def unwatch_session(self, session_id: str):
+        """Stops every stream to the session, closing upstream connections no one else uses."""
+        for call_id in [call_id for call_id, sessions in self._watchers.items() if session_id in sessions]:
+            sessions = self._watchers[call_id]
+            sessions.discard(session_id)
+            if not sessions:
+                del self._watchers[call_id]
+                task = self._tasks.pop(call_id, None)
+                if task is not None:
+                    task.cancel()
+
+    async def close(self):
+        tasks = list(self._tasks.values())
+        self._watchers.clear()
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "calls_watched": len(self._tasks),
+            "watching_sessions": sum(len(sessions) for sessions in self._watchers.values()),
+            "upstream_connections": self.upstream_connections,
+            "relayed": self.relayed,
+        }
+
+    def _url(self, call_id: str) -> str:
+        base = self.base_url().rstrip("/")
+        if base.startswith("https://"):
+            base = "wss://" + base[len("https://"):]
+        elif base.startswith("http://"):
+            base = "ws://" + base[len("http://"):]
+        return f"{base}/dialer/monitor/{call_id}?audio={'true' if self.audio else 'false'}"
+
+    async def _relay(self, call_id: str):
+        failures = 0
+        try:
+            while call_id in self._watchers:
+                try:
+                    async with connect(self._url(call_id), open_timeout=10, additional_headers={"X-Call-Monitor-Secret": self.secret}) as upstream:
+                        self.upstream_connections += 1
+                        failures = 0
+                        async for raw in upstream:
+                            lossy = raw.startswith(AUDIO_MESSAGE_PREFIX)
+                            for session_id in self._watchers.get(call_id, ()):
+                                self.channels.publish(session_id, raw, lossy)
+                            self.relayed += 1
+                            if raw.startswith(ENDED_MESSAGE_PREFIX):
+                                return
+                except InvalidStatus as e:
+                    # phone_agent refuses a missing or wrong secret with a 403; trying again won't help.
+                    if e.response.status_code == 403:
+                        print(f"Call monitor connection for call {call_id} refused; check CALL_MONITOR_SECRET.")
+                        return
+                    print(f"Call monitor connection for call {call_id} failed: {e}")
+                except (OSError, asyncio.TimeoutError, WebSocketException) as e:
+                    print(f"Call monitor connection for call {call_id} failed: {e}")
+                # Dropped before the call ended (e.g. a phone agent restart): reconnect, a few times
+                failures += 1
+                if failures > self.reconnect_attempts:
+                    print(f"Giving up on monitoring call {call_id}.")
+                    return
+                await asyncio.sleep(self.reconnect_delay * failures)
+        finally:
+            # A new relay may already have replaced this one after an unwatch and re-watch.
+            if self._tasks.get(call_id) is asyncio.current_task():
+                del self._tasks[call_id]
+                self._watchers.pop(call_id, None)
+
+
+call_monitor_relay = CallMonitorRelay(session_channels)
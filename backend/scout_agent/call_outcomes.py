@@ -0,0 +1,131 @@
+import asyncio
+import os
+from typing import Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
+from google.cloud.firestore_v1.watch import ChangeType
+
+# Firestore caps "in" filters at 30 values, so pending calls are watched in groups of 30.
+MAX_IDS_PER_LISTENER = 30
+CALL_OUTCOME_TIMEOUT = float(os.getenv("CALL_OUTCOME_TIMEOUT_SECONDS", "900"))
+
+
+def has_outcome(call_data: dict) -> bool:
+    return bool(call_data.get("outcome_summary"))
+
+
+class CallOutcomeDispatcher:
+    """Delivers call outcomes from `provider_conversations` as soon as phone_agent writes them.
+
+    One dispatcher serves the whole process. It keeps a single snapshot listener per
+    group of up to 30 pending call IDs, instead of every call polling its own
+    document. When the pending set changes (debounced), only the groups that
+    gained or lost an ID are re-created; new IDs top up groups with room first.
+    """
+
+    def __init__(self, resubscribe_delay: float = 0.05):
+        self.resubscribe_delay = resubscribe_delay
+        self._client: Optional[firestore.Client] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: dict[str, set[asyncio.Future]] = {}
+        self._groups: list[tuple[frozenset, object]] = []  # (call IDs, watch)
+        self._resubscribe_handle: Optional[asyncio.TimerHandle] = None
+        self._resubscribe_task: Optional[asyncio.Task] = None
+        self._resubscribe_lock = asyncio.Lock()
+
+    async def wait_for(self, call_id: str, timeout: float = CALL_OUTCOME_TIMEOUT) -> dict:
+        """Waits for the call's outcome and returns its document data.
+
+        Raises asyncio.TimeoutError if no outcome arrives in time. Cancelling the
+        caller (e.g. when its websocket closes) stops watching the call.
+        """
+        self._loop = asyncio.get_running_loop()
+        future = self._loop.create_future()
+        self._waiters.setdefault(call_id, set()).add(future)
+        self._schedule_resubscribe()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            waiters = self._waiters.get(call_id)
+            if waiters is not None:
+                waiters.discard(future)
+                if not waiters:
+                    del self._waiters[call_id]
+                    self._schedule_resubscribe()
+
+    @property
+    def pending(self) -> int:
+        return len(self._waiters)
+
+    def close(self):
+        if self._resubscribe_handle:
+            self._resubscribe_handle.cancel()
+        for _, watch in self._groups:
+            watch.unsubscribe()
+        self._groups = []
+
+    def _schedule_resubscribe(self):
+        if self._resubscribe_handle is None:
+            self._resubscribe_handle = self._loop.call_later(self.resubscribe_delay, self._start_resubscribe)
+
+    def _start_resubscribe(self):
+        self._resubscribe_task = asyncio.create_task(self._resubscribe())
+
+    async def _resubscribe(self):
+        async with self._resubscribe_lock:
+            self._resubscribe_handle = None
+            call_ids = set(self._waiters)
+            # Starting and stopping watches touches threads and the network, so keep it off the loop.
+            await asyncio.to_thread(self._update_watches, call_ids)
+
+    def _update_watches(self, call_ids: set[str]):
+        if self._client is None:
+            self._client = firestore.Client()
+        unwatched = sorted(call_ids.difference(*(ids for ids, _ in self._groups)))
+        groups = []
+        stale = []
+        for ids, watch in self._groups:
+            kept = ids & call_ids
+            room = MAX_IDS_PER_LISTENER - len(kept)
+            if room and unwatched:
+                kept |= set(unwatched[:room])
+                unwatched = unwatched[room:]
+            if kept == ids:
+                groups.append((ids, watch))
+                continue
+            stale.append(watch)
+            if kept:
+                groups.append((frozenset(kept), self._watch(kept)))
+        for i in range(0, len(unwatched), MAX_IDS_PER_LISTENER):
+            ids = frozenset(unwatched[i:i + MAX_IDS_PER_LISTENER])
+            groups.append((ids, self._watch(ids)))
+        # New listeners start with a full snapshot of their group, so nothing written in between is missed.
+        self._groups = groups
+        for watch in stale:
+            watch.unsubscribe()
+
+    def _watch(self, call_ids: frozenset):
+        collection = self._client.collection("provider_conversations")
+        refs = [collection.document(call_id) for call_id in sorted(call_ids)]
+        query = collection.where(filter=FieldFilter(FieldPath.document_id(), "in", refs))
+        return query.on_snapshot(self._on_snapshot)
+
+    def _on_snapshot(self, docs, changes, read_time):
+        # Runs on the listener's thread. Only changed documents matter; the first
+        # snapshot of a listener reports every document as added.
+        for change in changes:
+            if change.type == ChangeType.REMOVED:
+                continue
+            call_data = change.document.to_dict()
+            if call_data and has_outcome(call_data):
+                self._loop.call_soon_threadsafe(self._deliver, change.document.id, call_data)
+
+    def _deliver(self, call_id: str, call_data: dict):
+        for future in self._waiters.get(call_id, ()):
+            if not future.done():
+                future.set_result(call_data)
+
+
+call_outcome_dispatcher = CallOutcomeDispatcher()
@@ -0,0 +1,187 @@
+import asyncio
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+# Calls one campaign keeps in flight at once; the phone agent's per-user limit applies on top.
+CAMPAIGN_MAX_CONCURRENT_CALLS = int(os.getenv("CAMPAIGN_MAX_CONCURRENT_CALLS", "5"))
+CAMPAIGN_MAX_CALLS = int(os.getenv("CAMPAIGN_MAX_CALLS", "10"))
+
+PRICE_PATTERN = re.compile(r"\$\s?(\d[\d,]*(?:\.\d{1,2})?)")
+
+# Call statuses
+PENDING = "pending"
+PLACED = "placed"
+COMPLETED = "completed"
+FAILED = "failed"
+SKIPPED = "skipped"
+NO_OUTCOME = "no_outcome"
+
+
+def quoted_price(outcome_summary: Optional[str]) -> Optional[float]:
+    """The first dollar amount in an outcome summary, if any."""
+    match = PRICE_PATTERN.search(outcome_summary or "")
+    return float(match.group(1).replace(",", "")) if match else None
+
+
+@dataclass
+class CampaignCall:
+    biz_name: str
+    phone_number: str
+    biz_description: str = ""
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    status: str = PENDING
+    call_id: Optional[str] = None
+    outcome_summary: Optional[str] = None
+    success: Optional[bool] = None
+    placed_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def summary(self) -> dict:
+        return {
+            "biz_name": self.biz_name,
+            "phone_number": self.phone_number,
+            "status": self.status,
+            "call_id": self.call_id,
+            "success": self.success,
+            "quoted_price": quoted_price(self.outcome_summary) if self.success else None,
+            "outcome_summary": self.outcome_summary,
+            "call_seconds": round(self.finished_at - self.placed_at, 1) if self.placed_at and self.finished_at else None,
+        }
+
+
+@dataclass
+class Campaign:
+    campaign_id: str
+    session_id: str
+    user_id: str
+    objective: str
+    user_context: str
+    calls: list[CampaignCall]
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    task: Optional[asyncio.Task] = None
+
+    @property
+    def done(self) -> bool:
+        return self.finished_at is not None
+
+    def comparison(self) -> dict:
+        """All outcomes side by side: successful ones first, cheapest quote first."""
+        rows = [call.summary() for call in self.calls]
+        rows.sort(key=lambda row: (
+            not row["success"],
+            row["quoted_price"] is None,
+            row["quoted_price"] or 0.0,
+        ))
+        counts = {}
+        for call in self.calls:
+            counts[call.status] = counts.get(call.status, 0) + 1
+        return {
+            "campaign_id": self.campaign_id,
+            "objective": self.objective,
+            "done": self.done,
+            "elapsed_seconds": round((self.finished_at or time.monotonic()) - self.started_at, 1),
+            "counts": counts,
+            "results": rows,
+        }
+
+
+class CampaignRunner:
+    """Places a campaign's calls concurrently and collects their outcomes.
+
+    `place_call(campaign, call)` starts one call and returns its call ID (None if
+    it wasn't placed). `wait_for_outcome(call_id)` returns the call document once
+    the phone agent has written an outcome. Up to `max_concurrent` calls per
+    campaign are in flight at once, so a campaign takes about as long as its
+    slowest call rather than the sum of all of them. `on_update(campaign)` is
+    called whenever a call changes status.
+    """
+
+    def __init__(
+        self,
+        place_call: Callable[[Campaign, CampaignCall], Awaitable[Optional[str]]],
+        wait_for_outcome: Callable[[str], Awaitable[dict]],
+        on_update: Optional[Callable[[Campaign], None]] = None,
+        max_concurrent: int = CAMPAIGN_MAX_CONCURRENT_CALLS,
+    ):
+        self.place_call = place_call
+        self.wait_for_outcome = wait_for_outcome
+        self.on_update = on_update
+        self.max_concurrent = max_concurrent
+        self.campaigns: dict[str, Campaign] = {}
+
+    def start(self, session_id: str, user_id: str, objective: str, user_context: str, calls: list[CampaignCall]) -> Campaign:
+        campaign = Campaign(
+            campaign_id=str(uuid.uuid4()),
+            session_id=session_id,
+            user_id=user_id,
+            objective=objective,
+            user_context=user_context,
+            calls=calls,
+        )
+        self.campaigns[campaign.campaign_id] = campaign
+        campaign.task = asyncio.create_task(self._run(campaign))
+        return campaign
+
+    def get(self, campaign_id: str) -> Optional[Campaign]:
+        return self.campaigns.get(campaign_id)
+
+    async def wait(self, campaign_id: str) -> Campaign:
+        """Waits for every call in the campaign to finish."""
+        campaign = self.campaigns[campaign_id]
+        # Shielded so a waiter going away doesn't cancel the campaign itself.
+        await asyncio.shield(campaign.task)
+        return campaign
+
+    def cancel_session(self, session_id: str):
+        """Stops placing calls for a session's campaigns. Calls already placed run to completion."""
+        for campaign_id, campaign in list(self.campaigns.items()):
+            if campaign.session_id == session_id:
+                campaign.task.cancel()
+                del self.campaigns[campaign_id]
+
+    async def _run(self, campaign: Campaign):
+        semaphore = asyncio.Semaphore(self.max_concurrent)
+        try:
+            await asyncio.gather(*(self._run_call(campaign, call, semaphore) for call in campaign.calls))
+        finally:
+            campaign.finished_at = time.monotonic()
+            self._update(campaign)
+        print(f"Campaign {campaign.campaign_id} finished in {campaign.finished_at - campaign.started_at:.0f}s")
+
+    async def _run_call(self, campaign: Campaign, call: CampaignCall, semaphore: asyncio.Semaphore):
+        if call.status != PENDING:
+            return
+        async with semaphore:
+            call.placed_at = time.monotonic()
+            try:
+                call.call_id = await self.place_call(campaign, call)
+            except Exception as e:
+                print(f"Campaign {campaign.campaign_id}: error calling {call.biz_name}: {e}")
+            if not call.call_id:
+                call.status = FAILED
+                call.finished_at = time.monotonic()
+                self._update(campaign)
+                return
+            call.status = PLACED
+            self._update(campaign)
+
+            try:
+                call_data = await self.wait_for_outcome(call.call_id)
+            except asyncio.TimeoutError:
+                call.status = NO_OUTCOME
+            else:
+                call.status = COMPLETED
+                call.outcome_summary = call_data.get("outcome_summary")
+                call.success = bool(call_data.get("success"))
+            call.finished_at = time.monotonic()
+            self._update(campaign)
+
+    def _update(self, campaign: Campaign):
+        if self.on_update is not None:
+            self.on_update(campaign)
@@ -0,0 +1,63 @@
+import threading
+import time
+from typing import Optional
+
+from google.cloud import firestore
+from google.cloud.firestore_v1.watch import ChangeType
+
+
+class ConversationSync:
+    """Mirrors `provider_conversations` into in-process indexes.
+
+    A single snapshot listener delivers the whole collection on start and every
+    change after that. Each consumer gets `apply(doc_id, data)` per change (data is
+    None when a document is removed) and `flush()` after each batch of changes.
+    Both run on the listener's thread, never on the event loop.
+
+    The Firestore watch holds every document of the collection in memory,
+    embeddings and transcripts included, so it only runs when an opt-in local
+    index has registered a consumer.
+    """
+
+    def __init__(self):
+        self.consumers = []
+        self.ready = False
+        self.last_sync: Optional[float] = None
+        self._watch = None
+        self._lock = threading.Lock()
+
+    def add_consumer(self, consumer):
+        if consumer not in self.consumers:
+            self.consumers.append(consumer)
+
+    def start(self):
+        """Starts the listener if it isn't running. Blocking; call it off the event loop."""
+        with self._lock:
+            if self._watch is None:
+                client = firestore.Client()
+                self._watch = client.collection("provider_conversations").on_snapshot(self._on_snapshot)
+
+    def stop(self):
+        with self._lock:
+            if self._watch is not None:
+                self._watch.unsubscribe()
+                self._watch = None
+
+    def _on_snapshot(self, docs, changes, read_time):
+        for change in changes:
+            data = None if change.type == ChangeType.REMOVED else change.document.to_dict()
+            for consumer in self.consumers:
+                try:
+                    consumer.apply(change.document.id, data)
+                except Exception as e:
+                    print(f"Error syncing conversation {change.document.id} into {type(consumer).__name__}: {e}")
+        for consumer in self.consumers:
+            try:
+                consumer.flush()
+            except Exception as e:
+                print(f"Error flushing {type(consumer).__name__}: {e}")
+        self.ready = True
+        self.last_sync = time.time()
+
+
+conversation_sync = ConversationSync()
@@ -0,0 +1,116 @@
+import asyncio
+import os
+import re
+import sqlite3
+import time
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a query: case, punctuation and spacing differences don't matter."""
+    return " ".join(re.sub(r"[^\w$]+", " ", text.lower()).split())
+
+
+class QueryEmbeddingCache:
+    """Two-tier cache for query embeddings.
+
+    An in-memory LRU holds the hottest `max_entries` queries. If `path` is set,
+    embeddings are also kept in a SQLite file so the cache survives restarts;
+    disk hits are promoted back into memory. The file holds at most
+    `max_disk_entries` rows: once over, the least recently used tenth is
+    deleted. Keys are namespaced by model and dimensionality so a config change
+    never returns a stale vector.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 1024, path: Optional[str] = None, max_disk_entries: int = 100_000):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_entries = 0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS query_embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL DEFAULT 0)")
+            # Files from before the row cap have no last_used; their rows are evicted first.
+            if "last_used" not in {row[1] for row in self._db.execute("PRAGMA table_info(query_embeddings)")}:
+                self._db.execute("ALTER TABLE query_embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute("CREATE INDEX IF NOT EXISTS query_embeddings_last_used ON query_embeddings (last_used)")
+            self._db.commit()
+            self._disk_entries = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+        self._db_lock = asyncio.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get_or_embed(self, text: str, embed: Callable[[str], Awaitable[list[float]]]) -> list[float]:
+        """Returns the cached embedding for `text`, calling `embed` only on a miss."""
+        key = f"{self.namespace}:{normalize_query(text)}"
+
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+
+        if self._db is not None:
+            vector = await self._read_disk(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+
+        self.misses += 1
+        vector = list(await embed(text))
+        self._remember(key, vector)
+        if self._db is not None:
+            await self._write_disk(key, vector)
+        return vector
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "disk_entries": self._disk_entries,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, vector: list[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _read_disk(self, key: str) -> Optional[list[float]]:
+        def read():
+            row = self._db.execute("SELECT vector FROM query_embeddings WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE query_embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return array("f", row[0]).tolist()
+
+        async with self._db_lock:
+            return await asyncio.to_thread(read)
+
+    async def _write_disk(self, key: str, vector: list[float]):
+        def write():
+            cursor = self._db.execute("INSERT OR IGNORE INTO query_embeddings (key, vector, last_used) VALUES (?, ?, ?)", (key, array("f", vector).tobytes(), time.time()))
+            self._disk_entries += cursor.rowcount
+            if self._disk_entries > self.max_disk_entries:
+                keep = self.max_disk_entries * 9 // 10
+                self._db.execute(
+                    "DELETE FROM query_embeddings WHERE key IN (SELECT key FROM query_embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (self._disk_entries - keep,),
+                )
+                self._disk_entries = keep
+            self._db.commit()
+
+        async with self._db_lock:
+            await asyncio.to_thread(write)
@@ -0,0 +1,9 @@
+from dotenv import load_dotenv
+from google.cloud import firestore
+
+# Tools import this before main.py loads the .env file
+load_dotenv()
+
+# One async Firestore client per process. Every read and write is awaited, so a
+# slow round trip never blocks the event loop that also carries live audio.
+db = firestore.AsyncClient()
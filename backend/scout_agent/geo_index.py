@@ -0,0 +1,49 @@
+import threading
+from bisect import bisect_left, insort
+from typing import Optional
+
+
+class GeoIndex:
+    """Geohash index over `provider_conversations`, kept current by the conversation listener.
+
+    Only the in-process search indexes need it, so they register it with the
+    listener; with the default Firestore backend the geohash filter runs in
+    Firestore and this index stays empty. Geohashes are kept sorted, so the documents in a cell of any precision are
+    one contiguous range found by bisecting on the cell prefix.
+    """
+
+    def __init__(self):
+        self._entries: list[tuple[str, str]] = []  # (geohash, doc_id), sorted
+        self._geohashes: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._geohashes)
+
+    # --- Conversation sync consumer (listener thread) ---
+    def apply(self, doc_id: str, data: Optional[dict]):
+        geohash = data.get("geohash") if data else None
+        with self._lock:
+            previous = self._geohashes.pop(doc_id, None)
+            if previous is not None:
+                self._entries.pop(bisect_left(self._entries, (previous, doc_id)))
+            if geohash:
+                self._geohashes[doc_id] = geohash
+                insort(self._entries, (geohash, doc_id))
+
+    def flush(self):
+        pass
+
+    # --- Lookups ---
+    def candidates(self, cells: list[str]) -> set[str]:
+        """Returns the ids of documents inside any of the given geohash cells."""
+        found = set()
+        with self._lock:
+            for cell in cells:
+                start = bisect_left(self._entries, (cell,))
+                end = bisect_left(self._entries, (cell + "~",))
+                found.update(doc_id for _, doc_id in self._entries[start:end])
+        return found
+
+
+geo_index = GeoIndex()
@@ -0,0 +1,107 @@
+import math
+
+# Keep in sync with backend/phone_agent/geohash.py: the phone agent writes these
+# fields and the scout agent queries them.
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+EARTH_RADIUS_MILES = 3958.8
+# Firestore allows at most 30 values in an `in` filter.
+MAX_COVERING_CELLS = 30
+
+
+def encode(lat: float, lng: float, precision: int = GEOHASH_PRECISION) -> str:
+    """Encodes a coordinate as a geohash string of `precision` characters."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                value = value * 2 + 1
+                lng_range[0] = mid
+            else:
+                value *= 2
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                value = value * 2 + 1
+                lat_range[0] = mid
+            else:
+                value *= 2
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """Returns the (lat, lng) size in degrees of a cell at `precision`."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def geo_fields(lat, lng) -> dict:
+    """Index fields stored on a provider_conversations document.
+
+    `geohash` holds the full-precision hash. `geohash_prefixes` lists every
+    prefix of it, so one `array_contains_any` filter matches covering cells of
+    any precision. Documents without real coordinates get neither.
+    """
+    if lat is None or lng is None or (lat == 0 and lng == 0):
+        return {"lat": lat, "lng": lng, "geohash": None, "geohash_prefixes": []}
+    geohash = encode(lat, lng)
+    return {
+        "lat": lat,
+        "lng": lng,
+        "geohash": geohash,
+        "geohash_prefixes": [geohash[:i] for i in range(1, len(geohash) + 1)],
+    }
+
+
+def haversine_miles(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(math.sqrt(a))
+
+
+def covering_cells(lat: float, lng: float, radius_miles: float, max_cells: int = MAX_COVERING_CELLS) -> list[str]:
+    """Returns the geohash cells covering a `radius_miles` circle around a point.
+
+    Uses the finest precision whose covering still fits in `max_cells`, so the
+    candidate set is as small as the filter allows.
+    """
+    lat_offset = radius_miles / 69.0
+    lng_offset = radius_miles / (69.0 * max(math.cos(math.radians(lat)), 0.01))
+    lat_min, lat_max = max(lat - lat_offset, -90.0), min(lat + lat_offset, 90.0)
+    lng_min, lng_max = lng - lng_offset, lng + lng_offset
+
+    best = [encode(lat, lng, 1)]
+    for precision in range(1, GEOHASH_PRECISION + 1):
+        lat_step, lng_step = cell_size(precision)
+        rows = math.floor((lat_max + 90.0) / lat_step) - math.floor((lat_min + 90.0) / lat_step) + 1
+        cols = math.floor((lng_max + 180.0) / lng_step) - math.floor((lng_min + 180.0) / lng_step) + 1
+        if rows * cols > max_cells:
+            break
+        cells = set()
+        for row in range(rows):
+            cell_lat = min((math.floor((lat_min + 90.0) / lat_step) + row + 0.5) * lat_step - 90.0, 90.0)
+            for col in range(cols):
+                cell_lng = (math.floor((lng_min + 180.0) / lng_step) + col + 0.5) * lng_step - 180.0
+                # Wrap across the antimeridian.
+                cell_lng = (cell_lng + 180.0) % 360.0 - 180.0
+                cells.add(encode(cell_lat, cell_lng, precision))
+        best = sorted(cells)
+    return best
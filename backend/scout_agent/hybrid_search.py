@@ -0,0 +1,73 @@
+import asyncio
+import os
+from typing import Optional
+
+from conversation_sync import conversation_sync
+from geo_index import geo_index
+from lexical_index import BM25Index, tokenize
+from vector_search import CONVERSATION_FIELDS, SearchHit
+
+# Standard RRF constant: damps the advantage of the very top ranks.
+RRF_K = 60
+# Queries this short that a result matches in full are answered lexically, without an embedding.
+LEXICAL_ONLY_MAX_TERMS = 3
+
+# Enough to rank and place a hit; its transcript is read from Firestore only if it makes the results.
+LEXICAL_STORED_FIELDS = ("biz_name", "outcome_summary", "lat", "lng")
+
+
+def create_lexical_index() -> Optional[BM25Index]:
+    """Builds the index named by LEXICAL_SEARCH_BACKEND ("none" or "local").
+
+    The local index mirrors provider_conversations into memory on every
+    instance, so it is opt-in like the local vector backend.
+    """
+    name = os.getenv("LEXICAL_SEARCH_BACKEND", "none")
+    if name == "none":
+        return None
+    if name != "local":
+        raise ValueError(f"Unknown lexical search backend: {name}")
+    index = BM25Index(stored_fields=LEXICAL_STORED_FIELDS)
+    conversation_sync.add_consumer(geo_index)
+    conversation_sync.add_consumer(index)
+    return index
+
+
+lexical_index = create_lexical_index()
+
+
+async def lexical_search(query: str, limit: int, cells: Optional[list[str]] = None) -> Optional[list[SearchHit]]:
+    """BM25 search over the in-memory transcript index.
+
+    Returns None when lexical search is off or the index is still loading, so
+    callers can tell "no matches" apart from "can't answer".
+    """
+    if lexical_index is None:
+        return None
+    if not conversation_sync.ready:
+        await asyncio.to_thread(conversation_sync.start)
+        return None
+    candidates = geo_index.candidates(cells) if cells is not None else None
+    matches = lexical_index.search(query, limit, candidates)
+    return [SearchHit(doc_id, score, fields) for doc_id, score, fields in matches]
+
+
+def is_exact_term_match(query: str, hits: Optional[list[SearchHit]]) -> bool:
+    """Whether a short query is fully matched by the top lexical hit."""
+    return bool(hits) and len(set(tokenize(query))) <= LEXICAL_ONLY_MAX_TERMS and lexical_index.covers(hits[0].doc_id, query)
+
+
+def term_idf(term: str) -> float:
+    """Rarity of a term across conversations; every term weighs the same without the lexical index."""
+    return lexical_index.idf(term) if lexical_index is not None else 1.0
+
+
+def reciprocal_rank_fusion(*rankings: list[SearchHit], k: int = RRF_K) -> list[SearchHit]:
+    """Merges ranked hit lists by summing 1 / (k + rank) across lists."""
+    scores: dict[str, float] = {}
+    data: dict[str, dict] = {}
+    for ranking in rankings:
+        for rank, hit in enumerate(ranking, start=1):
+            scores[hit.doc_id] = scores.get(hit.doc_id, 0.0) + 1.0 / (k + rank)
+            data.setdefault(hit.doc_id, hit.data)
+    return [SearchHit(doc_id, score, data[doc_id]) for doc_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)]
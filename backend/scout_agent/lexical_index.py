@@ -0,0 +1,105 @@
+import math
+import threading
+from collections import Counter
+from typing import Optional
+
+from passages import tokenize
+
+
+def conversation_text(data: dict) -> str:
+    """The searchable text of a provider_conversations document."""
+    turns = " ".join(turn.get("text", "") for turn in data.get("transcript", []))
+    return " ".join([data.get("biz_name") or "", data.get("outcome_summary") or "", turns])
+
+
+class BM25Index:
+    """Incremental BM25 inverted index over conversation transcripts.
+
+    Fed by the conversation listener like the vector index, so a transcript is
+    searchable as soon as the phone agent saves it. Updates touch only the
+    postings of the changed document. The `stored_fields` of each document are
+    kept alongside so results can be ranked without a Firestore read; keep them
+    small, since every instance holds them for the whole collection.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, stored_fields: tuple[str, ...] = ()):
+        self.k1 = k1
+        self.b = b
+        self.stored_fields = stored_fields
+        self.documents: dict[str, dict] = {}
+        self._postings: dict[str, dict[str, int]] = {}
+        self._lengths: dict[str, int] = {}
+        self._doc_terms: dict[str, list[str]] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    # --- Conversation sync consumer (listener thread) ---
+    def apply(self, doc_id: str, data: Optional[dict]):
+        counts = Counter(tokenize(conversation_text(data))) if data else Counter()
+        with self._lock:
+            self._remove(doc_id)
+            if counts:
+                for term, tf in counts.items():
+                    self._postings.setdefault(term, {})[doc_id] = tf
+                self._doc_terms[doc_id] = list(counts)
+                self.documents[doc_id] = {field: data.get(field) for field in self.stored_fields}
+                length = sum(counts.values())
+                self._lengths[doc_id] = length
+                self._total_length += length
+
+    def flush(self):
+        pass
+
+    # --- Search ---
+    def search(self, query: str, limit: int, candidates: Optional[set[str]] = None) -> list[tuple[str, float, dict]]:
+        """Returns up to `limit` (doc_id, BM25 score, stored fields) triples, best first.
+
+        If `candidates` is given, only those documents are considered. The
+        stored fields are read under the same lock as the scores, so a document
+        removed meanwhile by the sync thread can't go missing in between.
+        """
+        terms = set(tokenize(query))
+        scores: dict[str, float] = {}
+        with self._lock:
+            n = len(self._lengths)
+            if not n:
+                return []
+            average_length = self._total_length / n
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    if candidates is not None and doc_id not in candidates:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc_id] / average_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:limit]
+            return [(doc_id, score, self.documents[doc_id]) for doc_id, score in best]
+
+    def idf(self, term: str) -> float:
+        with self._lock:
+            n = len(self._lengths)
+            df = len(self._postings.get(term, ()))
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def covers(self, doc_id: str, query: str) -> bool:
+        """Whether the document contains every term of the query."""
+        with self._lock:
+            return all(doc_id in self._postings.get(term, {}) for term in tokenize(query))
+
+    def _remove(self, doc_id: str):
+        length = self._lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self._total_length -= length
+        self.documents.pop(doc_id, None)
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
@@ -21,7 +21,6 @@ from firebase_admin.exceptions import FirebaseError
 from google.adk.agents import LiveRequestQueue
 from google.adk.runners import Runner
 from google.adk.agents.run_config import RunConfig
-from google.adk.sessions import InMemorySessionService
 from google.adk.events import Event, EventActions
 # ADK Model & Type Imports
 from google.genai import types
@@ -30,6 +29,18 @@ from google.cloud import firestore
 # Agent imports
 from agent import root_agent
 from tools.outreach_tool import CallPlacedResult
+from tools.campaign_tool import CampaignStartedResult, campaign_runner
+from tools.retrieval_tool import query_embedding_cache
+from tools.get_phone_numbers_tool import places_cache
+from places_client import close_places_client
+from phone_client import close_phone_client
+from session_channel import session_channels
+from persistent_sessions import SessionStoreError, create_session_service
+from media_messages import audio_message, parse_audio
+from firestore_db import db
+from call_monitor import call_monitor_relay
+from call_outcomes import CALL_OUTCOME_TIMEOUT, call_outcome_dispatcher
+from conversation_sync import conversation_sync
 
 # --- Configure Logging and Warnings ---
 warnings.filterwarnings("ignore")
@@ -43,9 +54,6 @@ if not firebase_admin._apps:
     # cred = credentials.Certificate(service_account_file)
     firebase_admin.initialize_app()
 
-# --- Firestore Client ---
-db = firestore.Client()
-
 app = FastAPI()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -71,7 +79,8 @@ async def startup_event():
     if not root_agent:
         print("\n❌ Root agent is not defined. Cannot initialize for FastAPI.")
         return
-    session_service = InMemorySessionService()
+    # In memory, or shared through a store when SESSION_BACKEND=sqlite so any instance can resume a session
+    session_service = create_session_service()
     
     runner = Runner(
         agent=root_agent,
@@ -80,6 +89,21 @@ async def startup_event():
     )
     print("✅ Agent Runner initialized for FastAPI.")
 
+    # Start mirroring provider_conversations into the in-process search indexes, if any are enabled
+    if conversation_sync.consumers:
+        await asyncio.to_thread(conversation_sync.start)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stops the Firestore listeners, writes out sessions and closes shared clients on app shutdown."""
+    call_outcome_dispatcher.close()
+    conversation_sync.stop()
+    await call_monitor_relay.close()
+    await close_places_client()
+    await close_phone_client()
+    if session_service is not None:
+        await session_service.flush()
+
 async def get_current_user(token: Annotated[str, Depends(oauth2_scheme)]):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -98,17 +122,14 @@ async def start_voice_agent_session(user_id: str, session_id: str, is_audio=True
     if runner is None or session_service is None:
         raise HTTPException(status_code=500, detail="Agent not initialized.")
     
-    # Get existing session or create if needed
-    try:
-        session = await session_service.get_session(
-            app_name=APP_NAME,
-            user_id=user_id,
-            session_id=session_id
-        )
-        if not session:
-            raise Exception("Session not found")
-
-    except:
+    # Get existing session or create if needed. A SessionStoreError (the store can't
+    # tell whether the session exists) goes to the caller rather than creating a new one.
+    session = await session_service.get_session(
+        app_name=APP_NAME,
+        user_id=user_id,
+        session_id=session_id
+    )
+    if not session:
         print(f"Session {session_id} not found for user {user_id}, creating new session.")
         # If session doesn't exist, create it
         session = await session_service.create_session(
@@ -136,9 +157,49 @@ async def start_voice_agent_session(user_id: str, session_id: str, is_audio=True
 
     return live_events, live_request_queue
 
+async def deliver_call_outcome(live_request_queue: LiveRequestQueue, placed_call_id: str):
+    """Waits for a placed call's outcome and sends it to the live agent."""
+    try:
+        call_data = await call_outcome_dispatcher.wait_for(placed_call_id)
+    except asyncio.TimeoutError:
+        print(f"No outcome for call ID {placed_call_id} after {CALL_OUTCOME_TIMEOUT}s, giving up.")
+        return
+
+    outcome_summary = call_data.get("outcome_summary", "")
+    success = call_data.get("success", "")
+    call_data_processed = {
+        "call_id": placed_call_id,
+        "biz_name": call_data.get("biz_name", ""),
+        "phone_number": call_data.get("phone_number", ""),
+        "outcome_summary": outcome_summary,
+        "success": success,
+        "transcript": call_data.get("transcript", "")
+    }
+    # Send update to live request queue
+    print(f"Call outcome received for call ID {placed_call_id}: {outcome_summary}, success: {success}")
+    live_request_queue.send_content(content=types.Content(
+        role="user",
+        parts=[types.Part.from_text(
+            text=f"Call completed. Data: {json.dumps(call_data_processed)}. Tell the user about the outcome. If You absolutely need more information from the user, you may ask. Keep user engagement to a minimum and think autonomously. Act autonomously using tools to continue achieving the user's goal, placing further calls if needed. Always use the tools available such as initiate_outcall. Just don't place duplicate calls. "
+        )]
+    ))
+
+async def deliver_campaign_results(live_request_queue: LiveRequestQueue, campaign_id: str):
+    """Waits for every call in a campaign and sends the agent one comparison of the outcomes."""
+    campaign = await campaign_runner.wait(campaign_id)
+    comparison = campaign.comparison()
+    print(f"Campaign {campaign_id} results received: {comparison['counts']}")
+    live_request_queue.send_content(content=types.Content(
+        role="user",
+        parts=[types.Part.from_text(
+            text=f"Campaign completed. Results, best first: {json.dumps(comparison)}. Compare the options for the user in a few sentences and recommend one. Only place further calls if none of the results achieve the user's goal. Don't call these businesses again."
+        )]
+    ))
+
 async def agent_to_client_messaging(websocket: WebSocket, live_request_queue: LiveRequestQueue, live_events: AsyncGenerator[Event, None], session_id: str, user_id: str):
     """Agent to client communication for voice chat"""
     conversation_ended = False
+    outcome_tasks = set()
 
     try:
         async for event in live_events:
@@ -148,35 +209,18 @@ async def agent_to_client_messaging(websocket: WebSocket, live_request_queue: Li
                     placed_call_id = r.response.get('result').call_id
                 if placed_call_id:
                     print("starting result listener")
-                                            # IN BACKGROUND, POLL FIRESTORE TO CHECK FOR CALL OUTCOME UPDATES
-                    async def poll_call_outcome():
-                        while True:
-                            await asyncio.sleep(5)  # Poll every 5 seconds
-                            call_ref = db.collection("provider_conversations").document(placed_call_id)
-                            call_doc = call_ref.get()
-                            if call_doc.exists:
-                                call_data = call_doc.to_dict()
-                                outcome_summary = call_data.get("outcome_summary", "")
-                                success = call_data.get("success", "")
-                                call_data_processed = {
-                                    "call_id": placed_call_id,
-                                    "biz_name": call_data.get("biz_name", ""),
-                                    "phone_number": call_data.get("phone_number", ""),
-                                    "outcome_summary": outcome_summary,
-                                    "success": success,
-                                    "transcript": call_data.get("transcript", "")
-                                }
-                                if outcome_summary is not None and success is not None and len(outcome_summary) > 0:
-                                    # Send update to live request queue
-                                    print(f"Call outcome received for call ID {placed_call_id}: {outcome_summary}, success: {success}")
-                                    live_request_queue.send_content(content=types.Content(
-                                        role="user",
-                                        parts=[types.Part.from_text(
-                                            text=f"Call completed. Data: {json.dumps(call_data_processed)}. Tell the user about the outcome. If You absolutely need more information from the user, you may ask. Keep user engagement to a minimum and think autonomously. Act autonomously using tools to continue achieving the user's goal, placing further calls if needed. Always use the tools available such as initiate_outcall. Just don't place duplicate calls. "
-                                        )]
-                                    ))
-                                    break
-                    asyncio.create_task(poll_call_outcome())
+                    # In the background, wait for the call outcome and hand it to the agent
+                    outcome_task = asyncio.create_task(deliver_call_outcome(live_request_queue, placed_call_id))
+                    outcome_tasks.add(outcome_task)
+                    outcome_task.add_done_callback(outcome_tasks.discard)
+                    # Meanwhile the browser follows the call live
+                    call_monitor_relay.watch(placed_call_id, session_id)
+                campaign = r.response.get('result')
+                if isinstance(campaign, CampaignStartedResult) and campaign.campaign_id:
+                    # Outcomes of a campaign reach the agent together, once its last call finishes
+                    outcome_task = asyncio.create_task(deliver_campaign_results(live_request_queue, campaign.campaign_id))
+                    outcome_tasks.add(outcome_task)
+                    outcome_task.add_done_callback(outcome_tasks.discard)
 
             if event.input_transcription:
                 # Send transcription to client
@@ -256,14 +300,7 @@ async def agent_to_client_messaging(websocket: WebSocket, live_request_queue: Li
                 if audio_data:
                     # The audio from Gemini is 16-bit linear PCM at 24kHz.
                     try:
-                        media_message = {
-                            "type": "audio",
-                            "data": base64.b64encode(audio_data).decode("ascii"),
-                            "sampleRate": 24000,
-                            "channels": 1,
-                            "bitsPerSample": 16
-                        }
-                        await websocket.send_text(json.dumps(media_message))
+                        await websocket.send_text(audio_message(audio_data))
                     except Exception as e:
                         print(f"Audio encoding error: {e}")
                     continue
@@ -271,6 +308,9 @@ async def agent_to_client_messaging(websocket: WebSocket, live_request_queue: Li
     except Exception as e:
         print(f"Error in agent_to_client_messaging: {e}")
     finally:
+        # Nobody is left to tell about these calls
+        for outcome_task in outcome_tasks:
+            outcome_task.cancel()
         return conversation_ended
 
 async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: LiveRequestQueue, session_id: str):
@@ -278,6 +318,13 @@ async def client_to_agent_messaging(websocket: WebSocket, live_request_queue: Li
     try:
         while True:
             message_json = await websocket.receive_text()
+
+            # Audio chunks are the bulk of the traffic, so skip full JSON parsing for them
+            audio_data = parse_audio(message_json)
+            if audio_data is not None:
+                live_request_queue.send_realtime(types.Blob(data=audio_data, mime_type="audio/l16;rate=16000"))
+                continue
+
             message = json.loads(message_json)
 
             # Handle frontend system messages for only_db_results toggle
@@ -367,7 +414,7 @@ async def create_session(current_user: Annotated[dict, Depends(get_current_user)
     )
     session_id = session.id
 
-    db.collection("sessions").document(session_id).set({
+    await db.collection("sessions").document(session_id).set({
         "user_id": user_id,
         "createdAt": datetime.datetime.utcnow(),
         "title": "New Session"
@@ -383,7 +430,7 @@ async def get_sessions(current_user: Annotated[dict, Depends(get_current_user)])
     """
     print(current_user)
     user_id = current_user["phone_number"]
-    sessions_ref = db.collection("sessions").where("user_id", "==", user_id).order_by("createdAt", direction=firestore.Query.DESCENDING).get()
+    sessions_ref = await db.collection("sessions").where("user_id", "==", user_id).order_by("createdAt", direction=firestore.Query.DESCENDING).get()
 
     sessions = []
     for doc in sessions_ref:
@@ -403,7 +450,7 @@ async def get_calls_for_session(session_id: str, current_user: Annotated[dict, D
     """
     # First, verify the user has access to the session
     session_ref = db.collection("sessions").document(session_id)
-    session_doc = session_ref.get()
+    session_doc = await session_ref.get()
     if not session_doc.exists:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -412,7 +459,7 @@ async def get_calls_for_session(session_id: str, current_user: Annotated[dict, D
         raise HTTPException(status_code=403, detail="User not authorized to access this session")
 
     # Fetch calls
-    calls_ref = db.collection("provider_conversations").where("session_id", "==", session_id).order_by("timestamp").get()
+    calls_ref = await db.collection("provider_conversations").where("session_id", "==", session_id).order_by("timestamp").get()
 
     calls = []
     for doc in calls_ref:
@@ -433,7 +480,7 @@ async def get_call_details(call_id: str, current_user: Annotated[dict, Depends(g
     Retrieves the details for a specific call, including the transcript.
     """
     call_ref = db.collection("provider_conversations").document(call_id)
-    call_doc = call_ref.get()
+    call_doc = await call_ref.get()
     if not call_doc.exists:
         raise HTTPException(status_code=404, detail="Call not found")
     
@@ -445,7 +492,7 @@ async def get_call_details(call_id: str, current_user: Annotated[dict, Depends(g
         raise HTTPException(status_code=403, detail="Call not associated with a session")
 
     session_ref = db.collection("sessions").document(session_id)
-    session_doc = session_ref.get()
+    session_doc = await session_ref.get()
     if not session_doc.exists:
         raise HTTPException(status_code=404, detail="Session not found")
     
@@ -462,11 +509,36 @@ async def get_call_details(call_id: str, current_user: Annotated[dict, Depends(g
         transcript=call_data.get("transcript")
     )
 
+@app.get("/api/campaigns/{campaign_id}")
+async def get_campaign(campaign_id: str, current_user: Annotated[dict, Depends(get_current_user)]):
+    """
+    Reports the progress of a call campaign and the outcomes so far.
+    """
+    campaign = campaign_runner.get(campaign_id)
+    if campaign is None:
+        raise HTTPException(status_code=404, detail="Campaign not found")
+    if campaign.user_id != current_user["phone_number"]:
+        raise HTTPException(status_code=403, detail="User not authorized to access this campaign")
+    return campaign.comparison()
+
+@app.get("/api/metrics")
+async def get_metrics():
+    """Reports cache and dispatcher metrics."""
+    return {
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "places_cache": places_cache.stats(),
+        "pending_call_outcomes": call_outcome_dispatcher.pending,
+        "sessions": session_service.stats() if session_service else None,
+        "call_monitor": call_monitor_relay.stats(),
+    }
+
 @app.websocket("/api/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for voice chat with authentication"""
     await websocket.accept()
     print(f"Voice client connected with session: {session_id}")
+    channel = None
+    user_id = None
 
     try:
         # Wait for authentication message
@@ -494,7 +566,7 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         # Verify session belongs to user
         try:
             session_ref = db.collection("sessions").document(session_id)
-            session_doc = session_ref.get()
+            session_doc = await session_ref.get()
             if not session_doc.exists:
                 await websocket.close(code=4004, reason="Session not found")
                 return
@@ -512,7 +584,12 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         await websocket.send_text(json.dumps({"type": "auth_success"}))
 
         # Start voice agent session
-        live_events, live_request_queue = await start_voice_agent_session(user_id, session_id, is_audio=True)
+        try:
+            live_events, live_request_queue = await start_voice_agent_session(user_id, session_id, is_audio=True)
+        except SessionStoreError as e:
+            print(f"Session store unavailable: {e}")
+            await websocket.close(code=1011, reason="Session store unavailable")
+            return
 
 
         agent_to_client_task = asyncio.create_task(
@@ -521,8 +598,11 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
         client_to_agent_task = asyncio.create_task(
             client_to_agent_messaging(websocket, live_request_queue, session_id)
         )
+        # Tools publish to the browser (e.g. candidates as Places pages arrive) through this channel
+        channel = session_channels.open(session_id)
+        channel_task = asyncio.create_task(channel.pump(websocket))
 
-        tasks = [agent_to_client_task, client_to_agent_task]
+        tasks = [agent_to_client_task, client_to_agent_task, channel_task]
         done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
 
         # Cancel remaining tasks
@@ -544,6 +624,15 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     except Exception as e:
         print(f"Error in websocket_endpoint: {e}")
     finally:
+        if channel is not None:
+            session_channels.close(session_id, channel)
+        campaign_runner.cancel_session(session_id)
+        call_monitor_relay.unwatch_session(session_id)
+        if user_id is not None:
+            # In memory, kept for a while in case the browser reconnects, then evicted first.
+            # With SESSION_BACKEND=sqlite, written to the store and dropped from this instance's
+            # cache, so a reconnect on any instance reads the latest copy.
+            session_service.release(APP_NAME, user_id, session_id)
         try:
             await websocket.close()
         except:
@@ -0,0 +1,28 @@
+import binascii
+from typing import Optional
+
+# Fast paths for the audio envelope on the browser websocket, which carries
+# every audio chunk in both directions. Other messages go through json.
+
+# Gemini Live returns 16-bit linear PCM at 24kHz.
+_AUDIO_MESSAGE_PREFIX = '{"type":"audio","data":"'
+_AUDIO_MESSAGE_SUFFIX = '","sampleRate":24000,"channels":1,"bitsPerSample":16}'
+
+# The frontend sends JSON.stringify({type: 'audio', data: base64Audio}).
+_INBOUND_AUDIO_PREFIX = '{"type":"audio","data":"'
+
+
+def audio_message(pcm_audio: bytes) -> str:
+    """Renders an outbound audio message for the browser."""
+    return _AUDIO_MESSAGE_PREFIX + binascii.b2a_base64(pcm_audio, newline=False).decode("ascii") + _AUDIO_MESSAGE_SUFFIX
+
+
+def parse_audio(raw: str) -> Optional[bytes]:
+    """Returns the decoded audio of an inbound audio message, or None if `raw` is any other message."""
+    if not raw.startswith(_INBOUND_AUDIO_PREFIX):
+        return None
+    start = len(_INBOUND_AUDIO_PREFIX)
+    end = raw.find('"', start)
+    if end < 0:
+        return None
+    return binascii.a2b_base64(raw[start:end])
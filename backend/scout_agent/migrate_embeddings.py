@@ -0,0 +1,190 @@
+"""Compare embedding profiles on real conversations and migrate to one.
+
+`report` loads a sample of `provider_conversations` and, for each profile in
+embedding_profile.PROFILES, prints:
+  - Firestore bytes per stored transcript_embedding (vectors are stored as doubles)
+  - local index bytes per vector after quantization
+  - recall@5 against exact search on the stored full-size embeddings, using
+    sampled conversations as queries
+
+Smaller profiles are derived by truncating and re-normalizing the stored vectors.
+gemini-embedding-001 is trained so its leading dimensions carry most of the
+signal, which is also what output_dimensionality does; pass --reembed to
+re-embed the sample at each size instead. It also prints the bytes one
+5-result search transfers, which no longer depends on the profile: neither
+backend reads embeddings back.
+
+`apply PROFILE` rewrites every transcript_embedding whose size differs from the
+profile, by truncation or (with --reembed) by embedding the transcript again.
+Quantization only affects the scout agent's local index, which rebuilds itself
+when EMBEDDING_PROFILE changes. Firestore's vector indexes are built for one
+dimension, so a profile with a different dimensionality also needs new vector
+indexes on transcript_embedding (the plain one and the composite one with
+geohash_prefixes) before VECTOR_SEARCH_BACKEND=firestore can search it, e.g.
+    gcloud firestore indexes composite create --collection-group=provider_conversations \
+        --query-scope=COLLECTION \
+        --field-config field-path=transcript_embedding,vector-config='{"dimension":"768","flat":"{}"}'
+and the same with a leading --field-config field-path=geohash_prefixes,array-config=contains.
+Point both services at the new EMBEDDING_PROFILE once the migration is done.
+
+Run from backend/scout_agent:
+    python3 migrate_embeddings.py report [--sample 2000] [--queries 200] [--reembed]
+    python3 migrate_embeddings.py apply PROFILE [--reembed] [--dry-run]
+"""
+import argparse
+import asyncio
+import json
+
+import google.genai as genai
+import numpy as np
+from google.cloud.firestore_v1.vector import Vector
+from google.genai.types import EmbedContentConfig
+
+from embedding_profile import EMBEDDING_MODEL, PROFILES, EmbeddingProfile
+from firestore_db import db
+from vector_index import VectorIndex, normalize
+
+LIMIT = 5
+FIRESTORE_WRITE_BATCH = 200
+EMBED_BATCH = 16
+
+
+def conversation_text(data: dict) -> str:
+    """Same text the phone agent embeds for a finished call."""
+    transcript_text = " ".join([f"{t['role']}: {t['text']} \n" for t in data.get("transcript", [])])
+    return (data.get("biz_description") or "") + "\n" + transcript_text
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    return normalize(vectors[:, :dim])
+
+
+async def embed_texts(client, texts: list[str], dim: int) -> np.ndarray:
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH):
+        response = await client.aio.models.embed_content(
+            model=EMBEDDING_MODEL,
+            contents=texts[start:start + EMBED_BATCH],
+            config=EmbedContentConfig(task_type="RETRIEVAL_DOCUMENT", output_dimensionality=dim),
+        )
+        vectors.extend(embedding.values for embedding in response.embeddings)
+    return np.asarray(vectors, dtype=np.float32)
+
+
+async def load_conversations(limit: int = None) -> list[tuple[str, dict]]:
+    query = db.collection("provider_conversations")
+    if limit:
+        query = query.limit(limit)
+    return [(doc.id, doc.to_dict()) async for doc in query.stream() if doc.get("transcript_embedding") is not None]
+
+
+def document_size(data: dict) -> int:
+    """Rough wire size of a document without its embedding."""
+    rest = {k: v for k, v in data.items() if k != "transcript_embedding"}
+    return len(json.dumps(rest, default=str).encode())
+
+
+def recall_at_k(index: VectorIndex, queries: np.ndarray, truth: list[set[str]], skip: list[str]) -> float:
+    recalls = []
+    for query, expected, own_id in zip(queries, truth, skip):
+        found = [doc_id for doc_id, _ in index.brute_force(query, LIMIT + 1) if doc_id != own_id][:LIMIT]
+        recalls.append(len(set(found) & expected) / len(expected))
+    return float(np.mean(recalls))
+
+
+async def report(sample: int, num_queries: int, reembed: bool):
+    conversations = await load_conversations(sample)
+    if len(conversations) <= LIMIT:
+        print(f"Only {len(conversations)} embedded conversations found; need more than {LIMIT}.")
+        return
+
+    ids = [doc_id for doc_id, _ in conversations]
+    full = normalize(np.asarray([list(data["transcript_embedding"]) for _, data in conversations], dtype=np.float32))
+    stored_dim = full.shape[1]
+    doc_bytes = float(np.mean([document_size(data) for _, data in conversations]))
+    query_rows = np.random.default_rng(0).choice(len(ids), size=min(num_queries, len(ids)), replace=False)
+
+    # Ground truth: exact cosine neighbours on the stored vectors, excluding the query itself.
+    truth = []
+    for row in query_rows:
+        scores = full @ full[row]
+        scores[row] = -np.inf
+        truth.append({ids[i] for i in np.argsort(-scores)[:LIMIT]})
+
+    client = genai.Client() if reembed else None
+    texts = [conversation_text(data) for _, data in conversations] if reembed else None
+
+    print(f"{len(ids)} conversations, stored embeddings have {stored_dim} dims, {len(query_rows)} queries")
+    print(f"{LIMIT * doc_bytes:,.0f} bytes transferred per {LIMIT}-result search\n")
+    print(f"{'profile':<10}{'dims':>6}{'quant':>9}{'firestore B':>13}{'index B':>10}{'recall@5':>10}")
+    for profile in PROFILES.values():
+        if profile.dimensionality > stored_dim and not reembed:
+            print(f"{profile.name:<10}{profile.dimensionality:>6}  skipped: stored vectors are smaller, use --reembed")
+            continue
+        vectors = await embed_texts(client, texts, profile.dimensionality) if reembed else truncate(full, profile.dimensionality)
+        index = VectorIndex(profile.dimensionality, quantization=profile.quantization)
+        for doc_id, vector in zip(ids, vectors):
+            index.upsert(doc_id, vector)
+        recall = recall_at_k(index, vectors[query_rows], truth, [ids[row] for row in query_rows])
+
+        firestore_bytes = profile.dimensionality * 8
+        print(
+            f"{profile.name:<10}{profile.dimensionality:>6}{profile.quantization:>9}{firestore_bytes:>13,}"
+            f"{index.bytes_per_vector:>10,.0f}{recall:>10.3f}"
+        )
+
+
+async def apply(profile: EmbeddingProfile, reembed: bool, dry_run: bool):
+    conversations = await load_conversations()
+    stale = [(doc_id, data) for doc_id, data in conversations if len(data["transcript_embedding"]) != profile.dimensionality]
+    print(f"{len(stale)} of {len(conversations)} conversations need {profile.dimensionality}-dim embeddings.")
+
+    if not reembed:
+        too_small = [doc_id for doc_id, data in stale if len(data["transcript_embedding"]) < profile.dimensionality]
+        if too_small:
+            print(f"{len(too_small)} stored embeddings are smaller than {profile.dimensionality} dims; rerun with --reembed.")
+            return
+    if dry_run or not stale:
+        return
+
+    client = genai.Client() if reembed else None
+    migrated = 0
+    for start in range(0, len(stale), FIRESTORE_WRITE_BATCH):
+        chunk = stale[start:start + FIRESTORE_WRITE_BATCH]
+        if reembed:
+            vectors = await embed_texts(client, [conversation_text(data) for _, data in chunk], profile.dimensionality)
+        else:
+            vectors = truncate(np.asarray([list(data["transcript_embedding"]) for _, data in chunk], dtype=np.float32), profile.dimensionality)
+
+        write_batch = db.batch()
+        for (doc_id, _), vector in zip(chunk, vectors):
+            write_batch.update(db.collection("provider_conversations").document(doc_id), {
+                "transcript_embedding": Vector(vector.tolist()),
+                "embedding_dimensionality": profile.dimensionality,
+            })
+        await write_batch.commit()
+        migrated += len(chunk)
+        print(f"Migrated {migrated}/{len(stale)} conversations.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    report_parser = commands.add_parser("report", help="compare storage, transfer and recall@5 per profile")
+    report_parser.add_argument("--sample", type=int, default=2000)
+    report_parser.add_argument("--queries", type=int, default=200)
+    report_parser.add_argument("--reembed", action="store_true")
+    apply_parser = commands.add_parser("apply", help="rewrite stored embeddings for a profile")
+    apply_parser.add_argument("profile", choices=list(PROFILES))
+    apply_parser.add_argument("--reembed", action="store_true")
+    apply_parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "report":
+        asyncio.run(report(args.sample, args.queries, args.reembed))
+    else:
+        asyncio.run(apply(PROFILES[args.profile], args.reembed, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
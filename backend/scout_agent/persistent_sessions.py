@@ -0,0 +1,434 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+from typing import Any, Optional
+
+from google.adk.events import Event
+from google.adk.sessions import Session
+from google.adk.sessions.base_session_service import GetSessionConfig, ListSessionsResponse
+from google.adk.sessions.state import State
+
+from session_store import BoundedSessionService, SessionKey
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    state TEXT NOT NULL, last_update_time REAL NOT NULL,
+    PRIMARY KEY (app_name, user_id, session_id)
+);
+CREATE TABLE IF NOT EXISTS events (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, session_id TEXT NOT NULL,
+    event TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_by_session ON events (app_name, user_id, session_id);
+CREATE TABLE IF NOT EXISTS user_state (
+    app_name TEXT NOT NULL, user_id TEXT NOT NULL, state TEXT NOT NULL,
+    PRIMARY KEY (app_name, user_id)
+);
+CREATE TABLE IF NOT EXISTS app_state (
+    app_name TEXT PRIMARY KEY, state TEXT NOT NULL
+);
+"""
+
+
+def dump_state(state: dict) -> str:
+    # Tools keep pydantic models in state (e.g. formatted_businesses); they come back as dicts.
+    return json.dumps(state, default=lambda value: value.model_dump() if hasattr(value, "model_dump") else str(value))
+
+
+def split_state_delta(delta: dict) -> tuple[dict, dict, dict]:
+    """(app, user, session) parts of a state delta, the way ADK stores them. Temp keys are never stored."""
+    app, user, session = {}, {}, {}
+    for key, value in delta.items():
+        if key.startswith(State.APP_PREFIX):
+            app[key.removeprefix(State.APP_PREFIX)] = value
+        elif key.startswith(State.USER_PREFIX):
+            user[key.removeprefix(State.USER_PREFIX)] = value
+        elif not key.startswith(State.TEMP_PREFIX):
+            session[key] = value
+    return app, user, session
+
+
+class SessionStoreError(Exception):
+    """The store could not be read, so whether a session exists is unknown."""
+
+
+class PendingSession:
+    """A session's unwritten changes: all of its state if the store has never
+    seen it (`session` is set), else just the keys set since the last flush."""
+
+    __slots__ = ("session", "delta", "last_update_time")
+
+    def __init__(self, session: Optional[Session] = None):
+        self.session = session
+        self.delta: dict = {}
+        self.last_update_time = session.last_update_time if session is not None else 0.0
+
+
+class SqliteSessionStore:
+    """Sessions, their events and user/app state in SQLite.
+
+    The local stand-in for a shared store: instances that share the database
+    file share sessions. Calls block, so the service runs them in a thread.
+
+    State is written as deltas merged into the stored state inside the write
+    transaction, so two instances changing the same session keep both sets of
+    changes instead of the last writer's whole copy winning.
+    """
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def write(self, deletes: list[SessionKey], sessions: list[tuple], events: list[tuple], user_states: list[tuple], app_states: list[tuple]) -> dict[SessionKey, tuple[float, Optional[dict]]]:
+        """Applies one batch of changes in a single transaction.
+
+        Session rows are (app_name, user_id, session_id, state, last_update_time,
+        whole, expected_version): `state` replaces the stored state if `whole`,
+        and is merged into it otherwise. User and app state rows are always
+        merged. Returns each session's new version (its last_update_time), with
+        the merged state when the stored version was not `expected_version`,
+        i.e. another instance changed the session since the caller last saw it.
+        """
+        written = {}
+        with self._lock:
+            # IMMEDIATE takes the write lock up front, so no other instance writes between our reads and writes.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key in deletes:
+                    self._conn.execute("DELETE FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+                    self._conn.execute("DELETE FROM events WHERE app_name = ? AND user_id = ? AND session_id = ?", key)
+                for app_name, user_id, session_id, state, last_update_time, whole, expected_version in sessions:
+                    key = (app_name, user_id, session_id)
+                    row = None if whole else self._conn.execute(
+                        "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?", key,
+                    ).fetchone()
+                    if row is None:
+                        self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?, ?)", (*key, state, last_update_time))
+                        written[key] = (last_update_time, None)
+                        continue
+                    merged = {**json.loads(row[0]), **json.loads(state)}
+                    version = max(row[1], last_update_time)
+                    self._conn.execute(
+                        "UPDATE sessions SET state = ?, last_update_time = ? WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                        (json.dumps(merged), version, *key),
+                    )
+                    written[key] = (version, merged if row[1] != expected_version else None)
+                self._conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", events)
+                for app_name, user_id, delta in user_states:
+                    row = self._conn.execute("SELECT state FROM user_state WHERE app_name = ? AND user_id = ?", (app_name, user_id)).fetchone()
+                    merged = {**(json.loads(row[0]) if row else {}), **json.loads(delta)}
+                    self._conn.execute("INSERT OR REPLACE INTO user_state VALUES (?, ?, ?)", (app_name, user_id, json.dumps(merged)))
+                for app_name, delta in app_states:
+                    row = self._conn.execute("SELECT state FROM app_state WHERE app_name = ?", (app_name,)).fetchone()
+                    merged = {**(json.loads(row[0]) if row else {}), **json.loads(delta)}
+                    self._conn.execute("INSERT OR REPLACE INTO app_state VALUES (?, ?)", (app_name, json.dumps(merged)))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return written
+
+    def load_session(self, app_name: str, user_id: str, session_id: str) -> Optional[tuple[dict, float, list[str], dict, dict]]:
+        """(session state, last update time, serialized events, user state, app state), or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, last_update_time FROM sessions WHERE app_name = ? AND user_id = ? AND session_id = ?",
+                (app_name, user_id, session_id),
+            ).fetchone()
+            if row is None:
+                return None
+            events = [event for (event,) in self._conn.execute(
+                "SELECT event FROM events WHERE app_name = ? AND user_id = ? AND session_id = ? ORDER BY rowid",
+                (app_name, user_id, session_id),
+            )]
+            user_state = self._conn.execute("SELECT state FROM user_state WHERE app_name = ? AND user_id = ?", (app_name, user_id)).fetchone()
+            app_state = self._conn.execute("SELECT state FROM app_state WHERE app_name = ?", (app_name,)).fetchone()
+        return (
+            json.loads(row[0]),
+            row[1],
+            events,
+            json.loads(user_state[0]) if user_state else {},
+            json.loads(app_state[0]) if app_state else {},
+        )
+
+    def list_sessions(self, app_name: str, user_id: Optional[str]) -> list[tuple[str, str, dict, float]]:
+        query = "SELECT user_id, session_id, state, last_update_time FROM sessions WHERE app_name = ?"
+        params: tuple = (app_name,)
+        if user_id is not None:
+            query += " AND user_id = ?"
+            params += (user_id,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [(uid, sid, json.loads(state), updated) for uid, sid, state, updated in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class PersistentSessionService(BoundedSessionService):
+    """Session service backed by a shared store, with this instance's memory as a cache.
+
+    Reads are served from memory when the session is cached here and read
+    through to the store otherwise, so a websocket that reconnects to another
+    instance finds its session. Writes update memory right away and reach the
+    store in batches (write-behind): after `flush_interval` seconds, or sooner
+    once `batch_size` changes are pending. Several state updates to a session
+    in one batch become a single row write of just the keys they set, which the
+    store merges into what it holds. If another instance changed the session in
+    the meantime, the merged state is read back into this instance's copy.
+
+    `release` drops a session from the cache once its websocket closes, so the
+    next read, wherever it happens, comes from the store rather than a stale copy.
+    """
+
+    def __init__(self, store: SqliteSessionStore, flush_interval: Optional[float] = None, batch_size: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("SESSION_FLUSH_INTERVAL_SECONDS", "0.25"))
+        self.batch_size = batch_size or int(os.getenv("SESSION_FLUSH_BATCH_SIZE", "200"))
+
+        self._pending_deletes: set[SessionKey] = set()
+        # Live objects, serialized when flushed, so only the latest values are written.
+        self._pending_sessions: dict[SessionKey, PendingSession] = {}
+        self._pending_events: list[tuple] = []
+        # State deltas, merged into the stored user and app state.
+        self._pending_user_states: dict[tuple[str, str], dict] = {}
+        self._pending_app_states: dict[str, dict] = {}
+        # The last_update_time the store had for each cached session when this instance last read or wrote it.
+        self._versions: dict[SessionKey, float] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flush_lock = asyncio.Lock()
+        self._flush_tasks: set[asyncio.Task] = set()
+
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.flush_errors = 0
+        self.conflicts = 0
+
+    # --- Session service ---
+    async def create_session(self, *, app_name: str, user_id: str, state: Optional[dict[str, Any]] = None, session_id: Optional[str] = None) -> Session:
+        # An ID taken on another instance must not be overwritten; the parent checks this instance's cache.
+        if session_id and session_id not in self.sessions.get(app_name, {}).get(user_id, {}):
+            await self._load(app_name, user_id, session_id)
+        session = await super().create_session(app_name=app_name, user_id=user_id, state=state, session_id=session_id)
+        key = (app_name, user_id, session.id)
+        self._pending_deletes.discard(key)
+        self._pending_sessions[key] = PendingSession(self.sessions[app_name][user_id][session.id])
+        self._queue_shared_state(app_name, user_id, state or {})
+        self._schedule_flush()
+        return session
+
+    async def get_session(self, *, app_name: str, user_id: str, session_id: str, config: Optional[GetSessionConfig] = None) -> Optional[Session]:
+        if session_id not in self.sessions.get(app_name, {}).get(user_id, {}):
+            self.cache_misses += 1
+            if not await self._load(app_name, user_id, session_id):
+                return None
+        else:
+            self.cache_hits += 1
+        return await super().get_session(app_name=app_name, user_id=user_id, session_id=session_id, config=config)
+
+    async def list_sessions(self, *, app_name: str, user_id: Optional[str] = None) -> ListSessionsResponse:
+        await self.flush()
+        rows = await asyncio.to_thread(self.store.list_sessions, app_name, user_id)
+        sessions = [Session(app_name=app_name, user_id=uid, id=sid, state=state, last_update_time=updated) for uid, sid, state, updated in rows]
+        sessions.sort(key=lambda s: (s.last_update_time, s.user_id, s.id))
+        return ListSessionsResponse(sessions=sessions)
+
+    async def delete_session(self, *, app_name: str, user_id: str, session_id: str) -> None:
+        await super().delete_session(app_name=app_name, user_id=user_id, session_id=session_id)
+        key = (app_name, user_id, session_id)
+        self._pending_sessions.pop(key, None)
+        self._pending_events = [row for row in self._pending_events if row[:3] != key]
+        self._pending_deletes.add(key)
+        self._schedule_flush()
+
+    async def flush(self) -> None:
+        """Writes every pending change to the store."""
+        async with self._flush_lock:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            pending = (self._pending_deletes, self._pending_sessions, self._pending_events, self._pending_user_states, self._pending_app_states)
+            if not any(pending):
+                return
+            self._pending_deletes = set()
+            self._pending_sessions = {}
+            self._pending_events = []
+            self._pending_user_states = {}
+            self._pending_app_states = {}
+            deletes, sessions, events, user_states, app_states = pending
+            batch = (
+                list(deletes),
+                [
+                    (*key, dump_state(change.session.state), change.session.last_update_time, True, None) if change.session is not None
+                    else (*key, dump_state(change.delta), change.last_update_time, False, self._versions.get(key))
+                    for key, change in sessions.items()
+                ],
+                events,
+                [(app_name, user_id, dump_state(state)) for (app_name, user_id), state in user_states.items()],
+                [(app_name, dump_state(state)) for app_name, state in app_states.items()],
+            )
+            try:
+                written = await asyncio.to_thread(self.store.write, *batch)
+            except Exception as e:
+                # Put it back, behind anything newer, so the next flush retries it.
+                self.flush_errors += 1
+                print(f"Error writing sessions to the store: {e}")
+                self._requeue(*pending)
+                self._schedule_flush()
+                return
+            self.flushes += 1
+            self.rows_written += sum(len(rows) for rows in batch)
+            for key, (version, merged) in written.items():
+                # Sessions evicted meanwhile are read through from the store next time anyway.
+                if key not in self._bytes:
+                    continue
+                self._versions[key] = version
+                if merged is not None:
+                    self.conflicts += 1
+                    self._merge_stored_state(key, merged, sessions[key])
+
+    # --- Lifecycle ---
+    def release(self, app_name: str, user_id: str, session_id: str):
+        """Drops the session from this instance's cache right away, rather than after `released_ttl`.
+
+        The store keeps it for whoever resumes it, and a cached copy here could
+        go stale if the browser reconnects to another instance.
+        """
+        key = (app_name, user_id, session_id)
+        if key in self._active or key in self._released:
+            self._drop(key)
+        self._schedule_flush(now=True)
+
+    async def close(self):
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    def stats(self) -> dict:
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            **super().stats(),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "pending_writes": len(self._pending_sessions) + len(self._pending_events) + len(self._pending_deletes),
+            "flushes": self.flushes,
+            "rows_written": self.rows_written,
+            "flush_errors": self.flush_errors,
+            "conflicts": self.conflicts,
+        }
+
+    # --- Internals ---
+    def _event_appended(self, key: SessionKey, event: Event, serialized: str):
+        app_name, user_id, _ = key
+        self._pending_events.append((*key, serialized))
+        change = self._pending_sessions.setdefault(key, PendingSession())
+        change.last_update_time = event.timestamp
+        if event.actions and event.actions.state_delta:
+            change.delta.update(self._queue_shared_state(app_name, user_id, event.actions.state_delta))
+        self._schedule_flush()
+
+    def _queue_shared_state(self, app_name: str, user_id: str, delta: dict) -> dict:
+        """Queues the user and app parts of a state delta; returns the session part."""
+        app, user, session = split_state_delta(delta)
+        if user:
+            self._pending_user_states.setdefault((app_name, user_id), {}).update(user)
+        if app:
+            self._pending_app_states.setdefault(app_name, {}).update(app)
+        return session
+
+    def _merge_stored_state(self, key: SessionKey, merged: dict, written: PendingSession):
+        """Takes in what other instances wrote to the session, keeping keys this one has set since."""
+        app_name, user_id, session_id = key
+        session = self.sessions[app_name][user_id][session_id]
+        newer = self._pending_sessions.get(key)
+        for name, value in merged.items():
+            if name not in written.delta and (newer is None or name not in newer.delta):
+                session.state[name] = value
+
+    def _requeue(self, deletes, sessions, events, user_states, app_states):
+        for key in deletes:
+            if key not in self._pending_sessions:
+                self._pending_deletes.add(key)
+        for key, change in sessions.items():
+            if key in self._pending_deletes:
+                continue
+            newer = self._pending_sessions.setdefault(key, change)
+            if newer is not change:
+                newer.delta = {**change.delta, **newer.delta}
+                newer.session = newer.session or change.session
+        self._pending_events = [row for row in events if row[:3] not in self._pending_deletes] + self._pending_events
+        for key, state in user_states.items():
+            self._pending_user_states[key] = {**state, **self._pending_user_states.get(key, {})}
+        for key, state in app_states.items():
+            self._pending_app_states[key] = {**state, **self._pending_app_states.get(key, {})}
+
+    def _forget(self, key: SessionKey) -> bool:
+        self._versions.pop(key, None)
+        return super()._forget(key)
+
+    def _schedule_flush(self, now: bool = False):
+        pending = len(self._pending_sessions) + len(self._pending_events) + len(self._pending_deletes)
+        if now or pending >= self.batch_size:
+            if self._flush_handle is not None:
+                self._flush_handle.cancel()
+                self._flush_handle = None
+            self._start_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.flush_interval, self._start_flush)
+
+    def _start_flush(self):
+        self._flush_handle = None
+        task = asyncio.create_task(self.flush())
+        self._flush_tasks.add(task)
+        task.add_done_callback(self._flush_tasks.discard)
+
+    async def _load(self, app_name: str, user_id: str, session_id: str) -> bool:
+        """Reads a session through from the store into the cache."""
+        # This instance may still hold unwritten changes to it from before it was evicted.
+        await self.flush()
+        try:
+            loaded = await asyncio.to_thread(self.store.load_session, app_name, user_id, session_id)
+        except Exception as e:
+            raise SessionStoreError(f"Could not load session {session_id}: {e}") from e
+        if loaded is None:
+            return False
+        state, last_update_time, events, user_state, app_state = loaded
+        # Another request may have loaded it while this one waited on the store.
+        if session_id in self.sessions.get(app_name, {}).get(user_id, {}):
+            return True
+        session = Session(
+            app_name=app_name,
+            user_id=user_id,
+            id=session_id,
+            state=state,
+            events=[Event.model_validate_json(event) for event in events],
+            last_update_time=last_update_time,
+        )
+        self.sessions.setdefault(app_name, {}).setdefault(user_id, {})[session_id] = session
+        if user_state:
+            self.user_state.setdefault(app_name, {}).setdefault(user_id, {}).update(user_state)
+        if app_state:
+            self.app_state.setdefault(app_name, {}).update(app_state)
+        key = (app_name, user_id, session_id)
+        self._versions[key] = last_update_time
+        self._active[key] = self._clock()
+        self._resize(key, len(dump_state(state)) + sum(len(event) for event in events))
+        self._evict()
+        return True
+
+
+def create_session_service() -> BoundedSessionService:
+    """The session service selected by SESSION_BACKEND: "memory" (default) or "sqlite"."""
+    if os.getenv("SESSION_BACKEND", "memory") == "sqlite":
+        return PersistentSessionService(SqliteSessionStore(os.getenv("SESSION_DB_PATH", "sessions.db")))
+    return BoundedSessionService()
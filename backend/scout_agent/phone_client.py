@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+
+import httpx
+
+# All scout -> phone_agent requests share one keep-alive (HTTP/2 where the server offers it)
+# connection pool per process, so initiating a call costs no handshake and never blocks the event loop.
+# PHONE_AGENT_BASE_URL overrides the https://PHONE_AGENT_SERVER_HOST default, e.g. for a local phone agent.
+
+
+class PhoneAgentClient:
+    """Minimal async client for the phone agent's dialer API."""
+
+    def __init__(self, base_url: str, max_connections: int = 20, timeout: float = 10.0, connect_retries: int = 2, verify=True):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=httpx.Timeout(timeout, connect=5.0),
+            # Only failed connection attempts are retried: the request never reached the
+            # phone agent, so retrying can't place the same call twice.
+            transport=httpx.AsyncHTTPTransport(
+                http2=True,
+                retries=connect_retries,
+                verify=verify,
+                limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=120),
+            ),
+        )
+
+    async def initiate_call(self, params: dict) -> dict:
+        """Asks the phone agent to place a call. Returns its response (call_id, status, position)."""
+        response = await self._client.post("/dialer/initiate_call", params=params)
+        response.raise_for_status()
+        return response.json()
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_phone_client: Optional[PhoneAgentClient] = None
+
+
+def phone_agent_base_url() -> str:
+    return os.getenv("PHONE_AGENT_BASE_URL") or f"https://{os.getenv('PHONE_AGENT_SERVER_HOST')}"
+
+
+def get_phone_client() -> PhoneAgentClient:
+    """Returns the process-wide phone agent client, creating it on first use."""
+    global _phone_client
+    if _phone_client is None:
+        _phone_client = PhoneAgentClient(
+            base_url=phone_agent_base_url(),
+            max_connections=int(os.getenv("PHONE_AGENT_MAX_CONNECTIONS", "20")),
+            timeout=float(os.getenv("PHONE_AGENT_TIMEOUT_SECONDS", "10")),
+            connect_retries=int(os.getenv("PHONE_AGENT_CONNECT_RETRIES", "2")),
+        )
+    return _phone_client
+
+
+async def close_phone_client():
+    global _phone_client
+    if _phone_client is not None:
+        await _phone_client.close()
+        _phone_client = None
@@ -0,0 +1,101 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from embedding_cache import normalize_query
+
+
+def places_cache_key(query: str, geo: str) -> str:
+    """Cache key for a Places lookup: case, punctuation and spacing differences don't matter."""
+    return f"{normalize_query(query)}|{normalize_query(geo)}"
+
+
+class PlacesCache:
+    """TTL cache for Google Places lookups, shared by every session in the process.
+
+    Entries expire `ttl` seconds after they were fetched and the least recently
+    used ones are evicted past `max_entries`. Concurrent callers asking for the
+    same key while it is being fetched wait on that one request instead of
+    sending their own. Failed lookups are not cached.
+    """
+
+    def __init__(self, ttl: float = 900.0, max_entries: int = 512, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._in_flight: dict[str, asyncio.Future] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.expired = 0
+        self.evicted = 0
+        self.errors = 0
+
+    async def get_or_fetch(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """Returns the cached value for `key`, calling `fetch` only when there is none."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, value = entry
+            if self._clock() - fetched_at < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expired += 1
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            try:
+                # Shielded so one waiter being cancelled doesn't cancel the shared request.
+                return await asyncio.shield(in_flight)
+            except asyncio.CancelledError:
+                # The caller that owned the request was cancelled, not us: fetch it ourselves.
+                if in_flight.cancelled() and not asyncio.current_task().cancelling():
+                    return await self.get_or_fetch(key, fetch)
+                raise
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            value = await fetch()
+        except BaseException as e:
+            self.errors += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Retrieve it here so an error nobody else waited for isn't logged as unhandled.
+                future.exception()
+            raise
+        else:
+            self._remember(key, value)
+            future.set_result(value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "errors": self.errors,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, value: Any):
+        self._entries[key] = (self._clock(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
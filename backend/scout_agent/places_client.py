@@ -0,0 +1,57 @@
+import os
+from typing import Optional
+
+import httpx
+
+# Places lookups share one keep-alive connection pool per process and never block the event loop.
+# Point GOOGLE_PLACES_API_BASE_URL at a local fake server to exercise this without a Maps key.
+DEFAULT_BASE_URL = "https://places.googleapis.com"
+FIELD_MASK = "places.displayName,places.formattedAddress,places.nationalPhoneNumber,places.internationalPhoneNumber,places.location,places.editorialSummary,places.photos,nextPageToken"
+MAX_PAGE_SIZE = 20
+
+
+class AsyncPlacesClient:
+    """Minimal async client for Places API (New) Text Search."""
+
+    def __init__(self, api_key: str, base_url: str = DEFAULT_BASE_URL, max_connections: int = 10, timeout: float = 10.0):
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            headers={"X-Goog-Api-Key": api_key, "X-Goog-FieldMask": FIELD_MASK},
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections, keepalive_expiry=60),
+        )
+
+    async def search_text(self, text_query: str, page_token: Optional[str] = None, page_size: int = MAX_PAGE_SIZE) -> tuple[list[dict], Optional[str]]:
+        """Returns one page of places and the token for the next page, if any."""
+        payload = {"textQuery": text_query, "pageSize": page_size}
+        if page_token:
+            payload["pageToken"] = page_token
+        response = await self._client.post("/v1/places:searchText", json=payload)
+        response.raise_for_status()
+        body = response.json()
+        return body.get("places", []), body.get("nextPageToken")
+
+    async def close(self):
+        await self._client.aclose()
+
+
+_places_client: Optional[AsyncPlacesClient] = None
+
+
+def get_places_client() -> AsyncPlacesClient:
+    """Returns the process-wide Places client, creating it on first use."""
+    global _places_client
+    if _places_client is None:
+        _places_client = AsyncPlacesClient(
+            api_key=os.getenv("GOOGLE_MAPS_API_KEY", ""),
+            base_url=os.getenv("GOOGLE_PLACES_API_BASE_URL", DEFAULT_BASE_URL),
+            max_connections=int(os.getenv("PLACES_MAX_CONNECTIONS", "10")),
+        )
+    return _places_client
+
+
+async def close_places_client():
+    global _places_client
+    if _places_client is not None:
+        await _places_client.close()
+        _places_client = None
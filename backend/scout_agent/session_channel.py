@@ -0,0 +1,65 @@
+import asyncio
+import json
+from typing import Optional, Union
+
+from fastapi import WebSocket
+
+
+class SessionChannel:
+    """Outbound messages for one browser websocket that don't come from the live agent.
+
+    Tools run inside the agent loop and have no handle on the websocket, so they
+    publish here and `pump` delivers in order. If the browser falls behind by
+    more than `max_pending` messages, new ones are dropped rather than queued
+    without bound; `lossy` messages (live call audio) already once the queue is
+    half full, leaving room for the rest. Messages are dicts, or strings that
+    are already JSON.
+    """
+
+    def __init__(self, max_pending: int = 256):
+        self.queue: asyncio.Queue = asyncio.Queue(max_pending)
+        self.dropped = 0
+
+    def publish(self, message: Union[dict, str], lossy: bool = False) -> bool:
+        if lossy and self.queue.qsize() * 2 >= self.queue.maxsize:
+            self.dropped += 1
+            return False
+        try:
+            self.queue.put_nowait(message)
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            return False
+
+    async def pump(self, websocket: WebSocket):
+        while True:
+            message = await self.queue.get()
+            await websocket.send_text(message if isinstance(message, str) else json.dumps(message))
+
+
+class SessionChannels:
+    """Registry of the channels of currently connected sessions."""
+
+    def __init__(self):
+        self._channels: dict[str, SessionChannel] = {}
+
+    def open(self, session_id: str) -> SessionChannel:
+        channel = SessionChannel()
+        self._channels[session_id] = channel
+        return channel
+
+    def close(self, session_id: str, channel: SessionChannel):
+        # A reconnect may already have replaced this channel.
+        if self._channels.get(session_id) is channel:
+            del self._channels[session_id]
+
+    def get(self, session_id: str) -> Optional[SessionChannel]:
+        return self._channels.get(session_id)
+
+    def publish(self, session_id: str, message: Union[dict, str], lossy: bool = False) -> bool:
+        """Sends a message to the session's browser, if it is connected."""
+        channel = self._channels.get(session_id)
+        return channel.publish(message, lossy) if channel else False
+
+
+session_channels = SessionChannels()
@@ -0,0 +1,49 @@
+from typing import Callable
+
+from passages import build_passages, estimate_tokens, tokenize
+
+# A passage's salience counts for about as much as one rare query term.
+SALIENCE_WEIGHT = 1.0
+
+
+def select_snippets(data: dict, query: str, budget: int, idf: Callable[[str], float]) -> tuple[str, int]:
+    """Returns the most query-relevant parts of a conversation within `budget` tokens.
+
+    The outcome summary goes first, then the best-scoring passages in transcript
+    order. Passages that neither match the query nor carry a fact are left out.
+    Passages are scored by the idf of the query terms they contain plus
+    the salience the phone agent computed when the call ended. Older
+    conversations without stored passages are split here instead.
+
+    Returns:
+        The snippet text and the number of tokens it used.
+    """
+    lines = []
+    used = 0
+    summary = data.get("outcome_summary")
+    if summary:
+        line = f"Outcome: {summary}"
+        cost = estimate_tokens(line)
+        if cost <= budget:
+            lines.append(line)
+            used += cost
+
+    passages = data.get("transcript_passages")
+    if passages is None:
+        passages = build_passages(data.get("transcript", []))
+    query_terms = set(tokenize(query))
+
+    def score(passage: dict) -> float:
+        return sum(idf(term) for term in query_terms.intersection(passage["terms"])) + SALIENCE_WEIGHT * passage["salience"]
+
+    chosen = []
+    for passage in sorted(passages, key=score, reverse=True):
+        if score(passage) <= 0:
+            break
+        if used + passage["tokens"] > budget:
+            continue
+        chosen.append(passage)
+        used += passage["tokens"]
+
+    lines.extend(passage["text"] for passage in sorted(chosen, key=lambda p: p["turn"]))
+    return "\n".join(lines), used
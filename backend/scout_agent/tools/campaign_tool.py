@@ -0,0 +1,101 @@
+import os
+from typing import List, Optional
+from google.adk.tools.tool_context import ToolContext
+from pydantic import BaseModel
+
+from business_index import business_index, normalize_phone
+from call_monitor import call_monitor_relay
+from call_outcomes import call_outcome_dispatcher
+from campaigns import CAMPAIGN_MAX_CALLS, SKIPPED, Campaign, CampaignCall, CampaignRunner
+from session_channel import session_channels
+from tools.outreach_tool import request_call
+
+class CampaignStartedResult(BaseModel):
+    message: str
+    campaign_id: Optional[str] = None
+
+def publish_progress(campaign: Campaign):
+    """Shows the campaign's calls filling in on the browser as outcomes arrive."""
+    session_channels.publish(campaign.session_id, {"type": "campaign", "campaign": campaign.comparison()})
+
+async def place_campaign_call(campaign: Campaign, call: CampaignCall) -> Optional[str]:
+    params = {"initiator_user_id": campaign.user_id, "phone_number": normalize_phone(call.phone_number) or call.phone_number, "outcome": campaign.objective, "server_url": os.environ.get("PHONE_AGENT_SERVER_HOST"), "biz_name": call.biz_name, "biz_description": call.biz_description, "session_id": campaign.session_id, "user_context": campaign.user_context}
+    if call.lat is not None and call.lng is not None:
+        params.update(lat=call.lat, lng=call.lng)
+    call_id = await request_call(params)
+    print(f"Campaign {campaign.campaign_id}: called {call.biz_name} with call ID: {call_id}")
+    if call_id:
+        call_monitor_relay.watch(call_id, campaign.session_id)
+    return call_id
+
+campaign_runner = CampaignRunner(place_campaign_call, call_outcome_dispatcher.wait_for, on_update=publish_progress)
+
+def describe_business(description: Optional[str], business: dict) -> str:
+    """What the phone agent is told about a business: the given description, else Places', plus its address."""
+    description = (description or business.get("biz_description") or "").strip()
+    address = business.get("address")
+    if address and address not in description:
+        description = f"{description} Address: {address}".strip()
+    return description
+
+async def start_call_campaign(phone_numbers: List[str], biz_names: List[str], biz_descriptions: List[str], desired_outcome: str, user_context: str, tool_context: ToolContext) -> CampaignStartedResult:
+    """Calls several businesses at the same time with the same objective, e.g. to gather quotes. Use this instead of initiate_outcall whenever more than one business should be called. YOU MUST HAVE ANSWERS TO ALL ANTICIPATED QUESTIONS BEFORE CALLING THIS TOOL.
+
+    Args:
+        phone_numbers: Phone numbers of the businesses to call, taken from get_phone_numbers_tool results.
+        biz_names: The name of each business, in the same order as phone_numbers.
+        biz_descriptions: A description of each business, in the same order as phone_numbers. Use an empty string if unknown.
+        desired_outcome: The desired outcome of every call including any details we should collect from the businesses.
+        user_context: A profile of the user and their needs. This should include answers to ALL anticipated questions from the businesses.
+        tool_context: The context of the tool, containing session and state information.
+
+    Returns:
+        A confirmation that the calls were started. A single comparison of all outcomes follows once every call has finished.
+    """
+    if not os.environ.get("PHONE_AGENT_SERVER_HOST"):
+        return CampaignStartedResult(message="Error: PHONE_AGENT_SERVER_HOST environment variable is not set.")
+
+    candidates = tool_context.state.get("formatted_businesses")
+    if hasattr(candidates, "model_dump"):
+        candidates = candidates.model_dump()
+    by_phone = {normalize_phone(b.get("phone_number")): b for b in (candidates or {}).get("businesses", [])}
+
+    contacts = await business_index.last_contacts(phone_numbers)
+    calls = []
+    seen = set()
+    for i, phone_number in enumerate(phone_numbers):
+        phone = normalize_phone(phone_number) or phone_number
+        if phone in seen:
+            continue
+        seen.add(phone)
+        business = by_phone.get(phone, {})
+        call = CampaignCall(
+            biz_name=business.get("name") or (biz_names[i] if i < len(biz_names) else "") or phone_number,
+            phone_number=phone_number,
+            biz_description=describe_business(biz_descriptions[i] if i < len(biz_descriptions) else None, business),
+            lat=business.get("lat"),
+            lng=business.get("lng"),
+        )
+        # Reuse a recent call by another session instead of calling again.
+        contact = contacts.get(phone)
+        if contact and contact.blocks(tool_context.session.id):
+            call.status = SKIPPED
+            call.call_id = contact.call_id
+            call.outcome_summary = contact.outcome_summary
+            call.success = contact.success
+        calls.append(call)
+    left_out = len(calls) - CAMPAIGN_MAX_CALLS
+    calls = calls[:CAMPAIGN_MAX_CALLS]
+    if not calls:
+        return CampaignStartedResult(message="No phone numbers to call.")
+
+    campaign = campaign_runner.start(tool_context.session.id, tool_context.session.user_id, desired_outcome, user_context, calls)
+    skipped = sum(1 for call in calls if call.status == SKIPPED)
+    print(f"Started campaign {campaign.campaign_id} with {len(calls)} businesses ({skipped} already called recently)")
+    message = f"Calling {len(calls) - skipped} businesses now. A comparison of all results will follow when the calls finish; don't place these calls again."
+    if left_out > 0:
+        message += f" {left_out} other numbers were left out because a campaign calls at most {CAMPAIGN_MAX_CALLS} businesses; tell the user and start another campaign for them if they want."
+    return CampaignStartedResult(
+        message=message,
+        campaign_id=campaign.campaign_id,
+    )
@@ -1,28 +1,121 @@
 import os
 import json
-import requests
-from typing import List, Optional
+import asyncio
+import httpx
+from typing import AsyncIterator, List, Optional
 from pydantic import BaseModel
 from google.adk.tools.tool_context import ToolContext
 
+from business_index import RECENT_CONTACT_WINDOW, business_index, normalize_phone
+from places_cache import PlacesCache, places_cache_key
+from places_client import get_places_client
+from session_channel import session_channels
+
+# Sessions often look up the same trade in the same area minutes apart.
+places_cache = PlacesCache(
+    ttl=float(os.getenv("PLACES_CACHE_TTL_SECONDS", "900")),
+    max_entries=int(os.getenv("PLACES_CACHE_SIZE", "512")),
+)
+# Each Text Search page holds up to 20 places.
+PLACES_MAX_PAGES = int(os.getenv("PLACES_MAX_PAGES", "3"))
+
 
 class BusinessSchema(BaseModel):
     name: str
     phone_number: str
     address: Optional[str]
+    biz_description: Optional[str] = None
     rating: Optional[float]
     review_count: Optional[int]
     picture: Optional[str]
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    last_contacted: Optional[dict] = None
 
 class ResearchAgentOutputSchema(BaseModel):
     businesses: List[BusinessSchema]
 
-def get_phone_numbers_tool(google_places_query: str, geo: str, tool_context: ToolContext) -> str:
+async def iter_places_pages(text_query: str, cache_key: str, max_pages: int = PLACES_MAX_PAGES) -> AsyncIterator[list[dict]]:
+    """Yields pages of Text Search results, best first.
+
+    Each page needs the previous page's token, so pages are chained, but the
+    next request goes out as soon as its token arrives, while the caller is
+    still handling the current page. Pages are cached individually.
+    """
+    client = get_places_client()
+
+    def fetch(page: int, token: Optional[str]) -> asyncio.Task:
+        return asyncio.create_task(places_cache.get_or_fetch(
+            f"{cache_key}#{page}",
+            lambda: client.search_text(text_query, page_token=token),
+        ))
+
+    task = fetch(0, None)
+    try:
+        for page in range(max_pages):
+            places, next_token = await task
+            task = fetch(page + 1, next_token) if next_token and page + 1 < max_pages else None
+            yield places
+            if task is None:
+                return
+    finally:
+        if task is not None:
+            task.cancel()
+
+def business_profile(place_details: dict, api_key: str) -> Optional[dict]:
+    """Turns a Places result into a business profile, or None if it has no phone number."""
+    phone_number = place_details.get("nationalPhoneNumber") or place_details.get("internationalPhoneNumber")
+    if not phone_number:
+        return None
+    display_name_obj = place_details.get("displayName")
+    name = display_name_obj.get("text") if isinstance(display_name_obj, dict) else display_name_obj
+
+    editorial_summary_obj = place_details.get("editorialSummary")
+    summary = editorial_summary_obj.get("text") if isinstance(editorial_summary_obj, dict) else None
+
+    location = place_details.get("location")
+    lat = location.get("latitude") if location else None
+    lng = location.get("longitude") if location else None
+
+    photo_url = None
+    photos = place_details.get("photos")
+    if photos and len(photos) > 0:
+        photo_name = photos[0].get("name")
+        if photo_name:
+            # Construct the photo URL
+            photo_url = f"https://places.googleapis.com/v1/{photo_name}/media?key={api_key}&maxHeightPx=400"
+
+    return {
+        "name": name,
+        "phone_number": phone_number,
+        "biz_description": summary,
+        "address": place_details.get("formattedAddress"),
+        "lat": lat,
+        "lng": lng,
+        "picture": photo_url
+    }
+
+def format_businesses(business_profiles: list[dict]) -> ResearchAgentOutputSchema:
+    """Formats profiles according to ResearchAgentOutputSchema."""
+    return ResearchAgentOutputSchema(businesses=[BusinessSchema(name=bp["name"],
+                                                                phone_number=bp["phone_number"],
+                                                                address=bp.get("address"),
+                                                                biz_description=bp.get("biz_description"),
+                                                                rating=None,
+                                                                review_count=None,
+                                                                picture=bp["picture"],
+                                                                lat=bp["lat"],
+                                                                lng=bp["lng"],
+                                                                last_contacted=bp.get("last_contacted")) for bp in business_profiles])
+
+async def get_phone_numbers_tool(google_places_query: str, geo: str, tool_context: ToolContext) -> str:
     """Fetches phone numbers of candidate businesses given a query and geographical location.
     Args:
         google_places_query: The search query to find businesses (e.g., "plumbers in San Francisco").
         geo: The geographical location to refine the search (e.g., "San Francisco, CA").
         tool_context: The context of the tool, containing session and state information.
+
+    Businesses called recently come back with `last_contacted` (days ago, outcome, success).
     """
     print(f"get_phone_numbers_tool called with: {google_places_query}, {geo}")
     # Search google places API for target businesses. return the json of business profiles with phone numbers. 
@@ -30,65 +123,51 @@ def get_phone_numbers_tool(google_places_query: str, geo: str, tool_context: Too
     if not api_key:
         return json.dumps({"error": "Google Maps API key not found."})
 
-    # Step 1: Text Search to find places
-    text_search_url = "https://places.googleapis.com/v1/places:searchText"
-    text_search_headers = {
-        "Content-Type": "application/json",
-        "X-Goog-Api-Key": api_key,
-        "X-Goog-FieldMask": "places.displayName,places.nationalPhoneNumber,places.internationalPhoneNumber,places.location,places.editorialSummary,places.photos"
-    }
-    text_search_payload = {
-        "textQuery": google_places_query + " in " + geo,
-    }
-
+    business_profiles = []
+    seen_phones = set()
+    skipped = 0
     try:
-        text_search_response = requests.post(text_search_url, json=text_search_payload, headers=text_search_headers)
-        text_search_response.raise_for_status()
-        places = text_search_response.json().get("places", [])
-
-        business_profiles = []
-        for place_details in places:
-            phone_number = place_details.get("nationalPhoneNumber") or place_details.get("internationalPhoneNumber")
-            if phone_number:
-                display_name_obj = place_details.get("displayName")
-                name = display_name_obj.get("text") if isinstance(display_name_obj, dict) else display_name_obj
-                
-                editorial_summary_obj = place_details.get("editorialSummary")
-                summary = editorial_summary_obj.get("text") if isinstance(editorial_summary_obj, dict) else None
-
-                location = place_details.get("location")
-                lat = location.get("latitude") if location else None
-                lng = location.get("longitude") if location else None
-
-                photo_url = None
-                photos = place_details.get("photos")
-                if photos and len(photos) > 0:
-                    photo_name = photos[0].get("name")
-                    if photo_name:
-                        # Construct the photo URL
-                        photo_url = f"https://places.googleapis.com/v1/{photo_name}/media?key={api_key}&maxHeightPx=400"
-
-                business_profiles.append({
-                    "name": name,
-                    "phone_number": phone_number,
-                    "biz_description": summary,
-                    "lat": lat,
-                    "lng": lng,
-                    "picture": photo_url
-                })
+        # Text Search pages (shared across sessions through the cache). Each page is
+        # streamed to the browser as soon as it arrives so the candidate list fills in.
+        pages = iter_places_pages(google_places_query + " in " + geo, places_cache_key(google_places_query, geo))
+        async for places in pages:
+            page_profiles = []
+            for place in places:
+                profile = business_profile(place, api_key)
+                if not profile:
+                    continue
+                # The same place can come back under national and international formats.
+                phone = normalize_phone(profile["phone_number"]) or profile["phone_number"]
+                if phone in seen_phones:
+                    continue
+                seen_phones.add(phone)
+                page_profiles.append((phone, profile))
+            # Skip businesses another session just called; flag ones called recently.
+            contacts = await business_index.last_contacts(phone for phone, _ in page_profiles)
+            for phone, profile in page_profiles:
+                contact = contacts.get(phone)
+                if contact and contact.blocks(tool_context.session.id):
+                    skipped += 1
+                    continue
+                if contact and contact.is_recent(RECENT_CONTACT_WINDOW):
+                    profile["last_contacted"] = contact.describe()
+                business_profiles.append(profile)
+            session_channels.publish(tool_context.session.id, {
+                "type": "candidates",
+                "candidates": format_businesses(business_profiles).model_dump(),
+            })
+        print(f"Places cache: {places_cache.stats()}")
         print("collecting numbers finished", 
-              f"found {len(business_profiles)} businesses with phone numbers.")
-        # Format the output according to ResearchAgentOutputSchema
-        formatted_business_profiles = ResearchAgentOutputSchema(businesses=[BusinessSchema(name=bp["name"],
-                                                                   phone_number=bp["phone_number"],
-                                                                   address=None,
-                                                                   rating=None,
-                                                                   review_count=None,
-                                                                   picture=bp["picture"]) for bp in business_profiles])
-        tool_context.state["formatted_businesses"] = formatted_business_profiles
+              f"found {len(business_profiles)} businesses with phone numbers, skipped {skipped} called recently.")
+        tool_context.state["formatted_businesses"] = format_businesses(business_profiles)
         return json.dumps(business_profiles)
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
+        # Later pages are a bonus; keep whatever arrived before the failure.
+        if business_profiles:
+            print(f"Places paging stopped early: {e}")
+            tool_context.state["formatted_businesses"] = format_businesses(business_profiles)
+            return json.dumps(business_profiles)
         return json.dumps({"error": str(e)})
     except Exception as e:
-        return json.dumps({"error": str(e)})
\ No newline at end of file
+        return json.dumps({"error": str(e)})
@@ -2,19 +2,36 @@ import os
 import httpx
 from typing import Optional
 from google.adk.tools.tool_context import ToolContext
-from google.cloud import firestore
 from pydantic import BaseModel
 import asyncio
 import json
 from google.genai import types
 
-# Initialize Firestore client
-db = firestore.Client()
+from business_index import business_index, normalize_phone
+from phone_client import get_phone_client
 
 class CallPlacedResult(BaseModel):
     message: str
     call_id: Optional[str] = None
 
+def find_business_location(phone_number: str, tool_context: ToolContext) -> tuple[Optional[float], Optional[float]]:
+    """Looks up the coordinates get_phone_numbers_tool found for a business."""
+    candidates = tool_context.state.get("formatted_businesses")
+    if hasattr(candidates, "model_dump"):
+        candidates = candidates.model_dump()
+    phone = normalize_phone(phone_number)
+    for business in (candidates or {}).get("businesses", []):
+        if normalize_phone(business.get("phone_number")) == phone:
+            return business.get("lat"), business.get("lng")
+    return None, None
+
+
+async def request_call(params: dict) -> Optional[str]:
+    """Asks the phone agent to place a call and returns its call ID."""
+    response_data = await get_phone_client().initiate_call(params)
+    return response_data.get("call_id")
+
+
 async def initiate_outcall(phone_number: str, biz_name: str, biz_description: str, desired_outcome: str, user_context: str, tool_context: ToolContext) -> CallPlacedResult:
     """Initiates an outreach call to a business. DON'T CALL THIS TOOL MULTIPLE TIMES. ONLY ONCE. YOU MUST HAVE ANSWERS TO ALL ANTICIPATED QUESTIONS BEFORE CALLING THIS TOOL. 
 
@@ -33,24 +50,27 @@ async def initiate_outcall(phone_number: str, biz_name: str, biz_description: st
     if not server_url:
         return "Error: PHONE_AGENT_SERVER_HOST environment variable is not set."
 
-    try:
-        with httpx.Client() as client:
+    # Don't spend call minutes on a business another session just called.
+    contact = await business_index.blocking_contact(phone_number, tool_context.session.id)
+    if contact:
+        print(f"Skipping call to {biz_name}: already called as {contact.call_id}")
+        return CallPlacedResult(message=f"{biz_name} was already called {contact.describe()['days_ago']} days ago by ServiceScout. Outcome: {contact.outcome_summary or 'still in progress'}. Use this instead of calling again and move on to another business.", call_id=None)
 
-            response = client.post(
-                f"https://{server_url}/dialer/initiate_call",
-                params={"initiator_user_id": tool_context.session.user_id, "phone_number": phone_number, "outcome": desired_outcome, "server_url": server_url, "biz_name": biz_name, "biz_description": biz_description, "lat": 0, "lng": 0, "session_id": tool_context.session.id, "user_context": user_context},
-            )
+    # Sent in E.164 so business_index finds the call whichever format the number came in.
+    params = {"initiator_user_id": tool_context.session.user_id, "phone_number": normalize_phone(phone_number) or phone_number, "outcome": desired_outcome, "server_url": server_url, "biz_name": biz_name, "biz_description": biz_description, "session_id": tool_context.session.id, "user_context": user_context}
+    lat, lng = find_business_location(phone_number, tool_context)
+    if lat is not None and lng is not None:
+        params.update(lat=lat, lng=lng)
 
-            # get call ID from response
-            response_data = response.json()
-            call_id = response_data.get("call_id")
-            tool_context.state["placed_call_id"] = call_id
+    try:
+        call_id = await request_call(params)
+        tool_context.state["placed_call_id"] = call_id
 
-            print(f"Initiated call to {biz_name} with call ID: {call_id}")
+        print(f"Initiated call to {biz_name} with call ID: {call_id}")
 
-            return CallPlacedResult(message=f"Successfully called {biz_name}. We will have the result shortly.", call_id=call_id)
+        return CallPlacedResult(message=f"Successfully called {biz_name}. We will have the result shortly.", call_id=call_id)
 
-    except httpx.RequestError as e:
+    except httpx.HTTPError as e:
         print(e)
         return CallPlacedResult(message=f"An error occurred while trying to initiate the call: {e}", call_id=None)
     except Exception as e:
@@ -1,14 +1,55 @@
-import math
-from google.cloud import firestore
-from google.cloud.firestore_v1.vector import Vector
-from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+import os
 import google.genai as genai
 from google.genai.types import EmbedContentConfig
 
-def firestore_retrieval_tool(customer_need: str, lat: float, lng: float) -> str:
+from embedding_cache import QueryEmbeddingCache
+from embedding_profile import EMBEDDING_MODEL, get_embedding_profile
+from geohash import covering_cells, haversine_miles
+from hybrid_search import is_exact_term_match, lexical_search, reciprocal_rank_fusion, term_idf
+from snippets import select_snippets
+from vector_search import create_vector_backend, get_conversations
+
+# Must match the phone agent's EMBEDDING_PROFILE so queries and transcripts are comparable.
+embedding_profile = get_embedding_profile()
+EMBEDDING_DIMENSIONALITY = embedding_profile.dimensionality
+
+SEARCH_RADIUS_MILES = 10.0
+RESULT_LIMIT = 5
+# Fetch extra neighbours so dropping far-away ones still leaves enough results.
+RERANK_POOL_SIZE = 20
+# Fraction of its score a result at the edge of the radius loses against one at the center.
+DISTANCE_WEIGHT = float(os.getenv("RETRIEVAL_DISTANCE_WEIGHT", "0.1"))
+# Total tokens of conversation snippets returned to the live model per search.
+SNIPPET_TOKEN_BUDGET = int(os.getenv("RETRIEVAL_TOKEN_BUDGET", "800"))
+
+# Users ask near-identical questions all day, so repeat queries skip the embedding round trip.
+query_embedding_cache = QueryEmbeddingCache(
+    namespace=f"{EMBEDDING_MODEL}:{EMBEDDING_DIMENSIONALITY}",
+    max_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+    path=os.getenv("QUERY_EMBEDDING_CACHE_PATH"),
+    max_disk_entries=int(os.getenv("QUERY_EMBEDDING_CACHE_DISK_SIZE", "100000")),
+)
+vector_backend = create_vector_backend(EMBEDDING_DIMENSIONALITY, embedding_profile.quantization)
+genai_client = None
+
+async def embed_query(customer_need: str) -> list[float]:
+    global genai_client
+    if genai_client is None:
+        genai_client = genai.Client()
+    response = await genai_client.aio.models.embed_content(
+        model=EMBEDDING_MODEL,
+        contents=[customer_need],
+        config=EmbedContentConfig(
+            task_type="RETRIEVAL_QUERY",  # Optional
+            output_dimensionality=EMBEDDING_DIMENSIONALITY,  # Optional
+        ),
+    )
+    return response.embeddings[0].values
+
+async def firestore_retrieval_tool(customer_need: str, lat: float, lng: float) -> str:
     """
-    Performs a similarity search in Firestore for a customer's need,
-    filtered by a 10-mile geographic square.
+    Searches past ServiceScout calls for a customer's need, matching both exact
+    terms and meaning, within 10 miles of the search center.
 
     Args:
         customer_need: The customer's need as a string.
@@ -18,57 +59,59 @@ def firestore_retrieval_tool(customer_need: str, lat: float, lng: float) -> str:
     Returns:
         A string containing the search results.
     """
-    db = firestore.Client()
+    # Search only the geohash cells covering the radius, then drop anything outside it.
+    # Conversations placed before coordinates were recorded sit at (0, 0) and have no cell.
+    has_location = not (lat == 0 and lng == 0)
+    cells = covering_cells(lat, lng, SEARCH_RADIUS_MILES) if has_location else None
+    pool_size = RERANK_POOL_SIZE if has_location else RESULT_LIMIT
 
-    # Create embedding for the customer need
     try:
-        client = genai.Client()
-        response = client.models.embed_content(
-            model="gemini-embedding-001",
-            contents=[customer_need],
-            config=EmbedContentConfig(
-                task_type="RETRIEVAL_QUERY",  # Optional
-                output_dimensionality=2048,  # Optional
-            ),
-        )
-        embedding = response.embeddings[0].values
-    except Exception as e:
-        return f"Error creating embedding: {e}"
-
-    # Define the search radius in miles
-    radius_miles = 10.0
+        # Exact tokens (names, prices, days, zip codes) come from the lexical index in a
+        # millisecond or two. Short queries it fully matches don't need an embedding at all.
+        lexical_hits = await lexical_search(customer_need, pool_size, cells)
+        if is_exact_term_match(customer_need, lexical_hits):
+            hits = lexical_hits
+        else:
+            # Create embedding for the customer need
+            try:
+                embedding = await query_embedding_cache.get_or_embed(customer_need, embed_query)
+                print(f"Query embedding cache: {query_embedding_cache.stats()}")
+            except Exception as e:
+                return f"Error creating embedding: {e}"
 
-    # Approximate conversions from miles to degrees
-    lat_degrees_per_mile = 1.0 / 69.0
-    lng_degrees_per_mile = 1.0 / (69.0 * math.cos(math.radians(lat)))
+            vector_hits = await vector_backend.search(embedding, limit=pool_size, cells=cells)
+            hits = reciprocal_rank_fusion(vector_hits, lexical_hits or [])
 
-    # Calculate the bounding box
-    lat_offset = radius_miles * lat_degrees_per_mile
-    lng_offset = radius_miles * lng_degrees_per_mile
+        # Re-rank by relevance, discounted by true distance from the search center.
+        ranked = []
+        for hit in hits:
+            distance = None
+            score = hit.score
+            if has_location:
+                if hit.data.get("lat") is None or hit.data.get("lng") is None:
+                    continue
+                distance = haversine_miles(lat, lng, hit.data["lat"], hit.data["lng"])
+                if distance > SEARCH_RADIUS_MILES:
+                    continue
+                score *= 1 - DISTANCE_WEIGHT * distance / SEARCH_RADIUS_MILES
+            ranked.append((score, distance, hit))
+        ranked.sort(key=lambda r: r[0], reverse=True)
+        top = ranked[:RESULT_LIMIT]
 
-    lat_min = lat - lat_offset
-    lat_max = lat + lat_offset
-    lng_min = lng - lng_offset
-    lng_max = lng + lng_offset
-
-    try:
-        query = db.collection("provider_conversations")
-        # .where("lat", ">=", lat_min).where("lat", "<=", lat_max).where("lng", ">=", lng_min).where("lng", "<=", lng_max)
-        
-        nearest_docs = query.find_nearest(
-            vector_field="transcript_embedding",
-            query_vector=Vector(embedding),
-            limit=5,
-            distance_measure=DistanceMeasure.COSINE
-        ).get()
+        # Lexical hits carry no transcript; read it for the few that made the cut.
+        missing = [hit.doc_id for _, _, hit in top if "transcript_passages" not in hit.data and "transcript" not in hit.data]
+        transcripts = await get_conversations(missing, ["transcript", "transcript_passages"])
 
+        # Share the token budget across results; whatever one leaves unused carries over.
         results = []
-        for doc in nearest_docs:
-            doc_data = doc.to_dict()
-            # Assuming the document has 'biz_name' and 'transcript' fields
+        budget = SNIPPET_TOKEN_BUDGET
+        for i, (_, distance, hit) in enumerate(top):
+            doc_data = {**hit.data, **transcripts.get(hit.doc_id, {})}
             biz_name = doc_data.get("biz_name", "N/A")
-            transcript_text = " ".join([f'{t["role"]}: {t["text"]}' for t in doc_data.get("transcript", [])])
-            results.append(f"Business: {biz_name}\nConversation: {transcript_text}\n---")
+            snippet, used = select_snippets(doc_data, customer_need, budget // (len(top) - i), term_idf)
+            budget -= used
+            location = f" ({distance:.1f} miles away)" if distance is not None else ""
+            results.append(f"Business: {biz_name}{location}\nConversation: {snippet}\n---")
 
         if not results:
             return "I searched ServiceScout but found no relevant conversations in that area."
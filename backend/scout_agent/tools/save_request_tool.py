@@ -1,8 +1,9 @@
 from google.adk.tools.tool_context import ToolContext
-from google.cloud import firestore
 
+from firestore_db import db
 
-def save_request_tool(
+
+async def save_request_tool(
     new_summary: str, new_title: str, tool_context: ToolContext
 ) -> str:
     """Saves the user request to the context.
@@ -17,11 +18,10 @@ def save_request_tool(
         user_id = tool_context.session.user_id
 
         # Save the user request to the database
-        db = firestore.Client()
         doc_ref = db.collection("sessions").document(session_id)
-        doc_ref.update(
+        await doc_ref.update(
             {"request_summary": new_summary, "user_id": user_id, "title": new_title}
         )
         print(f"Saving user request: {new_summary}")    
     finally:
-        return "User request saved."
\ No newline at end of file
+        return "User request saved."
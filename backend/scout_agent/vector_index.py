@@ -0,0 +1,291 @@
+import json
+import os
+import threading
+from typing import Optional
+
+import numpy as np
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def spherical_kmeans(vectors: np.ndarray, k: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """Clusters unit vectors by cosine similarity and returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(k):
+            members = vectors[assignment == c]
+            # Re-seed empty clusters so every list stays useful.
+            centroids[c] = members.sum(axis=0) if len(members) else vectors[rng.integers(len(vectors))]
+        centroids = normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+QUANTIZATIONS = ("float32", "int8", "binary")
+
+
+class VectorIndex:
+    """In-process IVF (inverted file) index for cosine similarity search.
+
+    Vectors are normalized and kept in a matrix that is memory-mapped from
+    `directory` when one is given, so the OS can page it instead of the process
+    holding it all. Rows are grouped into `sqrt(n)` clusters; a search scores the
+    centroids, then only the rows in the `nprobe` closest clusters. Small indexes
+    and untrained ones fall back to brute force.
+
+    `quantization` picks how rows are stored: "float32" (4 bytes/dim), "int8"
+    (1 byte/dim plus a per-row scale) or "binary" (sign bits, 1/8 byte/dim).
+    Queries stay float32, so quantized rows are scored asymmetrically.
+
+    Safe to update from a listener thread while searches run on another thread.
+    """
+
+    def __init__(self, dim: int, directory: Optional[str] = None, nprobe: int = 16, brute_force_below: int = 2000, quantization: str = "float32"):
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        self.dim = dim
+        self.quantization = quantization
+        self.directory = directory
+        self.nprobe = nprobe
+        self.brute_force_below = brute_force_below
+        self._lock = threading.RLock()
+
+        self.ids: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._alive = np.zeros(0, dtype=bool)
+        self._vectors = np.zeros((0, self._code_width), dtype=self._code_dtype)
+        self._scales = np.zeros(0, dtype=np.float32)
+        self._size = 0
+
+        self.centroids: Optional[np.ndarray] = None
+        self._assignment = np.zeros(0, dtype=np.int32)
+        self._lists: list[list[int]] = []
+        self._list_arrays: dict[int, np.ndarray] = {}
+        self._trained_size = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @property
+    def _code_width(self) -> int:
+        return (self.dim + 7) // 8 if self.quantization == "binary" else self.dim
+
+    @property
+    def _code_dtype(self):
+        return {"float32": np.float32, "int8": np.int8, "binary": np.uint8}[self.quantization]
+
+    @property
+    def bytes_per_vector(self) -> float:
+        return self._code_width * np.dtype(self._code_dtype).itemsize + (4 if self.quantization == "int8" else 0)
+
+    # --- Updates ---
+    def upsert(self, doc_id: str, vector) -> None:
+        vector = normalize(np.asarray(vector, dtype=np.float32))
+        if vector.shape != (self.dim,):
+            raise ValueError(f"Expected a {self.dim}-dim vector for {doc_id}, got {vector.shape}")
+        with self._lock:
+            row = self._rows.get(doc_id)
+            if row is None:
+                row = self._append_row(doc_id)
+            else:
+                self._unassign(row)
+            self._vectors[row], self._scales[row] = self._encode(vector)
+            self._alive[row] = True
+            self._assign(row)
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            row = self._rows.pop(doc_id, None)
+            if row is not None:
+                self._alive[row] = False
+                self._unassign(row)
+
+    def needs_training(self) -> bool:
+        n = len(self._rows)
+        return n >= self.brute_force_below and n >= 2 * max(self._trained_size, self.brute_force_below // 2)
+
+    def train(self, sample_size: int = 20000, iterations: int = 10) -> None:
+        """(Re)clusters the index. Heavy work runs on a snapshot without holding the lock."""
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            if len(rows) < 2:
+                return
+            sample = rows if len(rows) <= sample_size else np.random.default_rng(0).choice(rows, sample_size, replace=False)
+            training_vectors = self._decode(sample)
+            snapshot_size = self._size
+
+        k = max(1, int(np.sqrt(len(rows))))
+        centroids = spherical_kmeans(training_vectors, k, iterations)
+        assignment = np.full(snapshot_size, -1, dtype=np.int32)
+        for start in range(0, snapshot_size, 8192):
+            block = self._decode(np.arange(start, min(start + 8192, snapshot_size)))
+            assignment[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        with self._lock:
+            self.centroids = centroids
+            self._assignment = np.full(len(self._alive), -1, dtype=np.int32)
+            self._lists = [[] for _ in range(k)]
+            self._list_arrays = {}
+            for row in np.flatnonzero(self._alive[:self._size]):
+                # Rows added or changed while training are assigned against the new centroids.
+                if row < snapshot_size:
+                    self._assignment[row] = assignment[row]
+                    self._lists[assignment[row]].append(int(row))
+                else:
+                    self._assign(int(row))
+            self._trained_size = len(self._rows)
+
+    # --- Search ---
+    def search(self, query, limit: int, candidates: Optional[set[str]] = None, nprobe: Optional[int] = None) -> list[tuple[str, float]]:
+        """Returns up to `limit` (doc_id, cosine similarity) pairs, best first.
+
+        If `candidates` is given, only those documents are considered.
+        """
+        query = normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            if candidates is not None:
+                rows = np.fromiter((self._rows[c] for c in candidates if c in self._rows), dtype=np.int64)
+            elif self.centroids is None or len(self._rows) < self.brute_force_below:
+                rows = np.flatnonzero(self._alive[:self._size])
+            else:
+                probe = min(nprobe or self.nprobe, len(self.centroids))
+                closest = np.argpartition(-(self.centroids @ query), probe - 1)[:probe]
+                rows = np.concatenate([self._list_array(int(c)) for c in closest])
+            if len(rows) == 0:
+                return []
+            scores = self._decode(rows) @ query
+            top = np.argsort(-scores)[:limit] if len(rows) <= limit else np.argpartition(-scores, limit - 1)[:limit]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[rows[i]], float(scores[i])) for i in top]
+
+    def brute_force(self, query, limit: int) -> list[tuple[str, float]]:
+        """Exact search over every row, for measuring recall."""
+        query = normalize(np.asarray(query, dtype=np.float32))
+        with self._lock:
+            rows = np.flatnonzero(self._alive[:self._size])
+            scores = self._decode(rows) @ query
+            top = np.argsort(-scores)[:limit]
+            return [(self.ids[rows[i]], float(scores[i])) for i in top]
+
+    # --- Persistence ---
+    def save(self) -> None:
+        if not self.directory:
+            return
+        with self._lock:
+            if isinstance(self._vectors, np.memmap):
+                self._vectors.flush()
+            else:
+                np.save(os.path.join(self.directory, "vectors.npy"), self._vectors)
+            np.save(os.path.join(self.directory, "alive.npy"), self._alive[:self._size])
+            if self.quantization == "int8":
+                np.save(os.path.join(self.directory, "scales.npy"), self._scales[:self._size])
+            if self.centroids is not None:
+                np.save(os.path.join(self.directory, "centroids.npy"), self.centroids)
+                np.save(os.path.join(self.directory, "assignment.npy"), self._assignment[:self._size])
+            with open(os.path.join(self.directory, "meta.json"), "w") as f:
+                json.dump({"dim": self.dim, "quantization": self.quantization, "ids": self.ids[:self._size], "trained_size": self._trained_size}, f)
+
+    def _load(self):
+        meta_path = os.path.join(self.directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as f:
+            meta = json.load(f)
+        quantization = meta.get("quantization", "float32")
+        if meta["dim"] != self.dim or quantization != self.quantization:
+            print(f"Ignoring vector index in {self.directory}: built for {meta['dim']} dims/{quantization}, need {self.dim} dims/{self.quantization}.")
+            return
+        self.ids = meta["ids"]
+        self._size = len(self.ids)
+        self._vectors = np.load(os.path.join(self.directory, "vectors.npy"), mmap_mode="r+")
+        self._alive = np.zeros(len(self._vectors), dtype=bool)
+        self._alive[:self._size] = np.load(os.path.join(self.directory, "alive.npy"))
+        self._scales = np.zeros(len(self._vectors), dtype=np.float32)
+        if self.quantization == "int8":
+            self._scales[:self._size] = np.load(os.path.join(self.directory, "scales.npy"))
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids) if self._alive[row]}
+        centroids_path = os.path.join(self.directory, "centroids.npy")
+        if os.path.exists(centroids_path):
+            self.centroids = np.load(centroids_path)
+            self._assignment = np.full(len(self._alive), -1, dtype=np.int32)
+            self._assignment[:self._size] = np.load(os.path.join(self.directory, "assignment.npy"))
+            self._lists = [[] for _ in range(len(self.centroids))]
+            for row in np.flatnonzero(self._alive[:self._size]):
+                self._lists[self._assignment[row]].append(int(row))
+            self._trained_size = meta["trained_size"]
+
+    # --- Internals ---
+    def _append_row(self, doc_id: str) -> int:
+        if self._size == len(self._vectors):
+            self._grow(max(1024, 2 * len(self._vectors)))
+        row = self._size
+        self._size += 1
+        self.ids.append(doc_id)
+        self._rows[doc_id] = row
+        return row
+
+    def _grow(self, capacity: int):
+        if self.directory:
+            path = os.path.join(self.directory, "vectors.npy")
+            tmp_path = path + ".tmp"
+            grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self._code_dtype, shape=(capacity, self._code_width))
+            grown[:self._size] = self._vectors[:self._size]
+            grown.flush()
+            del grown
+            os.replace(tmp_path, path)
+            self._vectors = np.load(path, mmap_mode="r+")
+        else:
+            grown = np.zeros((capacity, self._code_width), dtype=self._code_dtype)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+        self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), dtype=bool)])
+        self._scales = np.concatenate([self._scales, np.zeros(capacity - len(self._scales), dtype=np.float32)])
+        self._assignment = np.concatenate([self._assignment, np.full(capacity - len(self._assignment), -1, dtype=np.int32)])
+
+    def _assign(self, row: int):
+        if self.centroids is None:
+            return
+        cluster = int(np.argmax(self.centroids @ self._decode(np.array([row]))[0]))
+        self._assignment[row] = cluster
+        self._lists[cluster].append(row)
+        self._list_arrays.pop(cluster, None)
+
+    def _unassign(self, row: int):
+        cluster = self._assignment[row] if row < len(self._assignment) else -1
+        if cluster >= 0:
+            self._lists[cluster].remove(row)
+            self._list_arrays.pop(int(cluster), None)
+            self._assignment[row] = -1
+
+    def _encode(self, vector: np.ndarray) -> tuple[np.ndarray, float]:
+        """Returns the stored form of a unit vector and its scale (int8 only)."""
+        if self.quantization == "int8":
+            scale = max(float(np.abs(vector).max()), 1e-12) / 127.0
+            return np.round(vector / scale).astype(np.int8), scale
+        if self.quantization == "binary":
+            return np.packbits(vector > 0), 0.0
+        return vector, 0.0
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Returns float32 approximations of the given rows."""
+        codes = self._vectors[rows]
+        if self.quantization == "int8":
+            return codes.astype(np.float32) * self._scales[rows, None]
+        if self.quantization == "binary":
+            signs = np.unpackbits(codes, axis=1, count=self.dim).astype(np.float32) * 2.0 - 1.0
+            return signs / np.sqrt(self.dim, dtype=np.float32)
+        return np.asarray(codes)
+
+    def _list_array(self, cluster: int) -> np.ndarray:
+        array = self._list_arrays.get(cluster)
+        if array is None:
+            array = self._list_arrays[cluster] = np.array(self._lists[cluster], dtype=np.int64)
+        return array
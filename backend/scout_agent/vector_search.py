@@ -0,0 +1,116 @@
+import asyncio
+import os
+import time
+from typing import NamedTuple, Optional
+
+from google.cloud.firestore_v1.base_query import FieldFilter
+from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
+from google.cloud.firestore_v1.vector import Vector
+
+from conversation_sync import conversation_sync
+from firestore_db import db
+from geo_index import geo_index
+from vector_index import VectorIndex
+
+
+# Fields retrieval reads from a matched conversation.
+CONVERSATION_FIELDS = ["biz_name", "transcript", "transcript_passages", "outcome_summary", "lat", "lng"]
+
+
+class SearchHit(NamedTuple):
+    doc_id: str
+    score: float
+    data: dict
+
+
+class FirestoreVectorBackend:
+    """Nearest-neighbour search with Firestore's find_nearest.
+
+    Filtering by `cells` needs a composite vector index on
+    (geohash_prefixes, transcript_embedding). Only CONVERSATION_FIELDS are read
+    back, never the embedding itself.
+    """
+
+    async def search(self, query_vector: list[float], limit: int, cells: Optional[list[str]] = None) -> list[SearchHit]:
+        query = db.collection("provider_conversations").select([*CONVERSATION_FIELDS, "vector_distance"])
+        if cells is not None:
+            query = query.where(filter=FieldFilter("geohash_prefixes", "array_contains_any", cells))
+        nearest_docs = await query.find_nearest(
+            vector_field="transcript_embedding",
+            query_vector=Vector(query_vector),
+            limit=limit,
+            distance_measure=DistanceMeasure.COSINE,
+            distance_result_field="vector_distance",
+        ).get()
+        return [SearchHit(doc.id, 1.0 - doc.get("vector_distance"), doc.to_dict()) for doc in nearest_docs]
+
+
+class LocalVectorBackend:
+    """Searches an in-process IVF index kept in sync with `provider_conversations`.
+
+    The index is filled by the conversation listener and persisted to
+    VECTOR_INDEX_DIR (if set) so restarts start warm. Until the first snapshot has
+    been applied, searches fall back to Firestore.
+    """
+
+    def __init__(self, dim: int, directory: Optional[str] = None, save_interval: float = 60.0, quantization: str = "float32"):
+        self.index = VectorIndex(dim, directory, quantization=quantization)
+        self.fallback = FirestoreVectorBackend()
+        self.save_interval = save_interval
+        self._dirty = False
+        self._last_save = time.monotonic()
+        conversation_sync.add_consumer(geo_index)
+        conversation_sync.add_consumer(self)
+
+    # --- Conversation sync consumer (listener thread) ---
+    def apply(self, doc_id: str, data: Optional[dict]):
+        embedding = data.get("transcript_embedding") if data else None
+        if embedding is None:
+            self.index.remove(doc_id)
+        elif len(embedding) == self.index.dim:
+            self.index.upsert(doc_id, list(embedding))
+        self._dirty = True
+
+    def flush(self):
+        if self.index.needs_training():
+            started = time.monotonic()
+            self.index.train()
+            print(f"Trained vector index over {len(self.index)} conversations in {time.monotonic() - started:.1f}s.")
+        if self._dirty and time.monotonic() - self._last_save > self.save_interval:
+            self.index.save()
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+    # --- Search ---
+    async def search(self, query_vector: list[float], limit: int, cells: Optional[list[str]] = None) -> list[SearchHit]:
+        if not conversation_sync.ready:
+            await asyncio.to_thread(conversation_sync.start)
+            return await self.fallback.search(query_vector, limit, cells)
+
+        # Only score the documents inside the covering cells.
+        candidates = geo_index.candidates(cells) if cells is not None else None
+        if candidates is not None and not candidates:
+            return []
+        # The index is shared with the listener thread, so search off the event loop.
+        matches = await asyncio.to_thread(self.index.search, query_vector, limit, candidates)
+        # Skip transcript_embedding: the index already has it and it dominates the document size.
+        docs = await get_conversations([doc_id for doc_id, _ in matches])
+        return [SearchHit(doc_id, score, docs[doc_id]) for doc_id, score in matches if doc_id in docs]
+
+
+async def get_conversations(doc_ids: list[str], fields: list[str] = CONVERSATION_FIELDS) -> dict[str, dict]:
+    """Reads the given fields of a few conversations in one round trip."""
+    if not doc_ids:
+        return {}
+    refs = [db.collection("provider_conversations").document(doc_id) for doc_id in doc_ids]
+    return {doc.id: doc.to_dict() async for doc in db.get_all(refs, field_paths=fields) if doc.exists}
+
+
+def create_vector_backend(dim: int, quantization: str = "float32"):
+    """Picks the backend named by VECTOR_SEARCH_BACKEND ("firestore" or "local")."""
+    name = os.getenv("VECTOR_SEARCH_BACKEND", "firestore")
+    if name == "local":
+        return LocalVectorBackend(dim, os.getenv("VECTOR_INDEX_DIR"), quantization=quantization)
+    if name != "firestore":
+        raise ValueError(f"Unknown vector search backend: {name}")
+    return FirestoreVectorBackend()